@@ -1,9 +1,14 @@
 # Home.py
 import streamlit as st
 
+from artifacts import start_background_warmup
+
 # Configuration de la page
 st.set_page_config(page_title="Accueil - Dashboard de Turnover", layout="wide")
 
+# Préchargement des données et du modèle en arrière-plan pendant la lecture de l'accueil
+start_background_warmup()
+
 # Styles CSS personnalisés
 st.markdown(
     """
@@ -63,6 +68,8 @@ st.markdown("""
         <ul>
             <li><strong>Dashboard KPI</strong> : Accède aux indicateurs clés de performance et visualisations interactives, incluant des métriques telles que le taux de turnover global, la satisfaction moyenne des employés, les heures mensuelles moyennes, ainsi que des visualisations détaillées comme des histogrammes, graphiques en barres, graphiques en secteurs, et des scatter plots dynamiques pour une analyse approfondie du turnover.</li>
             <li><strong>Prédiction de Turnover</strong> : Affiche la probabilité qu'un employé quitte l'entreprise.</li>
+            <li><strong>Classement des Employés à Risque</strong> : Liste, par poste et niveau de risque, les employés les plus susceptibles de partir.</li>
+            <li><strong>Comparaison des Modèles</strong> : Compare les modèles enregistrés (champion / challenger) : AUC, écarts de probabilité et désaccords de niveau de risque par poste.</li>
             <li><strong>Visualisation des Détails</strong> : Permet de visualiser les caractéristiques spécifiques de l'employé sélectionné.</li>
             <li><strong>Explications SHAP</strong> : Fournit des explications détaillées sur l'impact des différentes caractéristiques (features) sur la prédiction.</li>
             <li><strong>Recommandations</strong> : Affiche des recommandations pour améliorer la rétention des employés.</li>
@@ -0,0 +1,257 @@
+# aggregations.py
+import numpy as np
+import pandas as pd
+
+# Libellé de la ligne agrégée sur tous les postes
+ALL_JOBS = "Tous"
+
+# Largeur de classe de base des courbes de turnover, pour chaque variable numérique.
+# Le cube garde ces classes fines ; des classes plus larges s'obtiennent en les regroupant.
+CURVE_BIN_WIDTHS = {
+    "satisfaction_level": 0.01,
+    "last_evaluation": 0.01,
+    "number_project": 1,
+    "average_montly_hours": 5,
+    "time_spend_company": 1,
+    "salary_encoded": 1,
+}
+
+# Quantile de la loi normale pour l'intervalle de confiance à 95 %
+Z_95 = 1.959963984540054
+
+
+# Numéro de classe de largeur fixe (origine 0) de chaque valeur. Une valeur sur une borne à la
+# précision de son type près (0.21 en float32 vaut 0.2099999934, soit 20.99999934 classes de
+# 0.01) est rattachée à la classe qui commence sur cette borne, pas à la précédente.
+def bin_index(values, width):
+    values = np.asarray(values)
+    eps = np.finfo(values.dtype if np.issubdtype(values.dtype, np.floating) else np.float64).eps
+    position = values.astype(np.float64) / width
+    nearest = np.round(position)
+    on_edge = np.abs(position - nearest) <= 8 * eps * np.maximum(np.abs(position), 1)
+    return np.where(on_edge, nearest, np.floor(position)).astype(np.int64)
+
+
+# Abscisse affichée d'une classe : la valeur elle-même pour les classes unitaires, le centre sinon
+def bin_centers(bins, width):
+    bins = np.asarray(bins, dtype=np.float64)
+    return bins * width if width == 1 else (bins + 0.5) * width
+
+
+# Intervalle de confiance de Wilson d'une proportion, vectorisé
+def wilson_interval(successes, counts, z=Z_95):
+    successes = np.asarray(successes, dtype=np.float64)
+    counts = np.asarray(counts, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p = successes / counts
+        denominator = 1 + z**2 / counts
+        center = (p + z**2 / (2 * counts)) / denominator
+        half_width = z * np.sqrt(p * (1 - p) / counts + z**2 / (4 * counts**2)) / denominator
+    return np.clip(center - half_width, 0, 1), np.clip(center + half_width, 0, 1)
+
+
+# Sommes et effectifs additifs d'un morceau de données, avant le total "Tous".
+# Toutes les réductions sont des np.bincount sur le code du job (et de la classe).
+def _partial_cube(df):
+    job_codes, jobs = pd.factorize(df["job"], sort=True)
+    jobs = np.asarray(jobs, dtype=object)
+    n_jobs = len(jobs)
+    left = df["left"].to_numpy(dtype=np.float64)
+    satisfaction = df["satisfaction_level"].to_numpy(dtype=np.float64)
+
+    def per_job(weights=None):
+        return np.bincount(job_codes, weights=weights, minlength=n_jobs)
+
+    cube = {"kpis": pd.DataFrame({
+        "count": per_job().astype(np.float64),
+        "left_sum": per_job(left),
+        "satisfaction_sum": per_job(satisfaction),
+        "hours_sum": per_job(df["average_montly_hours"].to_numpy(dtype=np.float64)),
+        "satisfaction_left_sum": per_job(satisfaction * left),
+    }, index=pd.Index(jobs, name="job"))}
+
+    for column, width in CURVE_BIN_WIDTHS.items():
+        bins = bin_index(df[column], width)
+        if len(bins) == 0:
+            cube[column] = pd.DataFrame(
+                {"count": [], "left_sum": []},
+                index=pd.MultiIndex.from_arrays([[], []], names=["job", "bin"]),
+            )
+            continue
+        first_bin = bins.min()
+        n_bins = int(bins.max() - first_bin + 1)
+        keys = job_codes * n_bins + (bins - first_bin)
+        counts = np.bincount(keys, minlength=n_jobs * n_bins)
+        left_sums = np.bincount(keys, weights=left, minlength=n_jobs * n_bins)
+        present = np.flatnonzero(counts)
+        cube[column] = pd.DataFrame(
+            {"count": counts[present].astype(np.float64), "left_sum": left_sums[present]},
+            index=pd.MultiIndex.from_arrays(
+                [jobs[present // n_bins], present % n_bins + first_bin], names=["job", "bin"]
+            ),
+        )
+    return cube
+
+
+# Retire les lignes "Tous" d'une table du cube
+def _without_rollup(table):
+    return table[table.index.get_level_values(0) != ALL_JOBS]
+
+
+# Ajoute la ligne "Tous" (somme de tous les postes) à chaque table du cube
+def _with_rollup(cube):
+    rolled = {}
+    for name, table in cube.items():
+        table = _without_rollup(table)
+        if table.index.nlevels == 1:
+            total = table.sum().to_frame(ALL_JOBS).T
+            rolled[name] = pd.concat([table, total])
+        else:
+            total = table.groupby(level=1).sum()
+            total.index = pd.MultiIndex.from_product([[ALL_JOBS], total.index], names=table.index.names)
+            rolled[name] = pd.concat([table, total]).sort_index()
+    return rolled
+
+
+# Fonction pour construire le cube des KPI du Dashboard, une seule fois par version des données
+def build_kpi_cube(df):
+    return _with_rollup(_partial_cube(df))
+
+
+# Fonction pour construire le cube à partir de morceaux de données lus l'un après l'autre
+# (scan en flux d'un historique trop volumineux pour être chargé en une fois) :
+# les sommes partielles de chaque morceau s'additionnent
+def build_kpi_cube_from_chunks(chunks):
+    cube = None
+    for chunk in chunks:
+        partial = _partial_cube(chunk)
+        if cube is None:
+            cube = partial
+        else:
+            cube = {name: cube[name].add(table, fill_value=0) for name, table in partial.items()}
+    return _with_rollup(cube)
+
+
+# Fonction pour mettre à jour le cube avec des lignes ajoutées et/ou retirées,
+# sans tout recalculer : les sommes et effectifs sont additifs
+def update_kpi_cube(cube, added=None, removed=None):
+    updated = {name: _without_rollup(table) for name, table in cube.items()}
+    for rows, sign in ((added, 1), (removed, -1)):
+        if rows is None or rows.empty:
+            continue
+        for name, delta in _partial_cube(rows).items():
+            updated[name] = updated[name].add(sign * delta, fill_value=0)
+    for name, table in updated.items():
+        updated[name] = table[table["count"] > 0]
+    return _with_rollup(updated)
+
+
+# Lecture des lignes du cube pour un job (ou "Tous")
+def cube_rows(cube, name, job):
+    table = cube[name]
+    if job not in table.index.get_level_values(0):
+        return table.iloc[:0].droplevel(0) if table.index.nlevels > 1 else table.iloc[:0]
+    return table.loc[job]
+
+
+# Fonction pour calculer les 4 KPI d'un job à partir du cube
+def kpi_values(cube, job):
+    if job not in cube["kpis"].index:
+        return None
+    row = cube["kpis"].loc[job]
+    count, left_sum = row["count"], row["left_sum"]
+    if count == 0:
+        return None
+    stay_count = count - left_sum
+    satisfaction_left = row["satisfaction_left_sum"] / left_sum if left_sum else np.nan
+    satisfaction_stay = (row["satisfaction_sum"] - row["satisfaction_left_sum"]) / stay_count if stay_count else np.nan
+    return {
+        "count": int(count),
+        "turnover_rate": left_sum / count * 100,
+        "avg_satisfaction": row["satisfaction_sum"] / count,
+        "avg_monthly_hours": row["hours_sum"] / count,
+        "satisfaction_left": satisfaction_left,
+        "satisfaction_stay": satisfaction_stay,
+        "satisfaction_gap": 0 if pd.isna(satisfaction_left) or pd.isna(satisfaction_stay)
+        else satisfaction_stay - satisfaction_left,
+    }
+
+
+# Fonction pour transformer des effectifs par classe en courbe de turnover avec bande de confiance
+def curve_from_counts(x_values, counts, left_sums, z=Z_95):
+    counts = np.asarray(counts, dtype=np.float64)
+    left_sums = np.asarray(left_sums, dtype=np.float64)
+    lower, upper = wilson_interval(left_sums, counts, z)
+    return pd.DataFrame({
+        "x_value": x_values,
+        "count": counts,
+        "turnover": left_sums / counts,
+        "lower": lower,
+        "upper": upper,
+    })
+
+
+# Fonction pour lire la courbe d'une variable dans le cube, en regroupant `factor` classes de base
+def cube_curve(cube, column, job, factor=1, z=Z_95):
+    rows = cube_rows(cube, column, job)
+    width = CURVE_BIN_WIDTHS[column]
+    bins = rows.index.to_numpy(dtype=np.int64)
+    if factor > 1 and len(bins):
+        coarse = np.floor_divide(bins, factor)
+        first = coarse.min()
+        counts = np.bincount(coarse - first, weights=rows["count"].to_numpy())
+        left_sums = np.bincount(coarse - first, weights=rows["left_sum"].to_numpy())
+        present = np.flatnonzero(counts)
+        return curve_from_counts(
+            bin_centers(present + first, width * factor), counts[present], left_sums[present], z
+        )
+    return curve_from_counts(bin_centers(bins, width), rows["count"], rows["left_sum"], z)
+
+
+# Fonction pour calculer une courbe de turnover binnée directement sur des valeurs brutes :
+# classes de largeur fixe (bin_width) ou classes d'effectifs égaux (n_quantiles)
+def binned_curve(x, left, bin_width=None, n_quantiles=None, z=Z_95):
+    # Type d'origine gardé pour bin_index (précision des valeurs sur les bornes)
+    raw = np.asarray(x)
+    x = raw.astype(np.float64)
+    left = np.asarray(left, dtype=np.float64)
+    if len(x) == 0:
+        return curve_from_counts([], [], [], z)
+
+    if n_quantiles:
+        edges = np.unique(np.quantile(x, np.linspace(0, 1, n_quantiles + 1)))
+        bins = np.searchsorted(edges[1:-1], x, side="right")
+        n_bins = max(len(edges) - 1, 1)
+        counts = np.bincount(bins, minlength=n_bins)
+        sums = np.bincount(bins, weights=x, minlength=n_bins)
+        left_sums = np.bincount(bins, weights=left, minlength=n_bins)
+        present = np.flatnonzero(counts)
+        # Abscisse : moyenne des valeurs de la classe
+        x_values = sums[present] / counts[present]
+        return curve_from_counts(x_values, counts[present], left_sums[present], z)
+
+    bins = bin_index(raw, bin_width)
+    first_bin = bins.min()
+    counts = np.bincount(bins - first_bin)
+    left_sums = np.bincount(bins - first_bin, weights=left)
+    present = np.flatnonzero(counts)
+    return curve_from_counts(
+        bin_centers(present + first_bin, bin_width), counts[present], left_sums[present], z
+    )
+
+
+# Fonction pour calculer un histogramme côté serveur : seuls les bords et effectifs des classes
+# sont envoyés au navigateur. Les variables entières peu variées ont une classe par valeur.
+def compute_histogram(values, nbins=20):
+    values = np.asarray(values)
+    if len(values) == 0:
+        return {"edges": np.array([0.0, 1.0]), "counts": np.zeros(1, dtype=np.int64)}
+
+    low, high = values.min(), values.max()
+    if np.issubdtype(values.dtype, np.integer) and high - low + 1 <= nbins:
+        counts = np.bincount(values.astype(np.int64) - int(low))
+        edges = np.arange(int(low), int(high) + 2, dtype=np.float64) - 0.5
+        return {"edges": edges, "counts": counts}
+
+    counts, edges = np.histogram(values.astype(np.float64), bins=nbins)
+    return {"edges": edges, "counts": counts}
@@ -0,0 +1,453 @@
+# artifacts.py
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+import streamlit as st
+
+# Ce module n'importe que streamlit au chargement : l'accueil peut lancer le préchauffage
+# sans payer l'import de pandas, pyarrow ou sklearn sur son premier rendu.
+
+# Intervalle (secondes) entre deux vérifications des fichiers données et modèle
+WATCH_INTERVAL = float(os.environ.get("TURNOVER_WATCH_INTERVAL", 5))
+# Plafond mémoire (Mo de JSON) du cache des figures Plotly partagé par les sessions
+FIGURE_CACHE_MB = float(os.environ.get("TURNOVER_FIGURE_CACHE_MB", 64))
+# Calculs d'arrière-plan (explications SHAP) : threads dédiés et résultats terminés conservés
+JOB_WORKERS = int(os.environ.get("TURNOVER_JOB_WORKERS", 2))
+JOB_RESULTS = int(os.environ.get("TURNOVER_JOB_RESULTS", 256))
+# Services par micro-lots gardés ouverts par type (modèle servi et précédent, pendant une bascule)
+SERVICE_ENTRIES = int(os.environ.get("TURNOVER_SERVICE_ENTRIES", 2))
+
+
+# ----------------------------
+# Chargement du modèle (une entrée par version du fichier, model_key = nom@empreinte).
+# Le modèle actif est l'artefact promu de TURNOVER_MODEL_DIR (produit par train.py, chargé
+# sans unpickling), sinon le pickle livré. Les autres modèles enregistrés (pickles livrés,
+# artefacts non promus) sont chargés par la même fonction pour la comparaison.
+# ----------------------------
+# Une clé dont le fichier a changé lève StaleVersionError (rien n'est mis en cache).
+@st.cache_resource(max_entries=8)
+def load_model(model_key):
+    from file_formats import StaleVersionError
+    from model_store import load_model_for_key, model_path_for_key
+
+    path = model_path_for_key(model_key)
+    try:
+        return load_model_for_key(model_key)
+    except FileNotFoundError:
+        st.error(f"Le fichier '{path}' n'a pas été trouvé.")
+        return None
+    except StaleVersionError:
+        raise
+    except Exception as e:
+        st.error(f"Erreur lors du chargement du modèle : {e}")
+        return None
+
+
+# Modèles enregistrés (clés de registered_models) utilisables pour le scoring : les modèles
+# illisibles ou sans predict_proba sont écartés
+def load_models(models_key):
+    models = {model_key: load_model(model_key) for model_key in models_key}
+    return {model_key: model for model_key, model in models.items() if model is not None and hasattr(model, "predict_proba")}
+
+
+# ----------------------------
+# Artefacts dérivés, chacun clé par les versions dont il dépend :
+# données -> cube des KPI et index des employés ; données + modèle -> scores -> classement, contrefactuels, SHAP.
+# Le paramètre _update, fourni par l'ingestion d'un delta, permet de dériver l'artefact
+# de celui de la version précédente au lieu de le recalculer sur toute la population.
+# ----------------------------
+# Cube des KPI précalculé par job (une seule fois par version des données)
+# _update = (cube précédent, lignes ajoutées ou modifiées, anciennes versions des lignes modifiées)
+@st.cache_resource(max_entries=4)
+def get_kpi_cube(dataset_key, _df, _update=None):
+    from aggregations import build_kpi_cube, update_kpi_cube
+
+    if _update is not None:
+        cube, added, removed = _update
+        return update_kpi_cube(cube, added=added, removed=removed)
+    return build_kpi_cube(_df)
+
+
+# Historique RH partitionné (TURNOVER_HISTORY_DIR), ouvert une fois par version de ses fichiers
+@st.cache_resource(max_entries=2)
+def get_history(history_key):
+    from history import open_history
+
+    return open_history()
+
+
+# Cube des KPI d'un instantané de l'historique, calculé par scan en flux (jamais chargé en entier)
+@st.cache_resource(max_entries=8)
+def get_history_cube(history_key, snapshot, _dataset):
+    from history import history_kpi_cube
+
+    return history_kpi_cube(_dataset, snapshot)
+
+
+# Index des employés (ID -> ligne, IDs triés pour la recherche), construit une fois par version des données
+# _update = (index précédent, position de la première ligne ajoutée)
+@st.cache_resource(max_entries=4)
+def get_employee_index(dataset_key, _df, _update=None):
+    from data_store import build_employee_index, update_employee_index
+
+    if _update is not None:
+        index, start = _update
+        return update_employee_index(index, _df["id_colab"].to_numpy()[start:], start)
+    return build_employee_index(_df)
+
+
+# Scoring de toute la population (une seule fois par couple données / modèle)
+# _update = (table des scores précédente, positions des lignes modifiées ou ajoutées)
+@st.cache_resource(max_entries=4)
+def get_score_table(dataset_key, model_key, _df, _model, _update=None):
+    from scoring import score_population, update_scores
+
+    if _update is not None:
+        scores, positions = _update
+        return update_scores(scores, _df, positions, _model)
+    return score_population(_df, _model)
+
+
+# Contrefactuels de rétention (forme fermée, modèle logistique ; None sinon), à côté des scores
+# _update = (contrefactuels précédents, positions des lignes modifiées ou ajoutées, anciennes
+# valeurs des lignes modifiées)
+@st.cache_resource(max_entries=4)
+def get_counterfactuals(dataset_key, model_key, _df, _model, _update=None):
+    from counterfactuals import compute_counterfactuals, update_counterfactuals
+
+    if _update is not None:
+        table, positions, removed = _update
+        return update_counterfactuals(table, _df, positions, removed, _model)
+    return compute_counterfactuals(_df, _model)
+
+
+# Classement des employés à risque par job et niveau de risque (une fois par couple données / modèle)
+# _update = (classement précédent, positions des lignes modifiées ou ajoutées)
+@st.cache_resource(max_entries=4)
+def get_leaderboard(dataset_key, model_key, _df, _scores, _update=None):
+    from leaderboard import build_leaderboard, update_leaderboard
+
+    if _update is not None:
+        board, positions = _update
+        return update_leaderboard(board, _df, _scores, positions)
+    return build_leaderboard(_df, _scores)
+
+
+# Valeurs SHAP de toute la population (une seule fois par couple données / modèle)
+@st.cache_resource(max_entries=4)
+def get_shap_table(dataset_key, model_key, _df, _model):
+    from explanations import compute_shap_table
+
+    return compute_shap_table(_df, _model)
+
+
+# Probabilités de tous les modèles enregistrés (une colonne par modèle), en une passe sur la
+# même matrice de features (une fois par couple données / liste des modèles)
+# _update = table de la liste précédente sur les mêmes données : seules les colonnes des
+# modèles ajoutés sont calculées
+@st.cache_resource(max_entries=2)
+def get_model_scores(dataset_key, models_key, _df, _models, _update=None):
+    from scoring import score_models
+
+    return score_models(_df, _models, previous=_update)
+
+
+# Comparaison champion / challenger des modèles enregistrés (AUC, écarts, désaccords par job)
+@st.cache_resource(max_entries=4)
+def get_model_comparison(dataset_key, models_key, champion, _df, _scores):
+    from comparison import compare_models
+
+    return compare_models(_df, _scores, champion)
+
+
+# ----------------------------
+# Services par micro-lots (threads de regroupement et pools), un par clé et par type.
+# st.cache_resource n'appelle pas close() à l'éviction : les services d'un modèle ou de
+# données remplacés sont fermés ici, au-delà de max_entries par type.
+# ----------------------------
+class ServiceRegistry:
+    def __init__(self, max_entries=SERVICE_ENTRIES):
+        self.max_entries = max_entries
+        self._services = {}
+        self._lock = threading.Lock()
+
+    # Service de la clé, créé par make() au premier appel ; ferme les plus anciens du même type
+    def get(self, kind, key, make):
+        with self._lock:
+            services = self._services.setdefault(kind, OrderedDict())
+            service = services.get(key)
+            if service is None:
+                service = services[key] = make()
+            services.move_to_end(key)
+            evicted = [services.popitem(last=False)[1] for _ in range(len(services) - self.max_entries)]
+        for old in evicted:
+            old.close()
+        return service
+
+
+# Un seul registre de services par processus
+@st.cache_resource
+def get_service_registry():
+    return ServiceRegistry()
+
+
+# Service de scoring par micro-lots d'un modèle, partagé par toutes les sessions
+def get_scoring_service(model_key, _model):
+    from scoring import make_scoring_service
+
+    return get_service_registry().get("scoring", model_key, lambda: make_scoring_service(_model))
+
+
+# Cache LRU des figures, commun à toutes les sessions ; les clés portent la version des
+# données, les figures d'une version remplacée sortent du cache au fil des évictions
+@st.cache_resource
+def get_figure_cache():
+    from charts import FigureCache
+
+    return FigureCache(int(FIGURE_CACHE_MB * 2**20))
+
+
+# ----------------------------
+# Calculs d'arrière-plan partagés entre sessions
+# ----------------------------
+# Un job est un générateur qui annonce chaque étape par (avancement entre 0 et 1, libellé)
+# et renvoie son résultat. Il est identifié par une clé : les sessions qui demandent la
+# même clé suivent le même job, et un résultat terminé est resservi sans recalcul.
+class Job:
+    def __init__(self):
+        self.progress = 0.0
+        self.stage = "En attente"
+        self.sessions = set()
+        self.cancelled = threading.Event()
+        self.future = None
+
+
+class BackgroundJobs:
+    def __init__(self, workers=JOB_WORKERS, max_results=JOB_RESULTS):
+        self.max_results = max_results
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="turnover-jobs")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Rejoint le job de la clé, ou le lance ; un job en échec n'est relancé que sur demande (retry)
+    def submit(self, key, session, make_steps, retry=False):
+        with self._lock:
+            job = self._jobs.get(key)
+            failed = job is not None and job.future.done() and job.future.exception() is not None
+            if job is None or job.cancelled.is_set() or (failed and retry):
+                job = Job()
+                job.future = self._pool.submit(self._run, job, make_steps)
+                self._jobs[key] = job
+            self._jobs.move_to_end(key)
+            job.sessions.add(session)
+            self._evict()
+        return job
+
+    # La session ne suit plus le job : annulé s'il n'est pas terminé et que personne d'autre ne l'attend
+    def release(self, key, session):
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None:
+                return
+            job.sessions.discard(session)
+            if not job.sessions and not job.future.done():
+                job.cancelled.set()
+                job.future.cancel()
+                del self._jobs[key]
+
+    # Oublie les plus anciens résultats terminés au-delà de max_results
+    def _evict(self):
+        finished = [key for key, job in self._jobs.items() if job.future.done()]
+        for key in finished[:max(len(finished) - self.max_results, 0)]:
+            del self._jobs[key]
+
+    # Exécute les étapes ; une annulation prend effet entre deux étapes
+    def _run(self, job, make_steps):
+        steps = make_steps()
+        while True:
+            if job.cancelled.is_set():
+                steps.close()
+                raise CancelledError()
+            try:
+                job.progress, job.stage = next(steps)
+            except StopIteration as done:
+                job.progress, job.stage = 1.0, "Terminé"
+                return done.value
+
+
+# Un seul exécuteur de jobs par processus
+@st.cache_resource
+def get_background_jobs():
+    return BackgroundJobs()
+
+
+# ----------------------------
+# Surveillance des fichiers et bascule atomique des versions
+# ----------------------------
+class ArtifactWatcher:
+    def __init__(self, interval=WATCH_INTERVAL):
+        self.interval = interval
+        # Versions servies aux pages ; le dictionnaire est remplacé en bloc, jamais modifié
+        self._versions = None
+        self._ready = threading.Event()
+        self.status = {"building": None, "last_swap": None, "last_error": None}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="turnover-watcher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    # Versions à utiliser pendant tout un rerun : une page lit ce couple une seule fois,
+    # ainsi données, modèle et artefacts dérivés restent cohérents même si une bascule a lieu
+    def versions(self):
+        self._ready.wait()
+        return self._versions
+
+    # Empreintes actuelles des fichiers (None pour un fichier absent) ; "base" est l'empreinte
+    # du CSV de base, "deltas" liste les fichiers delta dont la version des données tient compte,
+    # "models" les modèles enregistrés pour la comparaison
+    def fingerprints(self):
+        from data_store import dataset_version
+        from model_store import model_version, registered_models
+
+        versions = {}
+        try:
+            versions["dataset"], versions["base"], versions["deltas"] = dataset_version()
+        except FileNotFoundError:
+            versions["dataset"], versions["base"], versions["deltas"] = None, None, ()
+        try:
+            versions["model"] = model_version()
+        except FileNotFoundError:
+            versions["model"] = None
+        versions["models"] = registered_models()
+        return versions
+
+    # Applique les nouveaux deltas à la version servie : données, index, cube, scores, classement
+    # et contrefactuels
+    # sont dérivés de ceux de la version précédente, pour un coût proportionnel au delta
+    # (hors recopie des colonnes du DataFrame). Seules les lignes modifiées sont rescorées.
+    def ingest(self, previous, versions):
+        import numpy as np
+
+        from data_store import apply_delta, load_data, read_deltas
+
+        df = load_data(previous["dataset"])
+        index = get_employee_index(previous["dataset"], df)
+        delta = read_deltas([path for path, _ in versions["deltas"][len(previous["deltas"]):]])
+        change = apply_delta(df, delta, index["positions"])
+        changed = np.concatenate([change["updated"], change["appended"]])
+
+        new_key = versions["dataset"]
+        new_df = load_data(new_key, _ingested=change["df"])
+        get_employee_index(new_key, new_df, _update=(index, len(df)))
+        get_kpi_cube(new_key, new_df, _update=(
+            get_kpi_cube(previous["dataset"], df), new_df.iloc[changed], change["removed"],
+        ))
+        if versions["model"] == previous["model"]:
+            model = load_model(versions["model"])
+            if model is not None and hasattr(model, "predict_proba"):
+                scores = get_score_table(previous["dataset"], versions["model"], df, model)
+                new_scores = get_score_table(new_key, versions["model"], new_df, model, _update=(scores, changed))
+                board = get_leaderboard(previous["dataset"], versions["model"], df, scores)
+                get_leaderboard(new_key, versions["model"], new_df, new_scores, _update=(board, changed))
+                counterfactuals = get_counterfactuals(previous["dataset"], versions["model"], df, model)
+                get_counterfactuals(new_key, versions["model"], new_df, model, _update=(
+                    counterfactuals, changed, change["removed"],
+                ))
+
+    # Construit les artefacts d'un couple de versions dans l'ordre des dépendances.
+    # Les artefacts dont les versions n'ont pas changé sont des lectures de cache :
+    # seul ce qui dépend du fichier modifié est recalculé.
+    def build(self, versions, previous=None):
+        from data_store import extends_version, load_data
+        from explanations import is_linear_model
+        from file_formats import StaleVersionError
+
+        self.status["building"] = versions
+        try:
+            # Nouveaux deltas sur la même base : mise à jour incrémentale
+            incremental = previous is not None and extends_version(previous, versions)
+            if incremental:
+                try:
+                    self.ingest(previous, versions)
+                except StaleVersionError:
+                    # Version précédente évincée du cache : reconstruction complète
+                    incremental = False
+            df = load_data(versions["dataset"])
+            if df.empty:
+                self.status["last_error"] = "Données vides ou illisibles"
+                return False
+            get_kpi_cube(versions["dataset"], df)
+            get_employee_index(versions["dataset"], df)
+
+            model = load_model(versions["model"])
+            if model is None or not hasattr(model, "predict_proba"):
+                self.status["last_error"] = "Modèle illisible ou sans predict_proba"
+                return False
+            scores = get_score_table(versions["dataset"], versions["model"], df, model)
+            get_leaderboard(versions["dataset"], versions["model"], df, scores)
+            get_counterfactuals(versions["dataset"], versions["model"], df, model)
+            # Un modèle enregistré de plus sur les mêmes données : une colonne de plus
+            previous_scores = None
+            if previous is not None and previous["dataset"] == versions["dataset"]:
+                try:
+                    previous_scores = get_model_scores(
+                        previous["dataset"], previous["models"], df, load_models(previous["models"])
+                    )
+                except StaleVersionError:
+                    previous_scores = None
+            get_model_scores(
+                versions["dataset"], versions["models"], df, load_models(versions["models"]), _update=previous_scores
+            )
+            # Valeurs SHAP linéaires relatives à la moyenne de la population : un delta les
+            # décale toutes, elles sont recalculées au premier affichage plutôt qu'ici
+            if is_linear_model(model) and not incremental:
+                get_shap_table(versions["dataset"], versions["model"], df, model)
+            self.status["last_error"] = None
+            return True
+        except Exception as e:
+            self.status["last_error"] = f"{type(e).__name__}: {e}"
+            return False
+        finally:
+            self.status["building"] = None
+
+    def _run(self):
+        # Empreintes lues dans le thread : l'accueil n'importe pas data_store (pandas, pyarrow)
+        try:
+            self._versions = self.fingerprints()
+        finally:
+            self._ready.set()
+        # Préchauffage des versions présentes au démarrage
+        self.build(self._versions)
+        pending = None
+        while not self._stop.wait(self.interval):
+            seen = self.fingerprints()
+            if seen == self._versions or None in seen.values():
+                pending = None
+                continue
+            # Un fichier en cours de copie change encore : on attend deux relevés identiques
+            if seen != pending:
+                pending = seen
+                continue
+            # Bascule seulement quand tout est prêt ; sinon l'ancienne version reste servie
+            if self.build(seen, previous=self._versions):
+                self._versions = seen
+                self.status["last_swap"] = time.time()
+            pending = None
+
+
+# Lance le surveillant une seule fois par processus, dès la première page rendue
+# (en général l'accueil) : il préchauffe les artefacts, puis reconstruit en arrière-plan
+# ceux d'un nouveau fichier données ou modèle avant de basculer les pages dessus.
+# Les caches Streamlit verrouillent chaque clé : une page qui arrive pendant le
+# préchauffage attend le même calcul au lieu de le refaire.
+@st.cache_resource
+def start_background_warmup():
+    return ArtifactWatcher().start()
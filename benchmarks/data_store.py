@@ -0,0 +1,94 @@
+# benchmarks/data_store.py
+# Démarrage à froid et mémoire résidente : CSV pandas (chemin historique, une copie par page)
+# contre fichier Arrow mappé en mémoire partagé.
+# Usage : python -m benchmarks.data_store [--sizes 10000 1000000 10000000] [--output chemin.json]
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import WORK_DIR, ensure_dataset
+
+DEFAULT_SIZES = [10_000, 1_000_000, 10_000_000]
+
+
+# Mémoire résidente actuelle du processus, en Mo
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+# Mesure exécutée dans un processus neuf : temps de chargement et mémoire ajoutée
+def measure(mode, csv_path):
+    import pyarrow  # noqa: F401  (importé avant la mesure de base, comme dans l'app)
+
+    from data_store import arrow_path_for, convert_csv_to_arrow, open_arrow
+
+    base = rss_mb()
+    start = time.perf_counter()
+    if mode == "csv":
+        df = pd.read_csv(csv_path)
+    elif mode == "convert":
+        convert_csv_to_arrow(csv_path)
+        return {"seconds": time.perf_counter() - start}
+    else:
+        df = open_arrow(arrow_path_for(csv_path))
+    seconds = time.perf_counter() - start
+    loaded = rss_mb() - base
+
+    # On touche toutes les colonnes numériques pour forcer la lecture des pages mappées
+    for column in df.select_dtypes("number"):
+        df[column].sum()
+    touched = rss_mb() - base
+    return {"seconds": seconds, "rss_loaded_mb": loaded, "rss_touched_mb": touched}
+
+
+def run_child(mode, csv_path):
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.data_store", "--measure", mode, csv_path],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du stockage des données employés")
+    parser.add_argument("--source", default="df_model.csv")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--measure", nargs=2, metavar=("MODE", "CSV"), help=argparse.SUPPRESS)
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "data_store.json"))
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(*args.measure)))
+        return
+
+    os.makedirs(WORK_DIR, exist_ok=True)
+    results = []
+    for n_rows in args.sizes:
+        csv_path = ensure_dataset(args.source, n_rows)
+        csv = run_child("csv", csv_path)
+        convert = run_child("convert", csv_path)
+        arrow = run_child("arrow", csv_path)
+        results.append({
+            "rows": n_rows,
+            "csv_load_s": csv["seconds"],
+            # Chemin historique : chaque page garde sa propre copie du DataFrame
+            "csv_rss_mb_two_pages": 2 * csv["rss_touched_mb"],
+            "arrow_convert_s": convert["seconds"],
+            "arrow_open_s": arrow["seconds"],
+            "arrow_rss_loaded_mb": arrow["rss_loaded_mb"],
+            "arrow_rss_touched_mb": arrow["rss_touched_mb"],
+        })
+        print(json.dumps(results[-1]))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
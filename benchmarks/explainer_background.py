@@ -0,0 +1,80 @@
+# benchmarks/explainer_background.py
+# Compromis précision / latence de l'explainer SHAP selon la taille du fond résumé.
+# Usage : python -m benchmarks.explainer_background [--rows 20] [--output chemin.json]
+import argparse
+import json
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from explanations import build_explainer, summarize_background
+from scoring import model_features
+
+BACKGROUND_SIZES = [10, 100, 1000]
+METHODS = ["stratified", "kmeans"]
+
+
+# Mesure la construction de l'explainer et l'explication de X pour un fond donné
+def run_case(model, background, X):
+    start = time.perf_counter()
+    explainer = build_explainer(model, background, model_agnostic=True)
+    build_s = time.perf_counter() - start
+    explainer(X.iloc[:1])  # échauffement
+
+    start = time.perf_counter()
+    values = explainer(X).values
+    explain_s = time.perf_counter() - start
+    return values, build_s, explain_s / len(X)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compromis précision / latence du fond SHAP résumé")
+    parser.add_argument("--data", default="df_model.csv")
+    parser.add_argument("--model", default="logistic_model.pkl")
+    parser.add_argument("--rows", type=int, default=20, help="Nombre d'employés expliqués")
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "explainer_background.json"))
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data)
+    with open(args.model, "rb") as f:
+        model = pickle.load(f)
+    X = df[model_features].sample(args.rows, random_state=0)
+
+    # Référence : fond complet (coût proportionnel à la taille des données)
+    baseline, build_s, per_row_s = run_case(model, df[model_features], X)
+    results = [{
+        "method": "full",
+        "background_size": len(df),
+        "build_s": build_s,
+        "explain_ms_per_row": per_row_s * 1000,
+        "max_abs_error": 0.0,
+        "mean_abs_error": 0.0,
+    }]
+
+    for method in METHODS:
+        for size in BACKGROUND_SIZES:
+            background = summarize_background(df, size=size, method=method)
+            values, build_s, per_row_s = run_case(model, background, X)
+            error = np.abs(values - baseline)
+            results.append({
+                "method": method,
+                "background_size": size,
+                "build_s": build_s,
+                "explain_ms_per_row": per_row_s * 1000,
+                "max_abs_error": float(error.max()),
+                "mean_abs_error": float(error.mean()),
+            })
+
+    report = pd.DataFrame(results)
+    print(report.to_string(index=False, float_format=lambda v: f"{v:.4g}"))
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"rows_explained": args.rows, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
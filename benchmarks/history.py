@@ -0,0 +1,137 @@
+# benchmarks/history.py
+# Requêtes du Dashboard sur un historique RH synthétique (50 instantanés mensuels d'un million
+# d'employés, soit 50M lignes en Parquet partitionné) : temps et pic de mémoire résidente des
+# scans en flux, comparés au chargement complet de l'historique dans pandas (--pandas-baseline).
+# Chaque requête tourne dans un processus neuf pour mesurer son propre pic de mémoire.
+# Usage : python -m benchmarks.history [--snapshots 50] [--rows-per-snapshot 1000000] [--pandas-baseline]
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import WORK_DIR, generate_chunks
+
+QUERIES = ["snapshots", "cube_snapshot", "cube_all", "histogram_job", "density_job"]
+# Job filtré par les requêtes "_job" (le plus représenté dans df_model.csv)
+BENCH_JOB = "sales"
+
+
+# Libellé du i-ème instantané mensuel (2021-01, 2021-02, ...)
+def snapshot_label(i, first_year=2021):
+    return f"{first_year + i // 12}-{i % 12 + 1:02d}"
+
+
+# Fonction pour écrire l'historique synthétique, un instantané à la fois (déjà écrits : conservés)
+def ensure_history(source_csv, history_dir, n_snapshots, rows_per_snapshot):
+    from history import SNAPSHOT_COLUMN, write_snapshot
+
+    source = pd.read_csv(source_csv)
+    for i in range(n_snapshots):
+        label = snapshot_label(i)
+        if os.path.exists(os.path.join(history_dir, f"{SNAPSHOT_COLUMN}={label}", "part-0.parquet")):
+            continue
+        snapshot = pd.concat(generate_chunks(source, rows_per_snapshot, seed=i), ignore_index=True)
+        write_snapshot(snapshot, label, history_dir)
+    return history_dir
+
+
+# Mémoire résidente actuelle du processus, en Mo
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+# Pic de mémoire résidente (VmHWM) du processus, en Mo. Le pic est remis à zéro avant chaque
+# mesure : ru_maxrss hériterait sinon du pic du processus parent, conservé à travers exec.
+def peak_rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def reset_peak_rss():
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+
+
+# Mesure exécutée dans un processus neuf : durée de la requête et pic de mémoire ajouté
+def measure(query, history_dir):
+    import history as hist
+    from aggregations import build_kpi_cube
+
+    dataset = hist.open_history(history_dir)
+    latest = hist.list_snapshots(dataset)[-1]
+    queries = {
+        "snapshots": lambda: hist.list_snapshots(dataset),
+        "cube_snapshot": lambda: hist.history_kpi_cube(dataset, latest),
+        "cube_all": lambda: hist.history_kpi_cube(dataset),
+        "histogram_job": lambda: hist.history_histogram(dataset, "satisfaction_level", latest, BENCH_JOB),
+        "density_job": lambda: hist.history_density(
+            dataset, "satisfaction_level", "average_montly_hours", latest, BENCH_JOB
+        ),
+        # Chemin pandas : tout l'historique en mémoire, puis filtre et cube sur le DataFrame
+        "pandas": lambda: build_kpi_cube(
+            (lambda df: df[df[hist.SNAPSHOT_COLUMN] == latest])(dataset.to_table().to_pandas())
+        ),
+    }
+    # Mémoire de base : modules importés et historique ouvert (l'état d'une page déjà chargée)
+    base = rss_mb()
+    reset_peak_rss()
+    start = time.perf_counter()
+    queries[query]()
+    seconds = time.perf_counter() - start
+    return {"seconds": seconds, "rss_base_mb": base, "peak_rss_added_mb": max(peak_rss_mb() - base, 0.0)}
+
+
+def run_child(query, history_dir):
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.history", "--measure", query, history_dir],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des requêtes sur l'historique partitionné")
+    parser.add_argument("--source", default="df_model.csv")
+    parser.add_argument("--snapshots", type=int, default=50)
+    parser.add_argument("--rows-per-snapshot", type=int, default=1_000_000)
+    parser.add_argument("--history-dir", default=os.path.join(WORK_DIR, "history"))
+    parser.add_argument("--pandas-baseline", action="store_true", help="Mesure aussi le chargement complet")
+    parser.add_argument("--measure", nargs=2, metavar=("QUERY", "DIR"), help=argparse.SUPPRESS)
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "history.json"))
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(*args.measure)))
+        return
+
+    start = time.perf_counter()
+    ensure_history(args.source, args.history_dir, args.snapshots, args.rows_per_snapshot)
+    print(json.dumps({"write_s": time.perf_counter() - start}))
+
+    total_bytes = sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(args.history_dir) for name in files
+    )
+    queries = QUERIES + (["pandas"] if args.pandas_baseline else [])
+    results = []
+    for query in queries:
+        result = {"rows": args.snapshots * args.rows_per_snapshot, "parquet_mb": total_bytes / 2**20, "query": query}
+        result.update(run_child(query, args.history_dir))
+        results.append(result)
+        print(json.dumps(result))
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
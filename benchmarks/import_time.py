@@ -0,0 +1,120 @@
+# benchmarks/import_time.py
+# Coût d'import par module et démarrage à froid de la page Prédiction, régénérable pour
+# détecter les régressions (--baseline compare à un rapport précédent).
+# Usage : python -m benchmarks.import_time [--output chemin.json] [--baseline ancien.json]
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+# Imports de premier niveau de pages/2_Prediction.py (chemin critique du premier rendu)
+PAGE_IMPORTS = [
+    "streamlit",
+    "pandas",
+    "plotly.graph_objects",
+    "streamlit.components.v1",
+    "aggregations",
+    "artifacts",
+    "charts",
+    "data_store",
+    "counterfactuals",
+    "explanations",
+    "scoring",
+    "instrumentation",
+    "what_if",
+]
+# Imports différés : chargés seulement quand leur section est utilisée
+DEFERRED_IMPORTS = ["shap", "sklearn.linear_model", "scipy.special"]
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+COLD_START = """
+import time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("pages/2_Prediction.py", default_timeout=600)
+at.run()
+first = time.perf_counter() - start
+start = time.perf_counter()
+at.run()
+print(first, time.perf_counter() - start, len(at.exception))
+"""
+
+
+def _top_level_costs(code):
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, check=True,
+    ).stderr
+    costs = {}
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match and len(match.group(3)) == 1:  # un seul espace : import de premier niveau
+            package = match.group(4).split(".")[0]
+            costs[package] = costs.get(package, 0.0) + int(match.group(2)) / 1000
+    return costs
+
+
+# Exécute `import modules` dans un processus neuf avec -X importtime ; retourne le coût
+# cumulé (ms) de chaque paquet de premier niveau, hors imports du démarrage de l'interpréteur.
+# Un paquet partagé est compté chez le premier module qui l'importe.
+def import_costs(modules):
+    startup = _top_level_costs("pass")
+    costs = _top_level_costs("; ".join(f"import {module}" for module in modules))
+    costs = {package: cost for package, cost in costs.items() if package not in startup}
+    return dict(sorted(costs.items(), key=lambda item: -item[1]))
+
+
+def cold_start():
+    output = subprocess.run(
+        [sys.executable, "-c", COLD_START], capture_output=True, text=True, check=True,
+    ).stdout.split()
+    return {"first_run_s": float(output[0]), "warm_rerun_s": float(output[1]), "exceptions": int(output[2])}
+
+
+# Liste des écarts au-delà de la tolérance relative par rapport au rapport de référence
+def regressions(report, baseline, tolerance, min_ms=5.0):
+    found = []
+    for package, cost in report["page_imports_ms"].items():
+        before = baseline.get("page_imports_ms", {}).get(package, 0.0)
+        if cost > min_ms and cost > before * (1 + tolerance):
+            found.append(f"import {package}: {before:.1f} -> {cost:.1f} ms")
+    before = baseline.get("cold_start", {}).get("first_run_s")
+    after = report["cold_start"]["first_run_s"]
+    if before and after > before * (1 + tolerance):
+        found.append(f"démarrage à froid : {before:.2f} -> {after:.2f} s")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rapport de temps d'import et de démarrage à froid")
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "import_time.json"))
+    parser.add_argument("--baseline", help="Rapport précédent à comparer")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Hausse relative tolérée")
+    args = parser.parse_args()
+
+    report = {
+        "python": sys.version.split()[0],
+        "page_imports_ms": import_costs(PAGE_IMPORTS),
+        "deferred_imports_ms": import_costs(DEFERRED_IMPORTS),
+        "cold_start": cold_start(),
+    }
+    report["page_imports_total_ms"] = sum(report["page_imports_ms"].values())
+    print(json.dumps(report, indent=2))
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            found = regressions(report, json.load(f), args.tolerance)
+        for line in found:
+            print(f"RÉGRESSION {line}")
+        sys.exit(1 if found else 0)
+
+
+if __name__ == "__main__":
+    main()
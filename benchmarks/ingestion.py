@@ -0,0 +1,95 @@
+# benchmarks/ingestion.py
+# Coût d'ingestion d'un delta RH (upsert sur id_colab) : mise à jour incrémentale des données,
+# de l'index, du cube des KPI et des scores, comparée à un rechargement et rescoring complets.
+# Usage : python -m benchmarks.ingestion [--rows 100000 1000000 10000000] [--delta-rows 1000 10000]
+import argparse
+import json
+import os
+import pickle
+import time
+
+import numpy as np
+
+from aggregations import build_kpi_cube, update_kpi_cube
+from benchmarks.synthetic import ensure_dataset
+from data_store import (
+    apply_delta, arrow_path_for, build_employee_index, convert_csv_to_arrow, open_arrow,
+    update_employee_index,
+)
+from scoring import score_population, update_scores
+
+# Part des lignes d'un delta qui sont des embauches (le reste : mises à jour et départs)
+NEW_HIRE_SHARE = 0.2
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+# Fonction pour fabriquer un delta : lignes existantes modifiées (satisfaction, évaluation,
+# départs) et nouvelles embauches copiées de lignes existantes avec des IDs neufs
+def make_delta(df, n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    n_new = int(n_rows * NEW_HIRE_SHARE)
+    delta = df.iloc[rng.choice(len(df), n_rows, replace=False)].reset_index(drop=True)
+    updates = slice(n_new, None)
+    n_updates = n_rows - n_new
+    delta.loc[updates, "satisfaction_level"] = (rng.integers(9, 101, n_updates) / 100).astype(np.float32)
+    delta.loc[updates, "last_evaluation"] = (rng.integers(36, 101, n_updates) / 100).astype(np.float32)
+    delta.loc[updates, "left"] = np.maximum(delta.loc[updates, "left"], rng.random(n_updates) < 0.05).astype(np.int8)
+    delta.loc[:n_new - 1, "id_colab"] = (df["id_colab"].max() + 1 + np.arange(n_new)).astype(np.int32)
+    return delta
+
+
+def measure(df, model, delta):
+    index = build_employee_index(df)
+    cube = build_kpi_cube(df)
+    scores = score_population(df, model)
+
+    apply_s, change = timed(lambda: apply_delta(df, delta, index["positions"]))
+    new_df = change["df"]
+    changed = np.concatenate([change["updated"], change["appended"]])
+    index_s, _ = timed(lambda: update_employee_index(index, new_df["id_colab"].to_numpy()[len(df):], len(df)))
+    cube_s, _ = timed(lambda: update_kpi_cube(cube, added=new_df.iloc[changed], removed=change["removed"]))
+    scores_s, _ = timed(lambda: update_scores(scores, new_df, changed, model))
+
+    full_index_s, _ = timed(lambda: build_employee_index(new_df))
+    full_cube_s, _ = timed(lambda: build_kpi_cube(new_df))
+    full_scores_s, _ = timed(lambda: score_population(new_df, model))
+    incremental = {"apply_delta_s": apply_s, "index_s": index_s, "kpi_cube_s": cube_s, "scores_s": scores_s}
+    full = {"index_s": full_index_s, "kpi_cube_s": full_cube_s, "scores_s": full_scores_s}
+    incremental["total_s"] = sum(incremental.values())
+    full["total_s"] = sum(full.values())
+    return {"incremental": incremental, "full_rebuild_excluding_reload": full}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'ingestion incrémentale des deltas RH")
+    parser.add_argument("--source", default="df_model.csv")
+    parser.add_argument("--model", default="logistic_model.pkl")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--delta-rows", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "ingestion.json"))
+    args = parser.parse_args()
+
+    with open(args.model, "rb") as f:
+        model = pickle.load(f)
+    results = []
+    for n_rows in args.rows:
+        csv_path = ensure_dataset(args.source, n_rows)
+        reload_s, df = timed(lambda: open_arrow(convert_csv_to_arrow(csv_path, arrow_path_for(csv_path))))
+        for delta_rows in args.delta_rows:
+            result = {"rows": n_rows, "delta_rows": delta_rows, "full_reload_s": reload_s}
+            result.update(measure(df, model, make_delta(df, delta_rows)))
+            results.append(result)
+            print(json.dumps(result))
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# benchmarks/load_test.py
+# Test de charge du scoring partagé : N sessions simulées (une par thread, comme les
+# sessions Streamlit) demandent chacune des scores ou explications d'un employé, soit par
+# appels directs au modèle, soit via le service micro-lots. Rapporte le débit et les
+# latences p50/p95/p99 par mode.
+# Usage : python -m benchmarks.load_test [--sessions 1 10 50] [--requests 200] [--target score|shap]
+import argparse
+import json
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_store import arrow_path_for, convert_csv_to_arrow, open_arrow
+from scoring import MicroBatcher, make_scoring_service, model_features
+
+PERCENTILES = [50, 95, 99]
+
+
+# Appels d'une cible selon le mode : direct (un appel par demande, dans le thread de la
+# session) ou micro-lots (une demande soumise au service, on attend son Future)
+def make_callers(target, model, df):
+    if target == "score":
+        def direct(row):
+            return model.predict_proba(pd.DataFrame(row, columns=model_features))[:, 1]
+
+        service = make_scoring_service(model)
+    else:
+        from explanations import build_explainer, summarize_background
+
+        # Explainer par permutation : le cas des modèles non linéaires sur la page
+        explainer = build_explainer(model, summarize_background(df), model_agnostic=True)
+        lock = threading.Lock()
+
+        def direct(row):
+            with lock:
+                return explainer(pd.DataFrame(row, columns=model_features))
+
+        service = MicroBatcher(
+            lambda X: explainer(pd.DataFrame(X, columns=model_features)), workers=1, name="turnover-shap",
+        )
+    return {"direct": direct, "batched": lambda row: service.submit(row).result()}, service
+
+
+# Fonction pour simuler n_sessions sessions qui enchaînent n_requests demandes chacune
+def run_sessions(call, X, n_sessions, n_requests, seed=0):
+    latencies = [[] for _ in range(n_sessions)]
+    barrier = threading.Barrier(n_sessions + 1)
+
+    def session(i):
+        rng = np.random.default_rng(seed + i)
+        rows = rng.integers(0, len(X), n_requests)
+        barrier.wait()
+        for position in rows:
+            start = time.perf_counter()
+            call(X[position:position + 1])
+            latencies[i].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(n_sessions)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.concatenate(latencies) * 1e3
+    result = {"requests_per_s": len(latencies_ms) / elapsed}
+    for q, value in zip(PERCENTILES, np.percentile(latencies_ms, PERCENTILES)):
+        result[f"p{q}_ms"] = float(value)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge du scoring par micro-lots")
+    parser.add_argument("--data", default="df_model.csv")
+    parser.add_argument("--model", default="logistic_model.pkl")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--requests", type=int, default=200, help="Demandes par session")
+    parser.add_argument("--target", choices=["score", "shap"], default="score")
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "load_test.json"))
+    args = parser.parse_args()
+
+    with open(args.model, "rb") as f:
+        model = pickle.load(f)
+    df = open_arrow(convert_csv_to_arrow(args.data, arrow_path_for(args.data)))
+    X = df[model_features].to_numpy(dtype=np.float64)
+    callers, service = make_callers(args.target, model, df)
+
+    results = []
+    for n_sessions in args.sessions:
+        for mode, call in callers.items():
+            call(X[:1])  # échauffement (premier appel de l'explainer, threads du pool)
+            before = dict(service.stats)
+            result = {"target": args.target, "sessions": n_sessions, "mode": mode}
+            result.update(run_sessions(call, X, n_sessions, args.requests))
+            if mode == "batched":
+                batches = service.stats["batches"] - before["batches"]
+                result["mean_batch_rows"] = (service.stats["rows"] - before["rows"]) / max(batches, 1)
+            results.append(result)
+            print(json.dumps(result))
+    service.close()
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
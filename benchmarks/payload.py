@@ -0,0 +1,71 @@
+# benchmarks/payload.py
+# Octets de spécification Plotly envoyés par rerun (ce que st.plotly_chart sérialise dans le websocket)
+# pour les histogrammes : binning navigateur (avant) contre binning serveur (après).
+# Usage : python -m benchmarks.payload [--rows 10051 1000000] [--output chemin.json]
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from aggregations import compute_histogram
+from charts import histogram_figure, histogram_trace
+from scoring import model_features
+
+DASHBOARD_HISTOGRAMS = {"left": None, "satisfaction_level": 20, "average_montly_hours": 20}
+
+
+def spec_bytes(fig):
+    return len(pio.to_json(fig, validate=False).encode("utf-8"))
+
+
+# Histogrammes du Dashboard (expanders KPI) et des 7 graphiques de dispersion de la page Prédiction
+def rerun_bytes(df, server_side):
+    dashboard = 0
+    for feature, nbins in DASHBOARD_HISTOGRAMS.items():
+        if server_side:
+            fig = histogram_figure(compute_histogram(df[feature].to_numpy(), nbins or 2), feature, feature)
+        else:
+            fig = px.histogram(df, x=feature, nbins=nbins)
+        dashboard += spec_bytes(fig)
+
+    prediction = 0
+    for feature in model_features:
+        if server_side:
+            trace = histogram_trace(compute_histogram(df[feature].to_numpy(), 20), marker_color="lightblue")
+        else:
+            trace = go.Histogram(x=df[feature], nbinsx=20, marker_color="lightblue")
+        prediction += spec_bytes(go.Figure(trace))
+    return {"dashboard_bytes": dashboard, "prediction_bytes": prediction}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Octets de payload Plotly par rerun")
+    parser.add_argument("--data", default="df_model.csv")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_051, 1_000_000])
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "payload.json"))
+    args = parser.parse_args()
+
+    source = pd.read_csv(args.data)
+    rng = np.random.default_rng(0)
+    results = []
+    for n_rows in args.rows:
+        df = source if n_rows == len(source) else source.iloc[rng.integers(0, len(source), n_rows)]
+        results.append({
+            "rows": n_rows,
+            "before": rerun_bytes(df, server_side=False),
+            "after": rerun_bytes(df, server_side=True),
+        })
+        print(json.dumps(results[-1]))
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# benchmarks/scoring_kernel.py
+# Latence unitaire et débit en lot du noyau NumPy comparés à predict_proba de sklearn.
+# Usage : python -m benchmarks.scoring_kernel [--batch-rows 2000000] [--output chemin.json]
+import argparse
+import json
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from scoring import make_scorer, model_features
+
+
+# Meilleur temps moyen par appel sur quelques répétitions
+def best_time(fn, number, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du noyau de scoring")
+    parser.add_argument("--data", default="df_model.csv")
+    parser.add_argument("--model", default="logistic_model.pkl")
+    parser.add_argument("--batch-rows", type=int, default=2_000_000)
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "scoring_kernel.json"))
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data)
+    with open(args.model, "rb") as f:
+        model = pickle.load(f)
+    scorer = make_scorer(model)
+
+    X_df = df[model_features]
+    row_df = X_df.iloc[:1]
+    row = X_df.iloc[0].tolist()
+    reps = -(-args.batch_rows // len(X_df))
+    X_batch = np.tile(X_df.to_numpy(dtype=np.float64), (reps, 1))[:args.batch_rows]
+
+    results = {
+        "scorer": type(scorer).__name__,
+        "single_row_us": {
+            "sklearn_predict_proba": best_time(lambda: model.predict_proba(row_df), 200) * 1e6,
+            "kernel_score_one": best_time(lambda: scorer.score_one(row), 20_000) * 1e6,
+        },
+        "batch_rows": args.batch_rows,
+        "batch_rows_per_s": {
+            "sklearn_predict_proba": args.batch_rows / best_time(
+                lambda: model.predict_proba(pd.DataFrame(X_batch, columns=model_features)), 1, repeat=3
+            ),
+            "kernel_score": args.batch_rows / best_time(lambda: scorer.score(X_batch), 1, repeat=3),
+        },
+    }
+    print(json.dumps(results, indent=2))
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+# benchmarks/suite.py
+# Suite de benchmarks de bout en bout sur des jeux synthétiques de taille croissante :
+# chargement, scoring unitaire et en lot, SHAP, agrégations du Dashboard et construction
+# des figures. Chaque taille est mesurée dans un processus neuf ; le rapport JSON porte
+# l'environnement (machine, versions, commit) pour comparer les exécutions dans le temps.
+# Usage : python -m benchmarks.suite [--rows 10000 100000 1000000 10000000] [--baseline ancien.json]
+import argparse
+import datetime
+import json
+import os
+import pickle
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import DEFAULT_SIZES, ensure_dataset
+
+# Nombre d'employés expliqués un par un par l'explainer SHAP
+EXPLAINED_ROWS = 10
+# Part de lignes ajoutées lors de la mise à jour incrémentale du cube
+UPDATE_FRACTION = 0.01
+
+
+# Mémoire résidente actuelle du processus, en Mo
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+# Meilleur temps (s) sur `repeat` exécutions, et résultat de la dernière
+def timed(fn, repeat=1):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+# Meilleur temps moyen par appel (µs) pour les opérations unitaires
+def per_call_us(fn, number, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best * 1e6
+
+
+def bench_load(csv_path):
+    from data_store import arrow_path_for, convert_csv_to_arrow, open_arrow
+
+    base = rss_mb()
+    convert_s, arrow_path = timed(lambda: convert_csv_to_arrow(csv_path, arrow_path_for(csv_path)))
+    open_s, df = timed(lambda: open_arrow(arrow_path))
+    return df, {"convert_csv_to_arrow_s": convert_s, "open_arrow_s": open_s, "rss_mb": rss_mb() - base}
+
+
+def bench_scoring(df, model, repeat):
+    import pandas as pd
+
+    from data_store import build_employee_index, employee_position
+    from scoring import make_scorer, model_features, score_population
+
+    scorer = make_scorer(model)
+    index = build_employee_index(df)
+    features = df[model_features]
+    employee_id = int(df["id_colab"].iloc[len(df) // 2])
+
+    # Chemin de la page : recherche de la ligne dans l'index puis score d'une seule ligne
+    def score_employee():
+        position = employee_position(index, employee_id)
+        return scorer.score_one(features.iloc[position].tolist())
+
+    row_df = pd.DataFrame([features.iloc[0]], columns=model_features)
+    batch_s, scores = timed(lambda: score_population(df, model), repeat)
+    return scores, {
+        "scorer": type(scorer).__name__,
+        "single_row_us": per_call_us(score_employee, 2_000),
+        "sklearn_single_row_us": per_call_us(lambda: model.predict_proba(row_df), 200),
+        "batch_s": batch_s,
+        "batch_rows_per_s": len(df) / batch_s,
+    }
+
+
+def bench_shap(df, model):
+    from explanations import build_explainer, compute_shap_table, summarize_background
+    from scoring import model_features
+
+    # Import de shap mesuré à part : il dominerait sinon la construction de l'explainer
+    start = time.perf_counter()
+    import shap  # noqa: F401
+    import_s = time.perf_counter() - start
+
+    table_s, _ = timed(lambda: compute_shap_table(df, model))
+    summarize_s, background = timed(lambda: summarize_background(df))
+    build_s, explainer = timed(lambda: build_explainer(model, background))
+    X = df[model_features].iloc[:EXPLAINED_ROWS]
+    explainer(X.iloc[:1])  # échauffement
+    explain_s, _ = timed(lambda: explainer(X))
+    return {
+        "import_shap_s": import_s,
+        "population_table_s": table_s,
+        "summarize_background_s": summarize_s,
+        "build_explainer_s": build_s,
+        "explain_one_ms": explain_s / len(X) * 1e3,
+    }
+
+
+def bench_aggregations(df, scores, repeat):
+    from aggregations import (
+        ALL_JOBS, CURVE_BIN_WIDTHS, binned_curve, build_kpi_cube, compute_histogram,
+        cube_curve, kpi_values, update_kpi_cube,
+    )
+    from data_store import build_employee_index, search_employees
+    from scoring import model_features
+
+    cube_s, cube = timed(lambda: build_kpi_cube(df), repeat)
+    added = df.iloc[:max(1, int(len(df) * UPDATE_FRACTION))]
+    update_s, _ = timed(lambda: update_kpi_cube(cube, added=added), repeat)
+
+    def read_cube():
+        kpi_values(cube, ALL_JOBS)
+        for column in CURVE_BIN_WIDTHS:
+            cube_curve(cube, column, ALL_JOBS, factor=2)
+
+    def histograms():
+        for feature in model_features:
+            compute_histogram(df[feature].to_numpy(), 20)
+
+    index_s, index = timed(lambda: build_employee_index(df), repeat)
+    risk_levels = scores["risk_level"].array
+    return {
+        "build_kpi_cube_s": cube_s,
+        "update_kpi_cube_s": update_s,
+        "read_cube_ms": per_call_us(read_cube, 10, repeat) / 1e3,
+        "quantile_curve_s": timed(
+            lambda: binned_curve(df["average_montly_hours"], df["left"], n_quantiles=20), repeat
+        )[0],
+        "histograms_s": timed(histograms, repeat)[0],
+        "build_employee_index_s": index_s,
+        "search_employees_ms": per_call_us(
+            lambda: search_employees(index, df, risk_levels, prefix="1", job="sales", risk="Haut Risque"), 10, repeat
+        ) / 1e3,
+    }
+
+
+def bench_figures(df, repeat):
+    import plotly.io as pio
+
+    from aggregations import compute_histogram
+    from charts import (
+        density_figure, density_grids, histogram_figure, scatter_mode, scatter_points_figure,
+        stratified_sample,
+    )
+
+    x, y, left = df["satisfaction_level"], df["average_montly_hours"], df["left"].to_numpy()
+    mode = scatter_mode(len(df))
+
+    # Construction du scatter telle que faite par le Dashboard pour cette taille
+    def scatter():
+        if mode == "density":
+            return density_figure(density_grids(x, y, left), "Scatter", x.name, y.name)
+        positions = np.arange(len(df))
+        return scatter_points_figure(x, y, left, positions, "Scatter", x.name, y.name, webgl=mode == "webgl")
+
+    histogram = compute_histogram(x.to_numpy(), 20)
+    histogram_s, _ = timed(lambda: histogram_figure(histogram, "Histogramme", x.name), repeat)
+    scatter_s, fig = timed(scatter, repeat)
+    # Échantillon stratifié : variante du mode densité
+    sample_s, _ = timed(lambda: stratified_sample(left), repeat)
+    # Sérialisation faite par st.plotly_chart à chaque rerun
+    to_json_s, spec = timed(lambda: pio.to_json(fig, validate=False), repeat)
+    return {
+        "scatter_mode": mode,
+        "histogram_figure_ms": histogram_s * 1e3,
+        "scatter_figure_s": scatter_s,
+        "stratified_sample_s": sample_s,
+        "scatter_to_json_s": to_json_s,
+        "scatter_spec_bytes": len(spec),
+    }
+
+
+# Mesures d'une taille, exécutées dans le processus enfant
+def measure(csv_path, model_path, repeat, with_shap=True):
+    with open(model_path, "rb") as f:
+        model = pickle.load(f)
+
+    df, load = bench_load(csv_path)
+    scores, scoring = bench_scoring(df, model, repeat)
+    result = {"rows": len(df), "load": load, "scoring": scoring}
+    if with_shap:
+        result["shap"] = bench_shap(df, model)
+    result["aggregations"] = bench_aggregations(df, scores, repeat)
+    result["figures"] = bench_figures(df, repeat)
+    result["peak_rss_mb"] = rss_mb()
+    return result
+
+
+def run_child(csv_path, model_path, repeat, with_shap):
+    command = [sys.executable, "-m", "benchmarks.suite", "--measure", csv_path,
+               "--model", model_path, "--repeat", str(repeat)]
+    if not with_shap:
+        command.append("--no-shap")
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+# Contexte d'exécution joint au rapport : deux rapports ne se comparent que sur la même machine
+def environment():
+    import pandas as pd
+    import pyarrow
+    import sklearn
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "pyarrow": pyarrow.__version__,
+        "sklearn": sklearn.__version__,
+        "commit": commit,
+    }
+
+
+# Mesures de temps à plat ("10000.scoring.batch_s" -> valeur) pour la comparaison
+def timings(report):
+    flat = {}
+    for result in report["results"]:
+        for section, values in result.items():
+            if not isinstance(values, dict):
+                continue
+            for name, value in values.items():
+                if name.endswith(("_s", "_ms", "_us")):
+                    flat[f"{result['rows']}.{section}.{name}"] = value
+    return flat
+
+
+# Liste des mesures plus lentes que la référence au-delà de la tolérance relative
+def regressions(report, baseline, tolerance):
+    before = timings(baseline)
+    found = []
+    for key, after in timings(report).items():
+        if key in before and after > before[key] * (1 + tolerance):
+            found.append(f"{key}: {before[key]:.4g} -> {after:.4g}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite de benchmarks de bout en bout")
+    parser.add_argument("--source", default="df_model.csv")
+    parser.add_argument("--model", default="logistic_model.pkl")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3, help="Répétitions des mesures rapides")
+    parser.add_argument("--no-shap", action="store_true", help="Ne mesure pas SHAP (import long)")
+    parser.add_argument("--measure", metavar="CSV", help=argparse.SUPPRESS)
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "suite.json"))
+    parser.add_argument("--baseline", help="Rapport précédent à comparer")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Hausse relative tolérée")
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.model, args.repeat, not args.no_shap)))
+        return
+
+    report = {"environment": environment(), "results": []}
+    for n_rows in args.rows:
+        csv_path = ensure_dataset(args.source, n_rows)
+        report["results"].append(run_child(csv_path, args.model, args.repeat, not args.no_shap))
+        print(json.dumps(report["results"][-1]))
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            found = regressions(report, json.load(f), args.tolerance)
+        for line in found:
+            print(f"RÉGRESSION {line}")
+        sys.exit(1 if found else 0)
+
+
+if __name__ == "__main__":
+    main()
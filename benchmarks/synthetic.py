@@ -0,0 +1,111 @@
+# benchmarks/synthetic.py
+# Générateur de jeux de données synthétiques à l'échelle de df_model.csv (10k à 10M lignes).
+# Chaque ligne est une ligne réelle tirée avec remise : le mix job/salaire, le taux de départ
+# et les corrélations entre colonnes sont conservés. Les variables continues reçoivent un
+# léger bruit sur leur grille d'origine pour éviter des doublons exacts ; les IDs sont neufs.
+# Usage : python -m benchmarks.synthetic [--rows 10000 100000 1000000 10000000] [--format csv]
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from file_formats import TableWriter
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+WORK_DIR = os.path.join("benchmarks", "results", "data")
+CHUNK_SIZE = 1_000_000
+
+# Bruit appliqué aux variables continues : pas de la grille d'origine et nombre de pas maximum
+JITTER = {
+    "satisfaction_level": (0.01, 1),
+    "last_evaluation": (0.01, 1),
+    "average_montly_hours": (1, 2),
+}
+
+
+# Chemin du jeu synthétique de n lignes dans le répertoire de travail des benchmarks
+def dataset_path(n_rows, fmt="csv", work_dir=WORK_DIR):
+    return os.path.join(work_dir, f"synthetic_{n_rows}.{fmt}")
+
+
+# Fonction pour produire les blocs synthétiques un par un (mémoire bornée par chunk_size)
+def generate_chunks(source, n_rows, chunk_size=CHUNK_SIZE, seed=0):
+    rng = np.random.default_rng(seed)
+    bounds = {column: (source[column].min(), source[column].max()) for column in JITTER}
+    for start in range(0, n_rows, chunk_size):
+        size = min(chunk_size, n_rows - start)
+        chunk = source.iloc[rng.integers(0, len(source), size)].reset_index(drop=True)
+        for column, (step, max_steps) in JITTER.items():
+            noise = rng.integers(-max_steps, max_steps + 1, size) * step
+            values = np.clip(chunk[column].to_numpy() + noise, *bounds[column])
+            chunk[column] = np.round(values, 2) if step < 1 else values.astype(chunk[column].dtype)
+        chunk["id_colab"] = np.arange(start + 1, start + size + 1)
+        yield chunk
+
+
+# Fonction pour écrire un jeu synthétique de n lignes en CSV ou Parquet, bloc par bloc
+def write_synthetic(source_csv, path, n_rows, chunk_size=CHUNK_SIZE, seed=0):
+    source = pd.read_csv(source_csv)
+    fmt = os.path.splitext(path)[1].lstrip(".")
+    if fmt not in ("csv", "parquet"):
+        raise ValueError(f"Format inconnu : {fmt}")
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with TableWriter(path, fmt) as writer:
+        for chunk in generate_chunks(source, n_rows, chunk_size, seed):
+            writer.write(chunk)
+    return path
+
+
+# Chemin du jeu synthétique de n lignes, généré s'il n'existe pas encore
+def ensure_dataset(source_csv, n_rows, fmt="csv", work_dir=WORK_DIR):
+    path = dataset_path(n_rows, fmt, work_dir)
+    if not os.path.exists(path):
+        write_synthetic(source_csv, path, n_rows)
+    return path
+
+
+# Écarts entre la distribution jointe du jeu synthétique et celle des données réelles
+def distribution_report(source, synthetic):
+    numeric = source.select_dtypes("number").columns.drop("id_colab")
+    report = {
+        "rows": len(synthetic),
+        "left_rate": {"source": source["left"].mean(), "synthetic": synthetic["left"].mean()},
+        "max_correlation_gap": float(
+            (source[numeric].corr() - synthetic[numeric].corr()).abs().to_numpy().max()
+        ),
+        "ids_unique": bool(synthetic["id_colab"].is_unique),
+    }
+    for column in ("job", "salary"):
+        shares = pd.concat(
+            [source[column].value_counts(normalize=True), synthetic[column].value_counts(normalize=True)],
+            axis=1, keys=["source", "synthetic"],
+        ).fillna(0)
+        report[f"max_{column}_share_gap"] = float((shares["source"] - shares["synthetic"]).abs().max())
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génération de jeux de données synthétiques")
+    parser.add_argument("--source", default="df_model.csv")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--work-dir", default=WORK_DIR)
+    parser.add_argument("--check", action="store_true", help="Compare la distribution au CSV source")
+    args = parser.parse_args()
+
+    source = pd.read_csv(args.source)
+    for n_rows in args.rows:
+        path = ensure_dataset(args.source, n_rows, args.format, args.work_dir)
+        line = {"rows": n_rows, "path": path, "bytes": os.path.getsize(path)}
+        if args.check:
+            # Un bloc suffit : tous les blocs suivent la même loi
+            synthetic = next(generate_chunks(source, min(n_rows, CHUNK_SIZE)))
+            line["distribution"] = distribution_report(source, synthetic)
+        print(json.dumps(line))
+
+
+if __name__ == "__main__":
+    main()
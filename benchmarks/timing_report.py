@@ -0,0 +1,104 @@
+# benchmarks/timing_report.py
+# Percentiles p50/p95/p99 par page et par section à partir du journal des temps des pages
+# (timings.jsonl, écrit par instrumentation.py), avec la taille des figures envoyées
+# et le taux de réutilisation de chaque figure par le cache des figures.
+# Usage : python -m benchmarks.timing_report [--log timings.jsonl] [--page dashboard] [--since 2024-01-01]
+import argparse
+import json
+import os
+
+import numpy as np
+
+from instrumentation import TIMING_LOG_PATH
+
+PERCENTILES = [50, 95, 99]
+
+
+# Fonction pour lire le journal JSONL (les lignes incomplètes d'une écriture interrompue sont ignorées)
+def read_records(path, page=None, since=None):
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if page and record.get("page") != page:
+                continue
+            if since and record.get("ts", "") < since:
+                continue
+            records.append(record)
+    return records
+
+
+def _summary(values):
+    values = np.asarray(values, dtype=np.float64)
+    summary = {"count": len(values)}
+    for q, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        summary[f"p{q}"] = round(float(value), 3)
+    summary["max"] = round(float(values.max()), 3)
+    return summary
+
+
+# Fonction pour agréger les temps par page et par section ("total" = rerun complet)
+def timing_report(records):
+    spans = {}
+    payloads = {}
+    figure_hits = {}
+    for record in records:
+        page_spans = spans.setdefault(record["page"], {"total": []})
+        page_spans["total"].append(record["total_ms"])
+        for name, ms in record["spans_ms"].items():
+            page_spans.setdefault(name, []).append(ms)
+        for name, size in (record.get("payload_bytes") or {}).items():
+            payloads.setdefault(record["page"], {}).setdefault(name, []).append(size)
+        for name, status in (record.get("figure_cache") or {}).items():
+            figure_hits.setdefault(record["page"], {}).setdefault(name, []).append(status == "hit")
+
+    report = {}
+    for page, page_spans in spans.items():
+        rows = {name: _summary(values) for name, values in page_spans.items()}
+        report[page] = {
+            "reruns": len(page_spans["total"]),
+            "sessions": len({r["session"] for r in records if r["page"] == page}),
+            "spans_ms": dict(sorted(rows.items(), key=lambda item: -item[1]["p95"])),
+            "payload_bytes": {name: _summary(sizes) for name, sizes in payloads.get(page, {}).items()},
+            "figure_hit_rate": {name: round(float(np.mean(hits)), 3) for name, hits in figure_hits.get(page, {}).items()},
+        }
+    return report
+
+
+def print_table(report):
+    for page, summary in report.items():
+        print(f"\n{page} : {summary['reruns']} reruns, {summary['sessions']} sessions")
+        print(f"{'section':<40}{'n':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}   (ms)")
+        for name, row in summary["spans_ms"].items():
+            print(f"{name:<40}{row['count']:>7}{row['p50']:>10.1f}{row['p95']:>10.1f}{row['p99']:>10.1f}{row['max']:>10.1f}")
+        for name, row in summary["payload_bytes"].items():
+            print(f"{'octets ' + name:<40}{row['count']:>7}{row['p50']:>10.0f}{row['p95']:>10.0f}{row['p99']:>10.0f}{row['max']:>10.0f}")
+        for name, rate in summary["figure_hit_rate"].items():
+            print(f"{'cache ' + name:<40}{'':>7}{rate:>10.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Percentiles des temps par section de page")
+    parser.add_argument("--log", default=TIMING_LOG_PATH or "timings.jsonl")
+    parser.add_argument("--page", help="Limiter à une page (dashboard, prediction)")
+    parser.add_argument("--since", help="Horodatage ISO minimal (ex. 2024-01-01)")
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "timing_report.json"))
+    args = parser.parse_args()
+
+    records = read_records(args.log, args.page, args.since)
+    if not records:
+        print(f"Aucun enregistrement dans {args.log}.")
+        return
+    report = timing_report(records)
+    print_table(report)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# charts.py
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+
+
+# Fonction pour transformer un histogramme précalculé en trace de barres Plotly
+def histogram_trace(histogram, name="Distribution", **bar_kwargs):
+    edges = np.asarray(histogram["edges"], dtype=np.float64)
+    return go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=histogram["counts"],
+        name=name,
+        hovertemplate="[%{customdata[0]:.4g} ; %{customdata[1]:.4g}[<br>Effectif : %{y}<extra></extra>",
+        customdata=np.column_stack([edges[:-1], edges[1:]]),
+        **bar_kwargs
+    )
+
+
+# Fonction pour créer la figure d'un histogramme précalculé
+def histogram_figure(histogram, title, x_label, **bar_kwargs):
+    fig = go.Figure(histogram_trace(histogram, **bar_kwargs))
+    fig.update_layout(title=title, xaxis_title=x_label, yaxis_title="count", bargap=0)
+    return fig
+
+
+# ----------------------------
+# Scatter plot adaptatif
+# ----------------------------
+# Au-delà de ce nombre de points, rendu WebGL (Scattergl) au lieu de SVG
+SCATTER_WEBGL_THRESHOLD = 5_000
+# Au-delà de ce nombre de points, agrégation serveur (densité ou échantillon stratifié)
+SCATTER_DENSITY_THRESHOLD = 200_000
+# Nombre de points conservés par l'échantillonnage stratifié
+SCATTER_SAMPLE_SIZE = 50_000
+# Résolution de la grille de densité
+DENSITY_BINS = 60
+
+
+# Mode de rendu du scatter selon le nombre de points
+def scatter_mode(n_points):
+    if n_points > SCATTER_DENSITY_THRESHOLD:
+        return "density"
+    if n_points > SCATTER_WEBGL_THRESHOLD:
+        return "webgl"
+    return "svg"
+
+
+# Fonction pour sous-échantillonner en gardant les classes rares (partants) :
+# chaque classe reçoit une part égale du budget, plafonnée à son effectif
+def stratified_sample(labels, size=SCATTER_SAMPLE_SIZE, random_state=0):
+    labels = np.asarray(labels)
+    if len(labels) <= size:
+        return np.arange(len(labels))
+
+    rng = np.random.default_rng(random_state)
+    classes, counts = np.unique(labels, return_counts=True)
+    allocation = np.zeros(len(classes), dtype=np.int64)
+    remaining = size
+    # On sert d'abord les petites classes, le reste du budget va aux grandes
+    for i in np.argsort(counts):
+        allocation[i] = min(counts[i], remaining // (len(classes) - np.count_nonzero(allocation)))
+        remaining -= allocation[i]
+
+    positions = [
+        rng.choice(np.flatnonzero(labels == cls), size=n, replace=False)
+        for cls, n in zip(classes, allocation)
+    ]
+    return np.sort(np.concatenate(positions))
+
+
+# Fonction pour construire le scatter point par point ; seule la position de la ligne
+# est embarquée dans chaque point, les détails sont lus à la sélection
+def scatter_points_figure(x, y, left, positions, title, x_label, y_label, webgl=False):
+    trace_type = go.Scattergl if webgl else go.Scatter
+    fig = go.Figure(trace_type(
+        x=x,
+        y=y,
+        mode="markers",
+        customdata=positions,
+        marker=dict(color=left, colorscale="Plasma", showscale=True, colorbar=dict(title="left")),
+        hovertemplate=f"{x_label}=%{{x}}<br>{y_label}=%{{y}}<extra></extra>",
+    ))
+    fig.update_layout(title=title, xaxis_title=x_label, yaxis_title=y_label)
+    return fig
+
+
+# Fonction pour agréger le nuage en grilles de densité 2D, une par valeur de left
+def density_grids(x, y, left, bins=DENSITY_BINS):
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    left = np.asarray(left)
+    x_edges = np.histogram_bin_edges(x, bins=bins)
+    y_edges = np.histogram_bin_edges(y, bins=bins)
+    grids = {}
+    for value in (0, 1):
+        mask = left == value
+        counts, _, _ = np.histogram2d(x[mask], y[mask], bins=[x_edges, y_edges])
+        grids[value] = counts.T  # lignes = y, colonnes = x, comme attendu par go.Heatmap
+    return {"x_edges": x_edges, "y_edges": y_edges, "grids": grids}
+
+
+# Fonction pour tracer les grilles de densité côte à côte (Restants / Partants)
+def density_figure(density, title, x_label, y_label):
+    from plotly.subplots import make_subplots
+
+    x_centers = (density["x_edges"][:-1] + density["x_edges"][1:]) / 2
+    y_centers = (density["y_edges"][:-1] + density["y_edges"][1:]) / 2
+    fig = make_subplots(rows=1, cols=2, shared_yaxes=True, subplot_titles=["Restants (left=0)", "Partants (left=1)"])
+    for col, value in enumerate((0, 1), start=1):
+        counts = density["grids"][value]
+        fig.add_trace(go.Heatmap(
+            x=x_centers,
+            y=y_centers,
+            z=np.where(counts > 0, counts, np.nan),
+            colorscale="Blues" if value == 0 else "Reds",
+            showscale=False,
+            hovertemplate=f"{x_label}=%{{x:.3g}}<br>{y_label}=%{{y:.3g}}<br>Effectif : %{{z}}<extra></extra>",
+        ), row=1, col=col)
+        fig.update_xaxes(title_text=x_label, row=1, col=col)
+    fig.update_yaxes(title_text=y_label, row=1, col=1)
+    fig.update_layout(title=title)
+    return fig
+
+
+# ----------------------------
+# Cache LRU des figures construites
+# ----------------------------
+# Une figure est identifiée par (graphique, filtres, axes, version des données) : tant que
+# ces valeurs ne changent pas, elle n'est pas reconstruite. Le cache garde l'objet Figure
+# et non son JSON : st.plotly_chart revalide un dict (plus lent que de sérialiser une
+# Figure). La taille du JSON sert au plafond mémoire ; les figures sont en lecture seule.
+class FigureCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Renvoie (figure, trouvée en cache) ; la construction se fait hors du verrou
+    def lookup(self, key, build):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0], True
+            self.misses += 1
+        fig = build()
+        size = len(pio.to_json(fig, validate=False))
+        # Une figure plus grosse que tout le cache n'est pas gardée
+        if size > self.max_bytes:
+            return fig, False
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[1]
+            self._entries[key] = (fig, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+        return fig, False
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / requests if requests else None,
+            }
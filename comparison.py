@@ -0,0 +1,66 @@
+# comparison.py
+import numpy as np
+import pandas as pd
+from scipy.stats import rankdata
+
+from scoring import RISK_LEVELS, RISK_THRESHOLDS
+
+
+# Fonction pour calculer l'AUC de chaque colonne de probabilités contre left
+# (statistique de Mann-Whitney, ex aequo comptés pour moitié ; NaN sans les deux classes)
+def auc_scores(proba, left):
+    positives = np.asarray(left) != 0
+    n_pos = int(positives.sum())
+    n_neg = len(positives) - n_pos
+    if n_pos == 0 or n_neg == 0:
+        return np.full(proba.shape[1], np.nan)
+    ranks = rankdata(proba, axis=0)
+    return (ranks[positives].sum(axis=0) - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg)
+
+
+# ----------------------------
+# Comparaison champion / challenger
+# ----------------------------
+# Fonction pour comparer chaque modèle au champion sur toute la population, à partir de la
+# matrice de probabilités de score_models (une colonne par modèle) :
+# - summary : AUC contre left, probabilité moyenne, écarts au champion, désaccords de niveau ;
+# - disagreements : employés dont le niveau de risque diffère de celui du champion, par job ;
+# - transitions : niveaux du champion (lignes) contre ceux de chaque modèle (colonnes).
+def compare_models(df, scores, champion):
+    proba = scores.to_numpy(dtype=np.float64)
+    deltas = proba - scores[champion].to_numpy()[:, None]
+    tiers = np.searchsorted(RISK_THRESHOLDS, proba, side="right")
+    champion_tiers = tiers[:, scores.columns.get_loc(champion)]
+    disagree = tiers != champion_tiers[:, None]
+
+    summary = pd.DataFrame(
+        {
+            "auc": auc_scores(proba, df["left"].to_numpy()),
+            "mean_proba": proba.mean(axis=0),
+            "mean_abs_delta": np.abs(deltas).mean(axis=0),
+            "max_abs_delta": np.abs(deltas).max(axis=0),
+            "disagreements": disagree.sum(axis=0),
+        },
+        index=scores.columns,
+    )
+
+    jobs = df["job"].cat.codes.to_numpy()
+    categories = list(df["job"].cat.categories)
+    known = jobs >= 0
+    disagreements = pd.DataFrame(
+        {name: np.bincount(jobs[known & disagree[:, j]], minlength=len(categories))
+         for j, name in enumerate(scores.columns)},
+        index=pd.Index(categories, name="job"),
+    )
+    disagreements.insert(0, "headcount", np.bincount(jobs[known], minlength=len(categories)))
+
+    n_levels = len(RISK_LEVELS)
+    transitions = {
+        name: pd.DataFrame(
+            np.bincount(champion_tiers * n_levels + tiers[:, j], minlength=n_levels ** 2).reshape(n_levels, n_levels),
+            index=RISK_LEVELS,
+            columns=RISK_LEVELS,
+        )
+        for j, name in enumerate(scores.columns)
+    }
+    return {"champion": champion, "summary": summary, "disagreements": disagreements, "transitions": transitions}
@@ -0,0 +1,111 @@
+# counterfactuals.py
+import numpy as np
+import pandas as pd
+
+from scoring import RISK_THRESHOLDS, LinearScorer, make_scorer, model_features
+
+# Features sur lesquelles l'entreprise peut agir, chacune modifiée seule
+ACTIONABLE_FEATURES = ["average_montly_hours", "number_project", "salary_encoded"]
+# Probabilité sous laquelle l'employé passe en "Faible Risque"
+TARGET_PROBA = RISK_THRESHOLDS[0]
+
+
+# Log-odds de chaque ligne, colonne par colonne (sans matérialiser la matrice des features)
+def _decision(features, scorer):
+    z = np.full(len(features), scorer.intercept)
+    for j, feature in enumerate(model_features):
+        z += scorer.coef[j] * features[feature].to_numpy(dtype=np.float64)
+    return z
+
+
+# Fonction pour calculer, en forme fermée, la valeur de chaque feature actionnable qui fait
+# passer chaque ligne sous TARGET_PROBA (les autres features inchangées).
+# Pour un modèle logistique z = coef . x + intercept : x_j' = x_j + (logit(cible) - z) / coef_j,
+# arrondi à l'entier du bon côté du seuil. NaN si la ligne est déjà sous le seuil, si la
+# feature n'a pas d'effet ou si la valeur sort des bornes observées.
+def counterfactual_values(features, scorer, bounds):
+    from scipy.special import logit
+    coef = scorer.coef
+    z = _decision(features, scorer)
+    target = logit(TARGET_PROBA)
+    at_risk = z >= target
+    values = {}
+    for feature in ACTIONABLE_FEATURES:
+        j = model_features.index(feature)
+        w = coef[j]
+        if w == 0:
+            values[feature] = np.full(len(z), np.nan, dtype=np.float32)
+            continue
+        x = features[feature].to_numpy(dtype=np.float64)
+        exact = x + (target - z) / w
+        # Entier le plus proche de la valeur actuelle qui passe sous le seuil : le plus grand
+        # entier <= valeur exacte (coef > 0), le plus petit entier >= valeur exacte (coef < 0) ;
+        # un arrondi qui tombe pile sur le seuil ne suffit pas (seuil exclu)
+        value = np.floor(exact) if w > 0 else np.ceil(exact)
+        value = np.where(z + (value - x) * w >= target, value - np.sign(w), value)
+        low, high = bounds[feature]
+        feasible = at_risk & (value >= low) & (value <= high)
+        values[feature] = np.where(feasible, value, np.nan).astype(np.float32)
+    return values
+
+
+# Bornes observées des features actionnables
+def actionable_bounds(df):
+    return {feature: (float(df[feature].min()), float(df[feature].max())) for feature in ACTIONABLE_FEATURES}
+
+
+# Fonction pour calculer les contrefactuels de toute la population en une passe vectorisée
+# (None si le modèle n'est pas un modèle logistique exploitable en forme fermée)
+def compute_counterfactuals(df, model):
+    scorer = make_scorer(model)
+    if not isinstance(scorer, LinearScorer):
+        return None
+    bounds = actionable_bounds(df)
+    values = counterfactual_values(df, scorer, bounds)
+    table = pd.DataFrame(values, index=pd.Index(df["id_colab"].to_numpy(), name="id_colab"))
+    table.attrs["bounds"] = bounds
+    return table
+
+
+# Fonction pour mettre à jour les bornes observées après une ingestion sans relire toute la
+# population : elles sont étendues par les lignes modifiées ou ajoutées, et une feature n'est
+# relue en entier que si une valeur remplacée (removed) tenait une borne que les nouvelles
+# valeurs n'atteignent plus
+def update_bounds(bounds, df, positions, removed):
+    updated = {}
+    for feature, (low, high) in bounds.items():
+        column = df[feature]
+        values = column.to_numpy(dtype=np.float64)[positions]
+        old = removed[feature].to_numpy(dtype=np.float64)
+        new_low = min(low, values.min()) if len(values) else low
+        new_high = max(high, values.max()) if len(values) else high
+        if (new_low == low and (old == low).any() and not (values == low).any()) or (
+            new_high == high and (old == high).any() and not (values == high).any()
+        ):
+            updated[feature] = (float(column.min()), float(column.max()))
+        else:
+            updated[feature] = (float(new_low), float(new_high))
+    return updated
+
+
+# Fonction pour mettre à jour les contrefactuels après une ingestion : seules les lignes aux
+# positions données sont recalculées (tout est recalculé si les bornes observées ont bougé).
+# removed = anciennes valeurs des lignes modifiées, pour tenir les bornes à jour.
+def update_counterfactuals(table, df, positions, removed, model):
+    if table is None:
+        return compute_counterfactuals(df, model)
+    bounds = update_bounds(table.attrs["bounds"], df, positions, removed)
+    if table.attrs["bounds"] != bounds:
+        return compute_counterfactuals(df, model)
+    scorer = make_scorer(model)
+    fresh = counterfactual_values(df[model_features].iloc[positions], scorer, bounds)
+    n_rows, n_known = len(df), len(table)
+    values = {}
+    for feature in ACTIONABLE_FEATURES:
+        column = np.empty(n_rows, dtype=np.float32)
+        column[:n_known] = table[feature].to_numpy()
+        column[positions] = fresh[feature]
+        values[feature] = column
+    updated = pd.DataFrame(values, index=pd.Index(df["id_colab"].to_numpy(), name="id_colab"))
+    updated.attrs["bounds"] = bounds
+    return updated
@@ -0,0 +1,281 @@
+# data_store.py
+import hashlib
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import streamlit as st
+
+from file_formats import COLUMN_TYPES, StaleVersionError, file_fingerprint
+
+CSV_PATH = "df_model.csv"
+# Répertoire des deltas RH quotidiens (CSV au format de df_model.csv, appliqués par ordre de nom)
+DELTA_DIR = os.environ.get("TURNOVER_DELTA_DIR", "deltas")
+
+# Clé des métadonnées Arrow contenant l'empreinte du CSV converti
+SOURCE_FINGERPRINT_KEY = "source_fingerprint"
+
+
+# Chemin du fichier Arrow associé à un CSV (df_model.csv -> df_model.arrow)
+def arrow_path_for(csv_path):
+    return os.path.splitext(csv_path)[0] + ".arrow"
+
+
+# Fonction pour convertir le CSV en fichier Arrow IPC non compressé (mappable en mémoire).
+# L'empreinte du CSV source est gardée dans les métadonnées du schéma.
+def convert_csv_to_arrow(csv_path, arrow_path=None):
+    arrow_path = arrow_path or arrow_path_for(csv_path)
+    source_fingerprint = file_fingerprint(csv_path)
+    table = pa_csv.read_csv(
+        csv_path,
+        convert_options=pa_csv.ConvertOptions(column_types=COLUMN_TYPES),
+    )
+    # Un seul dictionnaire par colonne catégorielle, requis par le format fichier IPC
+    table = table.unify_dictionaries()
+    table = table.replace_schema_metadata({SOURCE_FINGERPRINT_KEY: source_fingerprint})
+
+    # Écriture dans un fichier temporaire puis renommage : jamais de fichier à moitié écrit.
+    # Le nom temporaire est propre au thread (le surveillant et une page peuvent convertir en même temps).
+    tmp_path = f"{arrow_path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=1_000_000)
+    os.replace(tmp_path, arrow_path)
+    return arrow_path
+
+
+# Fonction pour ouvrir le fichier Arrow en mémoire mappée et l'exposer en DataFrame
+# (les colonnes numériques restent des vues sur le fichier, sans copie)
+def open_arrow(arrow_path):
+    source = pa.memory_map(arrow_path, "r")
+    table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+# Empreinte du CSV dont provient un fichier Arrow (None si absent ou sans métadonnées)
+def arrow_source_fingerprint(arrow_path):
+    if not os.path.exists(arrow_path):
+        return None
+    with pa.memory_map(arrow_path, "r") as source:
+        metadata = pa.ipc.open_file(source).schema.metadata or {}
+    value = metadata.get(SOURCE_FINGERPRINT_KEY.encode())
+    return value.decode() if value else None
+
+
+# Fonction pour obtenir les données employés depuis le CSV, converti une seule fois en Arrow
+# (reconverti dès que l'empreinte du CSV ne correspond plus à celle du fichier Arrow)
+def open_dataset(csv_path=CSV_PATH):
+    arrow_path = arrow_path_for(csv_path)
+    if arrow_source_fingerprint(arrow_path) != file_fingerprint(csv_path):
+        convert_csv_to_arrow(csv_path, arrow_path)
+    return open_arrow(arrow_path)
+
+
+# ----------------------------
+# Index des employés
+# ----------------------------
+# Fonction pour construire l'index id_colab -> position de ligne, et l'ordre des IDs
+# en texte trié pour la recherche par préfixe
+def build_employee_index(df):
+    ids = df["id_colab"].to_numpy()
+    id_strings = ids.astype(str)
+    order = np.argsort(id_strings, kind="stable")
+    return {
+        "positions": pd.Index(ids),
+        "prefix_keys": id_strings[order],
+        "prefix_positions": order,
+    }
+
+
+# Position de ligne d'un employé (recherche O(1) dans la table de hachage de l'index)
+def employee_position(index, employee_id):
+    try:
+        return index["positions"].get_loc(employee_id)
+    except KeyError:
+        return None
+
+
+# Masque "colonne == valeur" sur quelques positions ; compare les codes pour les catégorielles
+def _equals_at(values, positions, value):
+    if isinstance(values, pd.Series):
+        values = values.array
+    if isinstance(values, pd.Categorical):
+        code = values.categories.get_indexer([value])[0]
+        return values.codes[positions] == code
+    return np.asarray(values)[positions] == value
+
+
+# Fonction pour rechercher des employés par préfixe d'ID et filtres.
+# Le préfixe est résolu par recherche dichotomique sur les IDs triés ; les filtres ne
+# s'appliquent qu'aux lignes retenues. Retourne les positions de lignes correspondantes.
+def search_employees(index, df, risk_levels=None, prefix="", job=None, salary=None, risk=None):
+    keys = index["prefix_keys"]
+    prefix = prefix.strip()
+    start = np.searchsorted(keys, prefix, side="left")
+    stop = np.searchsorted(keys, prefix + "\uffff", side="left") if prefix else len(keys)
+    positions = index["prefix_positions"][start:stop]
+
+    mask = np.ones(len(positions), dtype=bool)
+    if job is not None:
+        mask &= _equals_at(df["job"], positions, job)
+    if salary is not None:
+        mask &= _equals_at(df["salary"], positions, salary)
+    if risk is not None and risk_levels is not None:
+        mask &= _equals_at(risk_levels, positions, risk)
+    return positions[mask]
+
+
+# Fonction pour ajouter à l'index des employés les IDs ajoutés en fin de df (à partir de start) :
+# les IDs triés sont fusionnés par insertion, sans retrier toute la population
+def update_employee_index(index, new_ids, start):
+    new_ids = np.asarray(new_ids)
+    if len(new_ids) == 0:
+        return index
+    new_strings = new_ids.astype(str)
+    order = np.argsort(new_strings, kind="stable")
+    at = np.searchsorted(index["prefix_keys"], new_strings[order], side="right")
+    return {
+        "positions": index["positions"].append(pd.Index(new_ids)),
+        "prefix_keys": np.insert(index["prefix_keys"], at, new_strings[order]),
+        "prefix_positions": np.insert(index["prefix_positions"], at, start + order),
+    }
+
+
+# Positions d'une page de résultats (pages numérotées à partir de 1) et nombre de pages
+def paginate(positions, page, page_size=50):
+    n_pages = max(1, -(-len(positions) // page_size))
+    page = min(max(page, 1), n_pages)
+    return positions[(page - 1) * page_size:page * page_size], n_pages
+
+
+# ----------------------------
+# Ingestion des deltas RH (embauches, mises à jour, départs = lignes avec left=1)
+# ----------------------------
+# Fichiers delta présents, dans l'ordre d'application (ordre des noms, ex. 2024-06-01.csv)
+def list_deltas(delta_dir=DELTA_DIR):
+    if not os.path.isdir(delta_dir):
+        return []
+    return [
+        os.path.join(delta_dir, name)
+        for name in sorted(os.listdir(delta_dir))
+        if name.endswith(".csv")
+    ]
+
+
+# Version des données : clé de taille fixe (hachage de l'empreinte du CSV de base et de celles
+# des deltas, dans l'ordre), empreinte de la base et liste ordonnée des deltas (chemin, empreinte).
+# Un nouveau delta prolonge la liste précédente sur la même base : mise à jour incrémentale.
+def dataset_version(csv_path=CSV_PATH, delta_dir=DELTA_DIR):
+    base = file_fingerprint(csv_path)
+    deltas = tuple((path, file_fingerprint(path)) for path in list_deltas(delta_dir))
+    digest = hashlib.blake2b(base.encode(), digest_size=16)
+    for _, fingerprint in deltas:
+        digest.update(b"+" + fingerprint.encode())
+    return digest.hexdigest(), base, deltas
+
+
+# Les deltas de `versions` prolongent-ils ceux de `previous`, sur le même CSV de base ?
+def extends_version(previous, versions):
+    n_previous = len(previous["deltas"])
+    return (
+        previous["base"] is not None and previous["base"] == versions["base"]
+        and len(versions["deltas"]) > n_previous and versions["deltas"][:n_previous] == previous["deltas"]
+    )
+
+
+# Fonction pour lire des fichiers delta, concaténés dans l'ordre (un ID peut y figurer plusieurs
+# fois : apply_delta garde sa dernière version)
+def read_deltas(paths):
+    frames = []
+    for path in paths:
+        table = pa_csv.read_csv(path, convert_options=pa_csv.ConvertOptions(column_types=COLUMN_TYPES))
+        missing = set(COLUMN_TYPES) - set(table.column_names)
+        if missing:
+            raise ValueError(f"Colonnes manquantes dans le delta '{path}' : {sorted(missing)}")
+        frames.append(table.select(list(COLUMN_TYPES)).to_pandas())
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=list(COLUMN_TYPES))
+
+
+# Fonction pour appliquer un delta (upsert sur id_colab) sans relire la population.
+# Chaque colonne est recopiée une fois avec les lignes modifiées remplacées et les nouvelles
+# ajoutées en fin ; l'ancien DataFrame reste intact pour les reruns en cours.
+# Les nouveaux IDs et les nouvelles modalités sont ajoutés dans l'ordre de leur première
+# apparition dans le delta : appliquer plusieurs deltas l'un après l'autre ou leur concaténation
+# d'un coup (load_data après éviction) donne le même df, aux mêmes positions.
+# Retourne le nouveau df, les positions modifiées puis ajoutées et l'ancienne version des lignes modifiées.
+def apply_delta(df, delta, positions=None):
+    positions = pd.Index(df["id_colab"].to_numpy()) if positions is None else positions
+    # Modalités lues avant la déduplication : une modalité remplacée par un delta suivant
+    # reste connue, comme si les deltas avaient été appliqués un à un
+    raw = delta
+    # Dernière version de chaque ID, à la place de sa première apparition
+    ids = delta["id_colab"]
+    first_seen = ids[~ids.duplicated()].to_numpy()
+    delta = (
+        delta.drop_duplicates("id_colab", keep="last")
+        .set_index("id_colab", drop=False)
+        .loc[first_seen]
+        .reset_index(drop=True)
+    )
+    # Même type que l'index : un type différent ferait reconstruire sa table de hachage à chaque appel
+    found = positions.get_indexer(delta["id_colab"].to_numpy(dtype=positions.dtype))
+    is_update = found >= 0
+    updated = found[is_update]
+    appended = delta[~is_update]
+
+    columns = {}
+    for column in df.columns:
+        values = df[column].array
+        if isinstance(values, pd.Categorical):
+            # Les nouvelles modalités (ex. un nouveau job) sont ajoutées après les existantes
+            seen = pd.Index(pd.unique(np.asarray(raw[column], dtype=object)))
+            categories = values.categories.append(seen[~seen.isin(values.categories)])
+            codes = np.concatenate([
+                values.codes.astype(np.int32),
+                categories.get_indexer(np.asarray(appended[column], dtype=object)),
+            ])
+            codes[updated] = categories.get_indexer(np.asarray(delta[column], dtype=object)[is_update])
+            columns[column] = pd.Categorical.from_codes(codes, categories=categories)
+        else:
+            dtype = np.asarray(values).dtype
+            merged = np.concatenate([np.asarray(values), appended[column].to_numpy(dtype=dtype)])
+            merged[updated] = delta[column].to_numpy(dtype=dtype)[is_update]
+            columns[column] = merged
+
+    return {
+        "df": pd.DataFrame(columns),
+        "updated": updated,
+        "appended": np.arange(len(df), len(df) + len(appended)),
+        "removed": df.iloc[updated],
+    }
+
+
+# ----------------------------
+# Chargement des données, partagé par toutes les pages et toutes les sessions
+# ----------------------------
+# Une entrée par version des données (dataset_key = empreintes du CSV et des deltas) : la précédente reste
+# servie pendant que la nouvelle se charge, puis est évincée.
+# _ingested : DataFrame déjà mis à jour par l'ingestion incrémentale d'un delta ; sans lui,
+# le CSV de base est relu et tous les deltas sont rejoués, à condition que les fichiers présents
+# soient encore ceux de dataset_key (avant et après la lecture) : sinon StaleVersionError, plutôt
+# que de ranger sous une ancienne clé des lignes que ses artefacts ne décrivent pas.
+@st.cache_resource(max_entries=2)
+def load_data(dataset_key, _ingested=None):
+    if _ingested is not None:
+        return _ingested
+    try:
+        current, _, deltas = dataset_version(CSV_PATH, DELTA_DIR)
+        if current == dataset_key:
+            df = open_dataset(CSV_PATH)
+            if deltas:
+                df = apply_delta(df, read_deltas([path for path, _ in deltas]))["df"]
+            current = dataset_version(CSV_PATH, DELTA_DIR)[0]
+    except FileNotFoundError:
+        st.error(f"Le fichier '{CSV_PATH}' n'a pas été trouvé.")
+        return pd.DataFrame()
+    if current != dataset_key:
+        raise StaleVersionError(f"Version des données {dataset_key} remplacée par {current} : rechargez la page.")
+    return df
@@ -0,0 +1,131 @@
+# explanations.py
+import os
+
+import numpy as np
+import pandas as pd
+
+from scoring import model_features
+
+# Taille et méthode du fond résumé utilisé par les explainers non linéaires
+BACKGROUND_SIZE = int(os.environ.get("SHAP_BACKGROUND_SIZE", 100))
+BACKGROUND_METHOD = os.environ.get("SHAP_BACKGROUND_METHOD", "stratified")
+
+# Colonnes dont on conserve le mélange dans le fond résumé
+BACKGROUND_STRATA = ["left", "job"]
+
+
+# Vérifie si le modèle est linéaire binaire (coefficients exploitables en forme fermée)
+def is_linear_model(model):
+    coef = getattr(model, "coef_", None)
+    return coef is not None and hasattr(model, "intercept_") and np.ndim(coef) == 2 and coef.shape[0] == 1
+
+
+# Valeurs SHAP exactes d'un modèle linéaire (espace log-odds, features indépendantes) :
+# phi_j = coef_j * (x_j - moyenne_fond_j), valeur de base = intercept + coef . moyenne_fond
+def linear_shap_values(model, X, background):
+    coef = np.asarray(model.coef_, dtype=np.float64)[0]
+    background_mean = np.asarray(background, dtype=np.float64).mean(axis=0)
+    values = (np.asarray(X, dtype=np.float64) - background_mean) * coef
+    base_value = float(model.intercept_[0] + background_mean @ coef)
+    return values, base_value
+
+
+# Répartition de `size` lignes entre les strates, proportionnelle à leurs effectifs
+# (méthode des plus forts restes, au moins une ligne par strate tant que possible)
+def _allocate(counts, size):
+    quotas = counts / counts.sum() * size
+    allocation = np.floor(quotas).astype(int)
+    if size >= len(counts):
+        allocation = np.maximum(allocation, 1)
+    remaining = size - allocation.sum()
+    if remaining > 0:
+        order = np.argsort(-(quotas - np.floor(quotas)), kind="stable")
+        allocation[order[:remaining]] += 1
+    while allocation.sum() > size:
+        allocation[np.argmax(allocation)] -= 1
+    return np.minimum(allocation, counts)
+
+
+# Fonction pour résumer le fond SHAP en un petit échantillon qui garde le mélange left / job
+def summarize_background(df, size=BACKGROUND_SIZE, method=BACKGROUND_METHOD, random_state=0):
+    if size >= len(df):
+        return df[model_features].reset_index(drop=True)
+
+    groups = df.groupby(BACKGROUND_STRATA, observed=True, sort=True).indices
+    keys = list(groups)
+    counts = np.array([len(groups[k]) for k in keys])
+    allocation = _allocate(counts, size)
+    rng = np.random.default_rng(random_state)
+
+    parts = []
+    for key, n_rows in zip(keys, allocation):
+        if n_rows == 0:
+            continue
+        X_stratum = df[model_features].iloc[groups[key]]
+        if method == "stratified":
+            parts.append(X_stratum.iloc[rng.choice(len(X_stratum), size=n_rows, replace=False)])
+        elif method == "kmeans":
+            from sklearn.cluster import KMeans
+
+            kmeans = KMeans(n_clusters=n_rows, n_init=1, random_state=random_state).fit(X_stratum)
+            parts.append(pd.DataFrame(kmeans.cluster_centers_, columns=model_features))
+        else:
+            raise ValueError(f"Méthode de résumé du fond inconnue : {method}")
+    return pd.concat(parts, ignore_index=True)
+
+
+# Fonction pour construire un explainer SHAP sur un fond déjà résumé
+# (model_agnostic force l'explainer par permutation, comme pour un modèle non linéaire)
+def build_explainer(model, background, model_agnostic=False):
+    import shap
+
+    masker = shap.maskers.Independent(background, max_samples=len(background))
+    if not model_agnostic:
+        return shap.Explainer(model, masker)
+
+    # Sortie expliquée : log-odds si disponibles (comparables aux valeurs linéaires), sinon probabilité
+    def predict(X):
+        X = pd.DataFrame(X, columns=model_features)
+        if hasattr(model, "decision_function"):
+            return model.decision_function(X)
+        return model.predict_proba(X)[:, 1]
+
+    return shap.Explainer(predict, masker, feature_names=model_features)
+
+
+# Valeurs SHAP et valeur de base de la classe 1 (quitter) d'un lot expliqué : un classifieur
+# expliqué sur ses deux sorties donne des valeurs (lignes, features, 2) et des bases (lignes, 2)
+def positive_class_values(explanation):
+    values = np.asarray(explanation.values)
+    base_values = np.asarray(explanation.base_values)
+    if values.ndim == 3:
+        values, base_values = values[..., 1], base_values[..., 1]
+    return values, float(np.ravel(base_values)[0])
+
+
+# Fonction pour calculer les valeurs SHAP de tous les employés en un seul lot
+def compute_shap_table(df, model):
+    X = df[model_features]
+    if is_linear_model(model):
+        values, base_value = linear_shap_values(model, X, X)
+    else:
+        values, base_value = positive_class_values(build_explainer(model, summarize_background(df))(X))
+
+    shap_values = pd.DataFrame(
+        values,
+        columns=model_features,
+        index=pd.Index(df["id_colab"].to_numpy(), name="id_colab"),
+    )
+    return shap_values, base_value
+
+
+# Fonction pour reconstruire l'objet Explanation d'un employé à partir de la table
+def employee_explanation(shap_values, base_value, selected_id, employee_features):
+    import shap
+
+    return shap.Explanation(
+        values=shap_values.loc[selected_id, model_features].to_numpy(dtype=np.float64),
+        base_values=base_value,
+        data=np.asarray(employee_features, dtype=np.float64),
+        feature_names=model_features,
+    )
@@ -0,0 +1,104 @@
+# file_formats.py
+# Format des fichiers employés et empreintes de fichiers, sans dépendance à streamlit :
+# importable par les CLI (score_batch.py, train.py) et leurs processus sans charger l'application.
+import hashlib
+import os
+import threading
+
+import pyarrow as pa
+
+# Types compacts de chaque colonne du fichier employés
+COLUMN_TYPES = {
+    "id_colab": pa.int32(),
+    "satisfaction_level": pa.float32(),
+    "last_evaluation": pa.float32(),
+    "number_project": pa.int8(),
+    "average_montly_hours": pa.int16(),
+    "time_spend_company": pa.int8(),
+    "work_accident": pa.int8(),
+    "promotion_last_5years": pa.int8(),
+    "job": pa.dictionary(pa.int32(), pa.string()),
+    "salary": pa.dictionary(pa.int32(), pa.string()),
+    "left": pa.int8(),
+    "salary_encoded": pa.int8(),
+}
+
+
+# Octets lus en début et en fin de fichier pour l'empreinte de contenu
+FINGERPRINT_SAMPLE_BYTES = 64 * 1024
+
+
+# Empreinte d'un fichier servant de clé de cache : date de modification, taille et hachage
+# du début et de la fin du contenu. Toute réécriture change la clé, même à taille identique ;
+# une copie à l'identique aussi (nouvelle date de modification) : seul le milieu du fichier
+# n'est pas haché, la date protège d'une modification qui n'y toucherait que lui.
+def file_fingerprint(path):
+    stat = os.stat(path)
+    digest = hashlib.blake2b(digest_size=8)
+    with open(path, "rb") as f:
+        digest.update(f.read(FINGERPRINT_SAMPLE_BYTES))
+        if stat.st_size > FINGERPRINT_SAMPLE_BYTES:
+            f.seek(max(FINGERPRINT_SAMPLE_BYTES, stat.st_size - FINGERPRINT_SAMPLE_BYTES))
+            digest.update(f.read())
+    return f"{stat.st_mtime_ns}-{stat.st_size}-{digest.hexdigest()}"
+
+
+# Clé de version (données ou modèle) qui ne correspond plus aux fichiers présents : version
+# remplacée puis évincée du cache. Son contenu n'est plus lisible ; recharger avec la clé actuelle.
+class StaleVersionError(RuntimeError):
+    pass
+
+
+# ----------------------------
+# Écriture bloc par bloc (CSV ou Parquet)
+# ----------------------------
+# Écrit des blocs (DataFrame ou table Arrow) l'un après l'autre dans un fichier temporaire,
+# renommé à la fermeture : jamais de fichier à moitié écrit. Un seul format pour l'export des
+# scores de l'application, score_batch.py et les jeux synthétiques des benchmarks.
+class TableWriter:
+    def __init__(self, path, fmt=None):
+        self.path = path
+        self.fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+        if self.fmt not in ("csv", "parquet"):
+            raise ValueError(f"Format de sortie inconnu : {self.fmt}")
+        self.tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        self._writer = None
+
+    def write(self, chunk):
+        table = chunk if isinstance(chunk, pa.Table) else pa.Table.from_pandas(chunk, preserve_index=False)
+        if self._writer is None:
+            if self.fmt == "csv":
+                import pyarrow.csv as pa_csv
+
+                # Valeurs sans guillemets superflus, comme dans df_model.csv
+                options = pa_csv.WriteOptions(quoting_style="needed")
+                self._writer = pa_csv.CSVWriter(self.tmp_path, table.schema, write_options=options)
+            else:
+                import pyarrow.parquet as pq
+
+                self._writer = pq.ParquetWriter(self.tmp_path, table.schema)
+        self._writer.write_table(table)
+
+    # Termine le fichier et le met en place (au moins un bloc, éventuellement vide, écrit)
+    def close(self):
+        if self._writer is None:
+            raise ValueError(f"Aucun bloc écrit dans '{self.path}'")
+        self._writer.close()
+        os.replace(self.tmp_path, self.path)
+        return self.path
+
+    # Abandonne l'écriture : le fichier temporaire est supprimé, la cible reste inchangée
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
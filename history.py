@@ -0,0 +1,187 @@
+# history.py
+# Historique RH complet (un instantané mensuel de chaque employé), trop volumineux pour être
+# chargé en mémoire. Il est stocké en Parquet partitionné par instantané :
+#   <TURNOVER_HISTORY_DIR>/snapshot=2024-06/part-0.parquet
+# et interrogé par des scans pyarrow.dataset en flux, sans serveur : seules les colonnes utiles
+# sont lues, le filtre (instantané, job) est poussé dans le scan (élagage des partitions, puis
+# des row groups grâce à leurs statistiques) et les agrégats additifs sont cumulés lot par lot.
+# La mémoire reste bornée par la taille d'un instantané filtré, quelle que soit celle de l'historique.
+import hashlib
+import os
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from aggregations import ALL_JOBS, CURVE_BIN_WIDTHS, build_kpi_cube_from_chunks
+from charts import DENSITY_BINS
+from file_formats import COLUMN_TYPES
+
+# Répertoire de l'historique (vide : le Dashboard lit df_model.csv comme avant)
+HISTORY_DIR = os.environ.get("TURNOVER_HISTORY_DIR", "")
+# Colonne de partition : un instantané par mois (ex. 2024-06)
+SNAPSHOT_COLUMN = "snapshot"
+# Lignes par lot de lecture, et lots lus d'avance dans un fichier
+SCAN_BATCH_ROWS = int(os.environ.get("TURNOVER_HISTORY_BATCH_ROWS", 1_000_000))
+SCAN_BATCH_READAHEAD = 2
+# Lignes par row group à l'écriture : les lignes étant triées par job, un filtre sur un job
+# ne lit que les row groups dont les statistiques min/max le contiennent
+ROW_GROUP_ROWS = 128 * 1024
+
+# Colonnes lues pour le cube des KPI
+CUBE_COLUMNS = sorted({"job", "left", "satisfaction_level", "average_montly_hours", *CURVE_BIN_WIDTHS})
+
+
+# Fonction pour ouvrir l'historique (découverte des fichiers seulement, aucune donnée lue)
+def open_history(history_dir=HISTORY_DIR):
+    partitioning = ds.partitioning(pa.schema([(SNAPSHOT_COLUMN, pa.string())]), flavor="hive")
+    return ds.dataset(history_dir, format="parquet", partitioning=partitioning)
+
+
+# Version de l'historique : chemins, dates de modification et tailles des fichiers Parquet
+# (un instantané ajouté ou réécrit change la clé ; aucun contenu n'est relu)
+def history_version(history_dir=HISTORY_DIR):
+    digest = hashlib.blake2b(digest_size=8)
+    for root, dirs, files in os.walk(history_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.endswith(".parquet") or name.startswith("."):
+                continue
+            path = os.path.join(root, name)
+            stat = os.stat(path)
+            digest.update(f"{os.path.relpath(path, history_dir)}:{stat.st_mtime_ns}:{stat.st_size};".encode())
+    return digest.hexdigest()
+
+
+# Instantanés présents, du plus ancien au plus récent (lus dans les chemins des fichiers)
+def list_snapshots(dataset):
+    keys = (ds.get_partition_keys(fragment.partition_expression) for fragment in dataset.get_fragments())
+    return sorted({key[SNAPSHOT_COLUMN] for key in keys if SNAPSHOT_COLUMN in key})
+
+
+# Fonction pour écrire un instantané (DataFrame au format de df_model.csv) dans l'historique.
+# Écriture dans un fichier caché puis renommage : un scan ne voit jamais de fichier à moitié écrit.
+def write_snapshot(df, snapshot, history_dir=HISTORY_DIR, row_group_rows=ROW_GROUP_ROWS):
+    table = pa.Table.from_pandas(df.sort_values("job", kind="stable"), preserve_index=False)
+    table = table.select(list(COLUMN_TYPES)).cast(pa.schema(COLUMN_TYPES))
+    directory = os.path.join(history_dir, f"{SNAPSHOT_COLUMN}={snapshot}")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, "part-0.parquet")
+    tmp_path = os.path.join(directory, ".part-0.parquet.tmp")
+    pq.write_table(table, tmp_path, row_group_size=row_group_rows)
+    os.replace(tmp_path, path)
+    return path
+
+
+# ----------------------------
+# Scans en flux
+# ----------------------------
+# Filtre poussé dans le scan (None : tout l'historique, ALL_JOBS : tous les postes)
+def _filter(snapshot=None, job=ALL_JOBS):
+    conditions = []
+    if snapshot is not None:
+        conditions.append(ds.field(SNAPSHOT_COLUMN) == snapshot)
+    if job != ALL_JOBS:
+        conditions.append(ds.field("job") == job)
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+# Lignes filtrées de chaque fichier (un instantané), réduites aux colonnes demandées ; une table
+# vide si rien ne correspond (les agrégats gardent ainsi leur structure habituelle).
+# Les fichiers sont lus l'un après l'autre : un scan de tout le dataset lit d'avance sans limite
+# quand le consommateur (conversion pandas, agrégats) est plus lent que la lecture, et finit
+# par garder presque tout l'historique en mémoire. Un fichier à la fois borne la mémoire,
+# et le traiter d'un bloc évite le coût fixe de pandas sur chaque row group.
+def _scan(dataset, columns, snapshot=None, job=ALL_JOBS):
+    schema = pa.schema([dataset.schema.field(column) for column in columns])
+    empty = True
+    # Élagage des partitions sur l'instantané, puis filtre job dans chaque fichier
+    for fragment in dataset.get_fragments(filter=_filter(snapshot, job)):
+        batches = fragment.to_batches(
+            columns=columns,
+            filter=_filter(job=job),
+            batch_size=SCAN_BATCH_ROWS,
+            batch_readahead=SCAN_BATCH_READAHEAD,
+        )
+        table = pa.Table.from_batches(batches, schema=schema)
+        if table.num_rows:
+            empty = False
+            yield table
+    if empty:
+        yield schema.empty_table()
+
+
+# Bornes (min, max) de chaque colonne sur les lignes filtrées (colonnes absentes si aucune ligne)
+def _value_ranges(dataset, columns, snapshot=None, job=ALL_JOBS):
+    ranges = {}
+    for table in _scan(dataset, columns, snapshot, job):
+        if table.num_rows == 0:
+            continue
+        for column in columns:
+            bounds = pc.min_max(table.column(column))
+            low, high = bounds["min"].as_py(), bounds["max"].as_py()
+            if column in ranges:
+                low, high = min(low, ranges[column][0]), max(high, ranges[column][1])
+            ranges[column] = (low, high)
+    return ranges
+
+
+def _values(table, column):
+    return table.column(column).to_numpy()
+
+
+# ----------------------------
+# Agrégats du Dashboard
+# ----------------------------
+# Fonction pour construire le cube des KPI d'un instantané (même structure que build_kpi_cube)
+# en un seul scan : le filtre job est ensuite une simple lecture dans le cube
+def history_kpi_cube(dataset, snapshot=None):
+    return build_kpi_cube_from_chunks(table.to_pandas() for table in _scan(dataset, CUBE_COLUMNS, snapshot))
+
+
+# Fonction pour calculer l'histogramme d'une variable (mêmes classes que compute_histogram) :
+# un scan de la seule colonne pour ses bornes, puis un scan qui cumule les effectifs
+def history_histogram(dataset, feature, snapshot=None, job=ALL_JOBS, nbins=20):
+    ranges = _value_ranges(dataset, [feature], snapshot, job)
+    if feature not in ranges:
+        return {"edges": np.array([0.0, 1.0]), "counts": np.zeros(1, dtype=np.int64)}
+
+    low, high = ranges[feature]
+    if pa.types.is_integer(dataset.schema.field(feature).type) and high - low + 1 <= nbins:
+        counts = np.zeros(int(high - low + 1), dtype=np.int64)
+        for table in _scan(dataset, [feature], snapshot, job):
+            counts += np.bincount(_values(table, feature).astype(np.int64) - int(low), minlength=len(counts))
+        edges = np.arange(int(low), int(high) + 2, dtype=np.float64) - 0.5
+        return {"edges": edges, "counts": counts}
+
+    # Bords identiques à ceux de np.histogram(valeurs, bins=nbins) : ils ne dépendent que des bornes
+    edges = np.histogram_bin_edges(np.array([low, high], dtype=np.float64), bins=nbins)
+    counts = np.zeros(nbins, dtype=np.int64)
+    for table in _scan(dataset, [feature], snapshot, job):
+        counts += np.histogram(_values(table, feature).astype(np.float64), bins=edges)[0]
+    return {"edges": edges, "counts": counts}
+
+
+# Fonction pour calculer les grilles de densité du scatter (mêmes grilles que density_grids)
+def history_density(dataset, x, y, snapshot=None, job=ALL_JOBS, bins=DENSITY_BINS):
+    axes = list(dict.fromkeys([x, y]))
+    ranges = _value_ranges(dataset, axes, snapshot, job)
+    x_edges, y_edges = (
+        np.histogram_bin_edges(np.array(ranges.get(column, (0.0, 1.0)), dtype=np.float64), bins=bins)
+        for column in (x, y)
+    )
+    grids = {value: np.zeros((len(y_edges) - 1, len(x_edges) - 1)) for value in (0, 1)}
+    for table in _scan(dataset, axes + ["left"], snapshot, job):
+        x_values = _values(table, x).astype(np.float64)
+        y_values = _values(table, y).astype(np.float64)
+        left = _values(table, "left")
+        for value in (0, 1):
+            mask = left == value
+            counts, _, _ = np.histogram2d(x_values[mask], y_values[mask], bins=[x_edges, y_edges])
+            grids[value] += counts.T  # lignes = y, colonnes = x, comme attendu par go.Heatmap
+    return {"x_edges": x_edges, "y_edges": y_edges, "grids": grids}
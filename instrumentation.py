@@ -0,0 +1,151 @@
+# instrumentation.py
+import datetime
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import streamlit as st
+
+# Journal JSONL des temps par rerun (une ligne par exécution de page) ; chaîne vide = désactivé
+TIMING_LOG_PATH = os.environ.get("TURNOVER_TIMING_LOG", "timings.jsonl")
+# Mesure de la taille des figures envoyées, même sans le panneau (coûte une sérialisation de plus)
+MEASURE_PAYLOAD = os.environ.get("TURNOVER_TIMING_PAYLOAD", "0") == "1"
+
+# Les sessions tournent dans des threads du même processus : une écriture à la fois
+_log_lock = threading.Lock()
+
+
+# Fonction pour ajouter un enregistrement au journal des temps
+def append_record(record, path=TIMING_LOG_PATH):
+    if not path:
+        return
+    line = json.dumps(record, ensure_ascii=False, default=str)
+    with _log_lock:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+# ----------------------------
+# Chronométrage d'un rerun
+# ----------------------------
+class RerunTimer:
+    def __init__(self, page, session, run, show_panel):
+        self.page = page
+        self.session = session
+        self.run = run
+        self.show_panel = show_panel
+        self.measure_payload = show_panel or MEASURE_PAYLOAD
+        self.spans = {}
+        self.payload_bytes = {}
+        self.widgets = {}
+        self.figure_cache = {}
+        self._figure_cache_stats = None
+        self.finished = False
+        self._start = time.perf_counter()
+        # Emplacement réservé dans la barre latérale, rempli à la fin du rerun
+        self._panel = st.sidebar.empty() if show_panel else None
+
+    # Mesure une section de la page ; une section répétée cumule ses temps
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans[name] = self.spans.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+    # Valeurs des widgets qui déterminent le rerun (filtres, axes, sélection)
+    def record_widgets(self, **values):
+        self.widgets.update(values)
+
+    # Obtient une figure par le cache des figures en notant si elle y était déjà
+    def cached_figure(self, name, cache, key, build):
+        with self.span(f"figure.{name}"):
+            fig, hit = cache.lookup(key, build)
+        self.figure_cache[name] = "hit" if hit else "miss"
+        self._figure_cache_stats = cache.stats
+        return fig
+
+    # Affiche une figure Plotly en mesurant l'envoi, et sa taille quand elle est demandée
+    def plotly_chart(self, name, fig, **kwargs):
+        with self.span(f"render.{name}"):
+            result = st.plotly_chart(fig, **kwargs)
+        if self.measure_payload:
+            import plotly.io as pio
+
+            self.payload_bytes[name] = len(pio.to_json(fig, validate=False).encode("utf-8"))
+        return result
+
+    def record(self):
+        total_ms = (time.perf_counter() - self._start) * 1000
+        return {
+            "ts": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "session": self.session,
+            "page": self.page,
+            "run": self.run,
+            "widgets": self.widgets,
+            "total_ms": round(total_ms, 3),
+            "spans_ms": {name: round(ms, 3) for name, ms in self.spans.items()},
+            "payload_bytes": self.payload_bytes or None,
+            "figure_cache": self.figure_cache or None,
+        }
+
+    # Clôt le rerun : journal JSONL et, si demandé, panneau des temps dans la barre latérale
+    def finish(self):
+        if self.finished:
+            return
+        self.finished = True
+        record = self.record()
+        append_record(record)
+        if self._panel is not None:
+            self._render_panel(record)
+
+    # Clôt le rerun puis arrête la page (remplace st.stop)
+    def stop(self):
+        self.finish()
+        st.stop()
+
+    def _render_panel(self, record):
+        rows = [
+            {"Section": name, "ms": ms, "Octets": self.payload_bytes.get(name.removeprefix("render."))}
+            for name, ms in sorted(record["spans_ms"].items(), key=lambda item: -item[1])
+        ]
+        with self._panel.container():
+            st.markdown(f"**Temps du rerun :** {record['total_ms']:.0f} ms")
+            st.dataframe(rows, hide_index=True, use_container_width=True)
+            if self._figure_cache_stats is not None:
+                stats = self._figure_cache_stats()
+                hits = sum(1 for status in self.figure_cache.values() if status == "hit")
+                st.caption(
+                    f"Cache des figures : {hits}/{len(self.figure_cache)} figures réutilisées ce rerun, "
+                    f"{stats['hits']} succès / {stats['misses']} échecs au total, "
+                    f"{stats['entries']} figures ({stats['bytes'] / 2**20:.1f} Mo), "
+                    f"{stats['evictions']} évictions"
+                )
+
+
+def _timing_state():
+    state = st.session_state
+    if "timing_session" not in state:
+        state["timing_session"] = uuid.uuid4().hex[:12]
+        state["timing_runs"] = 0
+    return state
+
+
+# Fonction pour démarrer le chronométrage d'un rerun de page (après st.set_page_config)
+def start_rerun(page):
+    state = _timing_state()
+    state["timing_runs"] += 1
+    show_panel = st.sidebar.toggle("Afficher les temps d'exécution", key="show_timings")
+    return RerunTimer(page, state["timing_session"], state["timing_runs"], show_panel)
+
+
+# Fonction pour chronométrer une exécution de fragment : un fragment se rejoue seul, après la
+# clôture du timer de la page, il a donc le sien. Pas de panneau (un fragment ne peut pas
+# écrire dans la barre latérale) ; l'enregistrement porte le numéro du dernier rerun de page.
+def start_fragment(page):
+    state = _timing_state()
+    return RerunTimer(page, state["timing_session"], state["timing_runs"], show_panel=False)
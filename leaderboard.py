@@ -0,0 +1,146 @@
+# leaderboard.py
+import os
+
+import numpy as np
+
+from aggregations import ALL_JOBS
+from scoring import RISK_LEVELS
+
+# Nombre de positions gardées triées pour chaque couple (job, niveau de risque)
+LEADERBOARD_DEPTH = int(os.environ.get("TURNOVER_LEADERBOARD_DEPTH", 1000))
+# Libellé "tous niveaux de risque"
+ALL_TIERS = "Tous"
+
+_EMPTY = np.empty(0, dtype=np.int32)
+
+
+# Fonction pour sélectionner les m plus fortes probabilités parmi des positions, sans trier
+# tout le groupe : seuil par partition, puis tri des seules lignes retenues
+# (probabilité décroissante, puis position croissante pour un ordre stable entre pages)
+def top_positions(positions, proba, m):
+    values = proba[positions]
+    if m < len(positions):
+        cut = np.partition(values, len(values) - m)[len(values) - m]
+        positions = positions[values >= cut]
+    # Tri stable sur des positions croissantes : les ex aequo restent dans l'ordre des positions
+    positions = np.sort(positions)
+    return positions[np.argsort(-proba[positions], kind="stable")[:m]]
+
+
+# Groupe de chaque ligne : job * nombre de niveaux + niveau de risque ;
+# -1 pour les employés déjà partis (left = 1), hors classement
+def _group_codes(jobs, risk_codes, left):
+    codes = jobs.astype(np.int32) * len(RISK_LEVELS) + risk_codes
+    codes[left != 0] = -1
+    return codes
+
+
+# ----------------------------
+# Construction et mise à jour du classement
+# ----------------------------
+# Pour chaque groupe (job, niveau de risque) : ses membres (positions triées) et le haut de
+# son classement (LEADERBOARD_DEPTH positions, de la plus forte probabilité à la plus faible).
+# Les vues agrégées (un job tous niveaux, un niveau tous jobs, tout le monde) fusionnent les
+# hauts de classement de leurs groupes : le top-m d'une union est dans l'union des top-m.
+def build_leaderboard(df, scores, depth=LEADERBOARD_DEPTH):
+    codes = _group_codes(
+        df["job"].cat.codes.to_numpy(),
+        scores["risk_level"].cat.codes.to_numpy(),
+        df["left"].to_numpy(),
+    )
+    proba = scores["proba"].to_numpy()
+    # Tri stable par groupe (tri par base sur des petits entiers) : positions croissantes par groupe
+    order = np.argsort(codes, kind="stable").astype(np.int32)
+    bounds = np.flatnonzero(np.diff(codes[order])) + 1
+    members = {}
+    for chunk in np.split(order, bounds):
+        if len(chunk) and codes[chunk[0]] >= 0:
+            members[int(codes[chunk[0]])] = chunk
+    return {
+        "jobs": list(df["job"].cat.categories),
+        "depth": depth,
+        "codes": codes,
+        "members": members,
+        "top": {code: top_positions(chunk, proba, depth) for code, chunk in members.items()},
+    }
+
+
+# Fonction pour mettre à jour le classement après une ingestion : seules les lignes aux
+# positions données (modifiées ou ajoutées) changent de groupe ou de probabilité.
+# Le classement précédent n'est pas modifié (il reste servi jusqu'à la bascule).
+def update_leaderboard(board, df, scores, positions):
+    positions = np.sort(np.asarray(positions, dtype=np.int32))
+    old_codes = board["codes"]
+    codes = np.full(len(df), -1, dtype=np.int32)
+    codes[:len(old_codes)] = old_codes
+    previous = np.where(positions < len(old_codes), codes[np.minimum(positions, len(old_codes) - 1)], -1)
+    fresh = _group_codes(
+        df["job"].cat.codes.to_numpy()[positions],
+        scores["risk_level"].cat.codes.to_numpy()[positions],
+        df["left"].to_numpy()[positions],
+    )
+    codes[positions] = fresh
+    proba = scores["proba"].to_numpy()
+
+    members = dict(board["members"])
+    top = dict(board["top"])
+    for code in np.union1d(previous, fresh):
+        code = int(code)
+        if code < 0:
+            continue
+        leaving = positions[previous == code]
+        joining = positions[fresh == code]
+        old_members = members.get(code, _EMPTY)
+        group = np.delete(old_members, np.searchsorted(old_members, leaving))
+        group = np.insert(group, np.searchsorted(group, joining), joining)
+        old_top = top.get(code, _EMPTY)
+        kept = old_top[~np.isin(old_top, positions)]
+        # Des lignes du haut du classement ont bougé alors que le groupe dépassait la
+        # profondeur : les suivantes sont inconnues, le groupe est reclassé en entier
+        if len(kept) < len(old_top) and len(old_top) < len(old_members):
+            top[code] = top_positions(group, proba, board["depth"])
+        else:
+            top[code] = top_positions(np.concatenate([kept, joining]), proba, board["depth"])
+        members[code] = group
+    return {
+        "jobs": list(df["job"].cat.categories),
+        "depth": board["depth"],
+        "codes": codes,
+        "members": members,
+        "top": top,
+    }
+
+
+# ----------------------------
+# Lecture paginée
+# ----------------------------
+def _matching_codes(board, job, tier):
+    n_tiers = len(RISK_LEVELS)
+    jobs = range(len(board["jobs"])) if job == ALL_JOBS else [board["jobs"].index(job)]
+    tiers = range(n_tiers) if tier == ALL_TIERS else [RISK_LEVELS.index(tier)]
+    return [j * n_tiers + t for j in jobs for t in tiers if j * n_tiers + t in board["members"]]
+
+
+# Fonction pour lire une page du classement d'un job et d'un niveau de risque (ou "Tous").
+# Dans la profondeur précalculée, seuls les hauts de classement des groupes sont fusionnés ;
+# au-delà, le top nécessaire est sélectionné par partition parmi les membres du groupe.
+def leaderboard_page(board, proba, job=ALL_JOBS, tier=ALL_TIERS, page=1, page_size=50):
+    codes = _matching_codes(board, job, tier)
+    total = sum(len(board["members"][code]) for code in codes)
+    n_pages = max(1, -(-total // page_size))
+    page = min(max(page, 1), n_pages)
+    needed = min(page * page_size, total)
+    if needed <= board["depth"]:
+        candidates = [board["top"][code] for code in codes]
+    else:
+        candidates = [board["members"][code] for code in codes]
+    ranked = top_positions(np.concatenate(candidates or [_EMPTY]), proba, needed)
+    return ranked[(page - 1) * page_size:needed], n_pages, total
+
+
+# Fonction pour classer tout un job / niveau de risque (pages au-delà de la profondeur
+# précalculée ; le résultat se met en cache et se pagine ensuite par simple découpage)
+def view_ranking(board, proba, job=ALL_JOBS, tier=ALL_TIERS):
+    candidates = [board["members"][code] for code in _matching_codes(board, job, tier)]
+    positions = np.concatenate(candidates or [_EMPTY])
+    return top_positions(positions, proba, len(positions))
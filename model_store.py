@@ -0,0 +1,219 @@
+# model_store.py
+# Artefacts de modèle versionnés, produits par train.py et découverts par l'application :
+#   models/turnover-logistic-20250101T120000123456Z.npz   coefficients (tableaux NumPy seulement)
+#   models/turnover-logistic-20250101T120000123456Z.json  métadonnées (ordre des features, empreinte
+#                                                   des données, métriques, paramètres)
+# Le .npz se lit avec allow_pickle=False : aucun code arbitraire n'est exécuté au chargement,
+# contrairement aux pickles livrés. Le modèle est reconstruit en LogisticRegression sklearn,
+# utilisable tel quel par le scoring, les explications et les contrefactuels.
+# Un artefact n'est servi par l'application qu'une fois promu : models/ACTIVE contient le nom
+# de l'artefact promu (train.py --promote, ou python model_store.py promote <artefact>).
+# Sans promotion, le pickle livré reste servi ; les autres artefacts restent des challengers.
+import json
+import os
+import pickle
+from datetime import datetime, timezone
+
+import numpy as np
+
+from scoring import model_features
+
+# Répertoire des artefacts et pickle utilisé quand aucun artefact n'est présent
+MODEL_DIR = os.environ.get("TURNOVER_MODEL_DIR", "models")
+DEFAULT_MODEL_PATH = "logistic_model.pkl"
+# Pickles livrés, enregistrés pour la comparaison champion / challenger
+SHIPPED_MODELS = [DEFAULT_MODEL_PATH, "logistic_regression_model.pkl"]
+ARTIFACT_PREFIX = "turnover-logistic-"
+# Pointeur vers l'artefact promu, dans le répertoire des artefacts
+ACTIVE_FILE = "ACTIVE"
+# Version du format des artefacts (champ "format" du sidecar)
+ARTIFACT_FORMAT = 1
+
+
+# Numéro de version d'un nouvel artefact : date UTC à la microseconde, triable dans l'ordre
+# chronologique (deux entraînements dans la même seconde ont des versions distinctes)
+def new_version():
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+
+
+# Fonction pour écrire un artefact (coefficients dans l'espace des features brutes + sidecar).
+# Le sidecar est écrit en dernier : un artefact n'est découvert qu'une fois complet.
+# Une version déjà enregistrée (ou en cours d'écriture par un autre processus) n'est jamais
+# réécrite : FileExistsError.
+def save_artifact(coef, intercept, metadata, model_dir=MODEL_DIR, version=None):
+    version = version or new_version()
+    os.makedirs(model_dir, exist_ok=True)
+    base = os.path.join(model_dir, ARTIFACT_PREFIX + version)
+    sidecar = dict(metadata, format=ARTIFACT_FORMAT, version=version, features=list(model_features))
+    npz_path, json_path = base + ".npz", base + ".json"
+    if os.path.exists(npz_path) or os.path.exists(json_path):
+        raise FileExistsError(f"Artefact déjà enregistré : {npz_path}")
+    with open(npz_path + ".tmp", "xb") as f:
+        np.savez(
+            f,
+            coef=np.asarray(coef, dtype=np.float64).reshape(1, -1),
+            intercept=np.asarray([intercept], dtype=np.float64),
+        )
+    os.replace(npz_path + ".tmp", npz_path)
+    with open(json_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(sidecar, f, indent=2, ensure_ascii=False)
+    os.replace(json_path + ".tmp", json_path)
+    return npz_path
+
+
+# Artefacts complets (.npz et sidecar présents), du plus ancien au plus récent
+def list_artifacts(model_dir=MODEL_DIR):
+    if not os.path.isdir(model_dir):
+        return []
+    return [
+        os.path.join(model_dir, name[:-len(".json")] + ".npz")
+        for name in sorted(os.listdir(model_dir))
+        if name.startswith(ARTIFACT_PREFIX) and name.endswith(".json")
+        and os.path.exists(os.path.join(model_dir, name[:-len(".json")] + ".npz"))
+    ]
+
+
+# Métadonnées d'un artefact (sidecar JSON)
+def read_metadata(npz_path):
+    with open(os.path.splitext(npz_path)[0] + ".json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# Fonction pour charger un artefact sans unpickling : LogisticRegression reconstruite à
+# partir des coefficients, après vérification de l'ordre des features
+def load_artifact(npz_path):
+    from sklearn.linear_model import LogisticRegression
+
+    metadata = read_metadata(npz_path)
+    if metadata.get("features") != model_features:
+        raise ValueError(f"Features de '{npz_path}' différentes de model_features : {metadata.get('features')}")
+    with np.load(npz_path, allow_pickle=False) as arrays:
+        coef, intercept = arrays["coef"], arrays["intercept"]
+    # Hyperparamètres d'entraînement gardés dans le sidecar : seuls les coefficients servent ici
+    model = LogisticRegression()
+    model.coef_ = coef
+    model.intercept_ = intercept
+    model.classes_ = np.array([0, 1])
+    model.n_features_in_ = len(model_features)
+    model.feature_names_in_ = np.array(model_features, dtype=object)
+    return model
+
+
+# ----------------------------
+# Modèle actif de l'application
+# ----------------------------
+# Artefact promu (chemin du .npz), ou None : pointeur absent, ou artefact supprimé / incomplet
+def promoted_artifact(model_dir=MODEL_DIR):
+    try:
+        with open(os.path.join(model_dir, ACTIVE_FILE), encoding="utf-8") as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    path = os.path.join(model_dir, name)
+    return path if name and path in list_artifacts(model_dir) else None
+
+
+# Fonction pour promouvoir un artefact : il devient le modèle servi au prochain relevé des
+# fichiers. Le pointeur est réécrit atomiquement ; seul un artefact complet peut être promu.
+def promote(npz_path, model_dir=MODEL_DIR):
+    path = os.path.join(model_dir, os.path.basename(npz_path))
+    if path not in list_artifacts(model_dir):
+        raise ValueError(f"Artefact inconnu dans '{model_dir}' : {npz_path}")
+    pointer = os.path.join(model_dir, ACTIVE_FILE)
+    with open(pointer + ".tmp", "w", encoding="utf-8") as f:
+        f.write(os.path.basename(path) + "\n")
+    os.replace(pointer + ".tmp", pointer)
+    return path
+
+
+# Fonction pour retirer la promotion : le pickle livré redevient le modèle servi
+def demote(model_dir=MODEL_DIR):
+    try:
+        os.remove(os.path.join(model_dir, ACTIVE_FILE))
+    except FileNotFoundError:
+        pass
+
+
+# Chemin du modèle servi : l'artefact promu, sinon le pickle livré. Un artefact produit
+# par train.py sans promotion n'est jamais servi.
+def active_model_path(model_dir=MODEL_DIR, fallback=DEFAULT_MODEL_PATH):
+    return promoted_artifact(model_dir) or fallback
+
+
+# Clé de version du modèle actif : nom du fichier et empreinte de son contenu
+# (utilisable dans un nom de fichier ; le chemin se retrouve avec model_path_for_key)
+def model_version(model_dir=MODEL_DIR, fallback=DEFAULT_MODEL_PATH):
+    from file_formats import file_fingerprint
+
+    path = active_model_path(model_dir, fallback)
+    return f"{os.path.basename(path)}@{file_fingerprint(path)}"
+
+
+def model_path_for_key(model_key, model_dir=MODEL_DIR, fallback=DEFAULT_MODEL_PATH):
+    name = (model_key or "").split("@", 1)[0]
+    if name.endswith(".npz"):
+        return os.path.join(model_dir, name)
+    return name or fallback
+
+
+# Clés (nom@empreinte) des modèles enregistrés : pickles livrés présents, puis artefacts
+# du plus ancien au plus récent. Un fichier ajouté ou réécrit change la liste.
+def registered_models(model_dir=MODEL_DIR, shipped=SHIPPED_MODELS):
+    from file_formats import file_fingerprint
+
+    paths = [path for path in shipped if os.path.exists(path)] + list_artifacts(model_dir)
+    return tuple(f"{os.path.basename(path)}@{file_fingerprint(path)}" for path in paths)
+
+
+# Fonction pour charger le modèle d'une clé nom@empreinte. Si le fichier ne porte plus cette
+# empreinte (avant ou après la lecture), StaleVersionError : un autre contenu ne doit pas être
+# servi sous cette clé.
+def load_model_for_key(model_key, model_dir=MODEL_DIR, fallback=DEFAULT_MODEL_PATH):
+    from file_formats import StaleVersionError, file_fingerprint
+
+    path = model_path_for_key(model_key, model_dir, fallback)
+    expected = model_key.split("@", 1)[1] if model_key and "@" in model_key else None
+    if expected is None:
+        return load_model_file(path)
+    if file_fingerprint(path) == expected:
+        model = load_model_file(path)
+        if file_fingerprint(path) == expected:
+            return model
+    raise StaleVersionError(f"Modèle {model_key} remplacé sur le disque : rechargez la page.")
+
+
+# Fonction pour charger un modèle : artefact .npz (sans unpickling) ou pickle livré
+def load_model_file(path):
+    if path.endswith(".npz"):
+        return load_artifact(path)
+    with open(path, "rb") as f:
+        return pickle.load(f)  # ou joblib.load(f) si utilisé
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Artefacts de modèle et promotion du modèle servi")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="Artefacts enregistrés et modèle servi")
+    promote_parser = commands.add_parser("promote", help="Sert un artefact (nom ou chemin du .npz)")
+    promote_parser.add_argument("artifact")
+    commands.add_parser("demote", help="Sert de nouveau le pickle livré")
+    args = parser.parse_args()
+
+    if args.command == "promote":
+        try:
+            promote(args.artifact, args.model_dir)
+        except ValueError as e:
+            parser.error(str(e))
+    elif args.command == "demote":
+        demote(args.model_dir)
+    active = active_model_path(args.model_dir)
+    for path in list_artifacts(args.model_dir):
+        print(("* " if path == active else "  ") + os.path.basename(path))
+    print(f"Modèle servi : {active}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,219 @@
 # pages/1_Dashboard.py
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 
+from aggregations import (
+    ALL_JOBS,
+    CURVE_BIN_WIDTHS,
+    binned_curve,
+    compute_histogram,
+    cube_curve,
+    kpi_values,
+)
+from artifacts import get_figure_cache, get_history, get_history_cube, get_kpi_cube, start_background_warmup
+from charts import (
+    density_figure,
+    density_grids,
+    histogram_figure,
+    scatter_mode,
+    scatter_points_figure,
+    stratified_sample,
+)
+from data_store import load_data
+from history import HISTORY_DIR, history_density, history_histogram, history_version, list_snapshots
+from instrumentation import start_rerun
+
 st.set_page_config(page_title="Dashboard - Turnover", layout="wide")
+watcher = start_background_warmup()
+
+# Chronométrage des sections de la page (panneau optionnel et journal timings.jsonl)
+timer = start_rerun("dashboard")
+
+# Fonction pour tracer une courbe de turnover binnée avec sa bande de confiance (Wilson 95 %)
+def plot_turnover_curve(curve, title, x_label, turnover_mean):
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=curve["x_value"], y=curve["upper"],
+        mode="lines", line=dict(width=0), hoverinfo="skip", showlegend=False
+    ))
+    fig.add_trace(go.Scatter(
+        x=curve["x_value"], y=curve["lower"],
+        mode="lines", line=dict(width=0), fill="tonexty", fillcolor="rgba(99, 110, 250, 0.2)",
+        name="IC 95 %", hoverinfo="skip"
+    ))
+    fig.add_trace(go.Scatter(
+        x=curve["x_value"], y=curve["turnover"],
+        mode="lines+markers", name="Taux de Turnover",
+        customdata=curve["count"],
+        hovertemplate="%{x}<br>Turnover : %{y:.2f}<br>Effectif : %{customdata:.0f}<extra></extra>"
+    ))
+    fig.add_hline(
+        y=turnover_mean,
+        line_dash="dash",
+        line_color="red",
+        annotation_text=f"Turnover Moyen: {turnover_mean:.2f}",
+        annotation_position="top left"
+    )
+    fig.update_layout(title=title, xaxis_title=x_label, yaxis_title="Taux de Turnover", showlegend=False)
+    return fig
+
+# Fonction pour obtenir une courbe : classes du cube (largeur fixe) ou quantiles sur les lignes
+# du job (rows() ne filtre les données qu'ici)
+def turnover_curve(kpi_cube, rows, job, column, binning, width_factor, n_quantiles):
+    if binning == "Quantiles":
+        df = rows()
+        return binned_curve(df[column], df["left"], n_quantiles=n_quantiles)
+    return cube_curve(kpi_cube, column, job, factor=width_factor)
 
-@st.cache_data
-def load_data():
-    df = pd.read_csv("df_model.csv")
-    return df
+# Fonction pour comparer la satisfaction moyenne des partants et des restants
+def plot_satisfaction_compare(satisfaction_left, satisfaction_stay):
+    df_compare = pd.DataFrame({
+        "Statut": ["Partants", "Restants"],
+        "Satisfaction": [satisfaction_left, satisfaction_stay]
+    })
+    return px.bar(
+        df_compare, 
+        x="Statut", 
+        y="Satisfaction", 
+        range_y=[0,1], 
+        title="Comparaison Satisfaction"
+    )
+
+# Fonction pour tracer le turnover par niveau de salaire (lecture dans le cube)
+def plot_salary_turnover(kpi_cube, job):
+    df_salary = cube_curve(kpi_cube, "salary_encoded", job).rename(
+        columns={"x_value": "salary_encoded", "turnover": "left"}
+    )
+    return px.bar(
+        df_salary, 
+        x="salary_encoded", 
+        y="left",
+        title="Turnover par Niveau de Salaire (Moyenne)",
+        labels={"salary_encoded": "Niveau de Salaire", "left": "Taux de Turnover"}
+    )
 
-df = load_data()
+# Fonction pour tracer les départs par poste (absolu ou taux, au choix par boutons)
+def plot_job_pie(kpi_cube, jobs_shown):
+    df_job_full = kpi_cube["kpis"].loc[jobs_shown, ["count", "left_sum"]].rename_axis("job").reset_index()
+    df_job_full["left_rate"] = df_job_full["left_sum"] / df_job_full["count"]
+
+    fig_job = go.Figure()
+    # Trace 1 : Nombre absolu
+    fig_job.add_trace(go.Pie(
+        labels=df_job_full["job"],
+        values=df_job_full["left_sum"],
+        name="Départs (Absolu)",
+        hole=0.3
+    ))
+    # Trace 2 : Taux de départs
+    fig_job.add_trace(go.Pie(
+        labels=df_job_full["job"],
+        values=df_job_full["left_rate"],
+        name="Taux de départs",
+        visible=False,
+        hole=0.3
+    ))
+    fig_job.update_layout(
+        title="Nombre de Départs par Poste (Absolu) vs Taux de Départ par Poste",
+        updatemenus=[
+            dict(
+                type="buttons",
+                buttons=[
+                    dict(
+                        label="Nombre (Absolu)",
+                        method="update",
+                        args=[{"visible": [True, False]}]
+                    ),
+                    dict(
+                        label="Taux (Pourcentage)",
+                        method="update",
+                        args=[{"visible": [False, True]}]
+                    )
+                ]
+            )
+        ]
+    )
+    return fig_job
+
+# Fonction pour construire le scatter : grilles de densité, ou points (tous ou un
+# échantillon qui garde les partants) avec leur position pour la sélection
+def plot_scatter(df, x_var, y_var, mode, large_view, title):
+    if large_view == "Densité":
+        density = density_grids(df[x_var], df[y_var], df["left"])
+        return density_figure(density, title, x_var, y_var)
+    positions = stratified_sample(df["left"].to_numpy()) if mode == "density" else np.arange(len(df))
+    return scatter_points_figure(
+        df[x_var].to_numpy()[positions],
+        df[y_var].to_numpy()[positions],
+        df["left"].to_numpy()[positions],
+        positions,
+        title,
+        x_var,
+        y_var,
+        webgl=mode != "svg"
+    )
+
+# Source des données : historique RH partitionné (TURNOVER_HISTORY_DIR), interrogé par scans
+# sans jamais être chargé, ou population courante chargée en mémoire
+if HISTORY_DIR:
+    with timer.span("history"):
+        history_key = history_version(HISTORY_DIR)
+        history = get_history(history_key)
+        snapshots = list_snapshots(history)
+    if not snapshots:
+        st.write("Aucun instantané dans l'historique.")
+        timer.stop()
+    snapshot = st.sidebar.selectbox("Instantané de l'historique :", snapshots, index=len(snapshots) - 1)
+    timer.record_widgets(snapshot=snapshot)
+    dataset_key = f"{history_key}:{snapshot}"
+    df = None
+else:
+    history = None
+    # Version des données servie pendant tout ce rerun (bascule atomique après rechargement)
+    dataset_key = watcher.versions()["dataset"]
+    with timer.span("load_data"):
+        df = load_data(dataset_key)
+
+# Histogrammes binnés côté serveur, une fois par (variable, filtre job)
+@st.cache_resource(max_entries=128)
+def get_histogram(dataset_key, feature, job, nbins, _df):
+    values = _df[feature] if job == ALL_JOBS else _df.loc[_df["job"] == job, feature]
+    return compute_histogram(values.to_numpy(), nbins=nbins)
+
+# Histogrammes de l'historique : filtre instantané / job poussé dans le scan
+@st.cache_resource(max_entries=128)
+def get_history_histogram(dataset_key, snapshot, feature, job, nbins, _history):
+    return history_histogram(_history, feature, snapshot, job, nbins)
+
+# Grilles de densité du scatter de l'historique, une fois par (axes, filtre job)
+@st.cache_resource(max_entries=32)
+def get_history_density(dataset_key, snapshot, x_var, y_var, job, _history):
+    return history_density(_history, x_var, y_var, snapshot, job)
+
+# Fonction pour obtenir l'histogramme d'une variable pour le job sélectionné, selon la source
+def job_histogram(feature, nbins):
+    if history is not None:
+        return get_history_histogram(dataset_key, snapshot, feature, selected_job, nbins, history)
+    return get_histogram(dataset_key, feature, selected_job, nbins, df)
+
+# Fonction pour construire le scatter de l'historique : grilles de densité seulement
+# (les points ne sont pas chargés)
+def plot_history_scatter(x_var, y_var, title):
+    density = get_history_density(dataset_key, snapshot, x_var, y_var, selected_job, history)
+    return density_figure(density, title, x_var, y_var)
+
+# Cube des KPI précalculé par job (une seule fois par version des données ou par instantané)
+with timer.span("kpi_cube"):
+    if history is not None:
+        kpi_cube = get_history_cube(history_key, snapshot, history)
+    else:
+        kpi_cube = get_kpi_cube(dataset_key, df)
+
+# Figures déjà construites pour les mêmes filtres et la même version des données
+figure_cache = get_figure_cache()
 
 st.title("KPI Dashboard - Turnover")
 st.subheader("Visualisez les indicateurs clés de performance")
@@ -19,28 +221,40 @@ st.subheader("Visualisez les indicateurs clés de performance")
 # ----------------------------
 # Sélecteur de job (filtre)
 # ----------------------------
-all_jobs = sorted(df["job"].unique())
+all_jobs = sorted(job for job in kpi_cube["kpis"].index if job != ALL_JOBS)
 selected_job = st.selectbox(
     "Choisissez un Job à afficher :",
-    options=["Tous"] + all_jobs,
+    options=[ALL_JOBS] + all_jobs,
     index=0
 )
 
-if selected_job != "Tous":
-    df = df[df["job"] == selected_job]
+timer.record_widgets(job=selected_job)
+
+# Lignes du job sélectionné, filtrées au premier besoin seulement (scatter, courbes en quantiles,
+# détail d'un point) et une fois par rerun : KPI, histogrammes et courbes à largeur fixe sont lus
+# dans le cube, et une figure déjà en cache ne filtre rien
+_job_rows = {}
+def job_rows():
+    if "df" not in _job_rows:
+        with timer.span("job_filter"):
+            _job_rows["df"] = df if selected_job == ALL_JOBS else df[df["job"] == selected_job]
+    return _job_rows["df"]
 
 # ----------------------------
-# Calculs des métriques de base
+# Calculs des métriques de base (lecture dans le cube)
 # ----------------------------
-if not df.empty:
-    turnover_rate = df["left"].mean() * 100
-    avg_satisfaction = df["satisfaction_level"].mean()
-    avg_monthly_hours = df["average_montly_hours"].mean()
-
-    # Calcul de l'écart de satisfaction entre partants et restants
-    satisfaction_left = df.loc[df["left"] == 1, "satisfaction_level"].mean()
-    satisfaction_stay = df.loc[df["left"] == 0, "satisfaction_level"].mean()
-    satisfaction_gap = satisfaction_stay - satisfaction_left if not pd.isna(satisfaction_left) and not pd.isna(satisfaction_stay) else 0
+with timer.span("kpis"):
+    kpis = kpi_values(kpi_cube, selected_job)
+has_data = kpis is not None
+if has_data:
+    turnover_rate = kpis["turnover_rate"]
+    avg_satisfaction = kpis["avg_satisfaction"]
+    avg_monthly_hours = kpis["avg_monthly_hours"]
+
+    # Écart de satisfaction entre partants et restants
+    satisfaction_left = kpis["satisfaction_left"]
+    satisfaction_stay = kpis["satisfaction_stay"]
+    satisfaction_gap = kpis["satisfaction_gap"]
 else:
     turnover_rate = 0
     avg_satisfaction = 0
@@ -55,56 +269,60 @@ col1, col2, col3, col4 = st.columns(4)
 with col1:
     st.metric("Turnover Global (%)", f"{turnover_rate:.1f}%")
     with st.expander("Détails sur le Turnover"):
-        if not df.empty:
-            fig_turnover = px.histogram(df, x="left", title="Histogramme du Turnover (0=reste, 1=quitte)")
-            st.plotly_chart(fig_turnover, use_container_width=True)
+        if has_data:
+            fig_turnover = timer.cached_figure(
+                "turnover_hist", figure_cache, ("turnover_hist", dataset_key, selected_job),
+                lambda: histogram_figure(
+                    job_histogram("left", 2),
+                    title="Histogramme du Turnover (0=reste, 1=quitte)",
+                    x_label="left"
+                )
+            )
+            timer.plotly_chart("turnover_hist", fig_turnover, use_container_width=True)
         else:
             st.write("Aucune donnée pour ce filtre.")
 
 with col2:
     st.metric("Satisfaction Moyenne", f"{avg_satisfaction:.2f}")
     with st.expander("Détails sur la Satisfaction"):
-        if not df.empty:
-            fig_satisfaction = px.histogram(
-                df, 
-                x="satisfaction_level", 
-                nbins=20, 
-                title="Histogramme du niveau de Satisfaction"
+        if has_data:
+            fig_satisfaction = timer.cached_figure(
+                "satisfaction_hist", figure_cache, ("satisfaction_hist", dataset_key, selected_job),
+                lambda: histogram_figure(
+                    job_histogram("satisfaction_level", 20),
+                    title="Histogramme du niveau de Satisfaction",
+                    x_label="satisfaction_level"
+                )
             )
-            st.plotly_chart(fig_satisfaction, use_container_width=True)
+            timer.plotly_chart("satisfaction_hist", fig_satisfaction, use_container_width=True)
         else:
             st.write("Aucune donnée pour ce filtre.")
 
 with col3:
     st.metric("Heures Mensuelles Moyennes", f"{avg_monthly_hours:.0f} h")
     with st.expander("Détails sur les Heures Mensuelles"):
-        if not df.empty:
-            fig_hours = px.histogram(
-                df, 
-                x="average_montly_hours", 
-                nbins=20, 
-                title="Histogramme des Heures Mensuelles"
+        if has_data:
+            fig_hours = timer.cached_figure(
+                "hours_hist", figure_cache, ("hours_hist", dataset_key, selected_job),
+                lambda: histogram_figure(
+                    job_histogram("average_montly_hours", 20),
+                    title="Histogramme des Heures Mensuelles",
+                    x_label="average_montly_hours"
+                )
             )
-            st.plotly_chart(fig_hours, use_container_width=True)
+            timer.plotly_chart("hours_hist", fig_hours, use_container_width=True)
         else:
             st.write("Aucune donnée pour ce filtre.")
 
 with col4:
     st.metric("Écart de Satisfaction", f"{satisfaction_gap:.2f} pts")
     with st.expander("Satisfaction : Partants vs Restants"):
-        if not df.empty:
-            df_compare = pd.DataFrame({
-                "Statut": ["Partants", "Restants"],
-                "Satisfaction": [satisfaction_left, satisfaction_stay]
-            })
-            fig_comp = px.bar(
-                df_compare, 
-                x="Statut", 
-                y="Satisfaction", 
-                range_y=[0,1], 
-                title="Comparaison Satisfaction"
+        if has_data:
+            fig_comp = timer.cached_figure(
+                "satisfaction_compare", figure_cache, ("satisfaction_compare", dataset_key, selected_job),
+                lambda: plot_satisfaction_compare(satisfaction_left, satisfaction_stay)
             )
-            st.plotly_chart(fig_comp, use_container_width=True)
+            timer.plotly_chart("satisfaction_compare", fig_comp, use_container_width=True)
         else:
             st.write("Aucune donnée pour ce filtre.")
 
@@ -117,115 +335,76 @@ row1_col1, row1_col2 = st.columns(2)
 
 # 1) Turnover par Niveau de Salaire
 with row1_col1:
-    if not df.empty:
-        df_salary = df.groupby("salary_encoded", as_index=False)["left"].mean()
-        fig_salary = px.bar(
-            df_salary, 
-            x="salary_encoded", 
-            y="left",
-            title="Turnover par Niveau de Salaire (Moyenne)",
-            labels={"salary_encoded": "Niveau de Salaire", "left": "Taux de Turnover"}
+    if has_data:
+        fig_salary = timer.cached_figure(
+            "salary_turnover", figure_cache, ("salary_turnover", dataset_key, selected_job),
+            lambda: plot_salary_turnover(kpi_cube, selected_job)
         )
-        st.plotly_chart(fig_salary, use_container_width=True)
+        timer.plotly_chart("salary_turnover", fig_salary, use_container_width=True)
     else:
         st.write("Aucune donnée.")
 
 # 2) Job vs Turnover (Pie chart)
 with row1_col2:
-    if not df.empty:
-        df_job_full = df.groupby("job").agg(
-            total_count=("job", "count"),
-            left_sum=("left", "sum")
-        ).reset_index()
-        df_job_full["left_rate"] = df_job_full["left_sum"] / df_job_full["total_count"]
-
-        fig_job = go.Figure()
-        # Trace 1 : Nombre absolu
-        fig_job.add_trace(go.Pie(
-            labels=df_job_full["job"],
-            values=df_job_full["left_sum"],
-            name="Départs (Absolu)",
-            hole=0.3
-        ))
-        # Trace 2 : Taux de départs
-        fig_job.add_trace(go.Pie(
-            labels=df_job_full["job"],
-            values=df_job_full["left_rate"],
-            name="Taux de départs",
-            visible=False,
-            hole=0.3
-        ))
-        fig_job.update_layout(
-            title="Nombre de Départs par Poste (Absolu) vs Taux de Départ par Poste",
-            updatemenus=[
-                dict(
-                    type="buttons",
-                    buttons=[
-                        dict(
-                            label="Nombre (Absolu)",
-                            method="update",
-                            args=[{"visible": [True, False]}]
-                        ),
-                        dict(
-                            label="Taux (Pourcentage)",
-                            method="update",
-                            args=[{"visible": [False, True]}]
-                        )
-                    ]
-                )
-            ]
+    if has_data:
+        jobs_shown = all_jobs if selected_job == ALL_JOBS else [selected_job]
+        fig_job = timer.cached_figure(
+            "job_pie", figure_cache, ("job_pie", dataset_key, selected_job),
+            lambda: plot_job_pie(kpi_cube, jobs_shown)
         )
-        st.plotly_chart(fig_job, use_container_width=True)
+        timer.plotly_chart("job_pie", fig_job, use_container_width=True)
     else:
         st.write("Aucune donnée.")
 
+# Réglage du découpage des courbes de turnover
+binning_col1, binning_col2 = st.columns(2)
+with binning_col1:
+    # Les quantiles demandent les valeurs brutes : indisponibles sur l'historique
+    binning_options = ["Largeur fixe"] if history is not None else ["Largeur fixe", "Quantiles"]
+    binning = st.radio("Découpage des courbes :", binning_options, horizontal=True)
+with binning_col2:
+    if binning == "Quantiles":
+        n_quantiles = st.slider("Nombre de classes (quantiles)", min_value=4, max_value=50, value=20)
+        width_factor = 1
+    else:
+        width_factor = st.select_slider(
+            "Largeur de classe (multiple de la largeur de base)", options=[1, 2, 5, 10], value=2
+        )
+        n_quantiles = None
+timer.record_widgets(binning=binning, width_factor=width_factor, n_quantiles=n_quantiles)
+curve_settings = (binning, width_factor, n_quantiles)
+
 row2_col1, row2_col2 = st.columns(2)
 
 # 3) Turnover vs Heures Mensuelles
 with row2_col1:
-    if not df.empty:
-        df_hours_evol = df.groupby("average_montly_hours", as_index=False)["left"].mean()
-        df_hours_evol.rename(columns={"average_montly_hours": "x_value", "left": "turnover"}, inplace=True)
-        fig_hours_evol = px.line(
-            df_hours_evol.sort_values("x_value"),
-            x="x_value",
-            y="turnover",
-            title="Évolution du Turnover selon les Heures Mensuelles",
-            labels={"x_value": "Heures Mensuelles", "turnover": "Taux de Turnover"}
-        )
-        turnover_mean = df["left"].mean()
-        fig_hours_evol.add_hline(
-            y=turnover_mean,
-            line_dash="dash",
-            line_color="red",
-            annotation_text=f"Turnover Moyen: {turnover_mean:.2f}",
-            annotation_position="top left"
+    if has_data:
+        fig_hours_evol = timer.cached_figure(
+            "hours_curve", figure_cache, ("hours_curve", dataset_key, selected_job, curve_settings),
+            lambda: plot_turnover_curve(
+                turnover_curve(kpi_cube, job_rows, selected_job, "average_montly_hours", binning, width_factor, n_quantiles),
+                "Évolution du Turnover selon les Heures Mensuelles",
+                "Heures Mensuelles",
+                turnover_rate / 100
+            )
         )
-        st.plotly_chart(fig_hours_evol, use_container_width=True)
+        timer.plotly_chart("hours_curve", fig_hours_evol, use_container_width=True)
     else:
         st.write("Aucune donnée.")
 
 # 4) Turnover vs Satisfaction
 with row2_col2:
-    if not df.empty:
-        df_satisf_evol = df.groupby("satisfaction_level", as_index=False)["left"].mean()
-        df_satisf_evol.rename(columns={"satisfaction_level": "x_value", "left": "turnover"}, inplace=True)
-        fig_satisf_evol = px.line(
-            df_satisf_evol.sort_values("x_value"),
-            x="x_value",
-            y="turnover",
-            title="Évolution du Turnover selon la Satisfaction",
-            labels={"x_value": "Niveau de Satisfaction", "turnover": "Taux de Turnover"}
-        )
-        turnover_mean_satisf = df["left"].mean()
-        fig_satisf_evol.add_hline(
-            y=turnover_mean_satisf,
-            line_dash="dash",
-            line_color="red",
-            annotation_text=f"Turnover Moyen: {turnover_mean_satisf:.2f}",
-            annotation_position="top left"
+    if has_data:
+        fig_satisf_evol = timer.cached_figure(
+            "satisfaction_curve", figure_cache, ("satisfaction_curve", dataset_key, selected_job, curve_settings),
+            lambda: plot_turnover_curve(
+                turnover_curve(kpi_cube, job_rows, selected_job, "satisfaction_level", binning, width_factor, n_quantiles),
+                "Évolution du Turnover selon la Satisfaction",
+                "Niveau de Satisfaction",
+                turnover_rate / 100
+            )
         )
-        st.plotly_chart(fig_satisf_evol, use_container_width=True)
+        timer.plotly_chart("satisfaction_curve", fig_satisf_evol, use_container_width=True)
     else:
         st.write("Aucune donnée.")
 
@@ -235,26 +414,67 @@ with row2_col2:
 # ----------------------------
 st.subheader("Scatter Plot Dynamique")
 
-if not df.empty:
-    numeric_cols = [
-        "satisfaction_level",
-        "last_evaluation",
-        "number_project",
-        "average_montly_hours",
-        "time_spend_company",
-        "salary_encoded"
-    ]
+if has_data:
+    numeric_cols = list(CURVE_BIN_WIDTHS)
     x_var = st.selectbox("Axe X", numeric_cols, index=0)
     y_var = st.selectbox("Axe Y", numeric_cols, index=3)
 
-    fig_scatter = px.scatter(
-        df,
-        x=x_var,
-        y=y_var,
-        color="left",
-        title=f"{x_var} vs {y_var} (coloré par Turnover)",
-        hover_data=["id_colab", "job"]
+    scatter_title = f"{x_var} vs {y_var} (coloré par Turnover)"
+    if history is not None:
+        mode, large_view = "density", "Densité"
+        st.caption(f"{kpis['count']} employés dans l'instantané {snapshot} : vue densité calculée par scan de l'historique.")
+    else:
+        mode = scatter_mode(kpis["count"])
+        if mode == "density":
+            large_view = st.radio(
+                f"{kpis['count']} points : mode d'affichage",
+                ["Densité", "Échantillon stratifié"],
+                horizontal=True
+            )
+        else:
+            large_view = None
+    timer.record_widgets(x_var=x_var, y_var=y_var, scatter_mode=mode, large_view=large_view)
+
+    fig_scatter = timer.cached_figure(
+        "scatter", figure_cache, ("scatter", dataset_key, selected_job, x_var, y_var, mode, large_view),
+        lambda: plot_history_scatter(x_var, y_var, scatter_title) if history is not None
+        else plot_scatter(job_rows(), x_var, y_var, mode, large_view, scatter_title)
     )
-    st.plotly_chart(fig_scatter, use_container_width=True)
+    if large_view == "Densité":
+        timer.plotly_chart("scatter", fig_scatter, use_container_width=True)
+    else:
+        scatter_event = timer.plotly_chart(
+            "scatter",
+            fig_scatter,
+            use_container_width=True,
+            on_select="rerun",
+            selection_mode="points",
+            key="scatter_plot"
+        )
+
+        # Détails à la demande du point sélectionné
+        selected_points = scatter_event.selection.points if scatter_event else []
+        if selected_points:
+            position = int(np.ravel(selected_points[0]["customdata"])[0])
+            st.dataframe(
+                job_rows().iloc[[position]][["id_colab", "job", x_var, y_var, "left"]],
+                hide_index=True
+            )
+        else:
+            st.caption("Cliquez sur un point pour afficher l'employé correspondant.")
+
+    # Courbe de turnover binnée de la variable en abscisse
+    fig_x_curve = timer.cached_figure(
+        "x_curve", figure_cache, ("x_curve", dataset_key, selected_job, x_var, curve_settings),
+        lambda: plot_turnover_curve(
+            turnover_curve(kpi_cube, job_rows, selected_job, x_var, binning, width_factor, n_quantiles),
+            f"Évolution du Turnover selon {x_var}",
+            x_var,
+            turnover_rate / 100
+        )
+    )
+    timer.plotly_chart("x_curve", fig_x_curve, use_container_width=True)
 else:
     st.write("Aucune donnée.")
+
+timer.finish()
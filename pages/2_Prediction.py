@@ -1,14 +1,55 @@
 # pages/2_Prediction.py
 import streamlit as st
 import pandas as pd
-import pickle  # ou import joblib si utilisé
-import shap
 import plotly.graph_objects as go
 import streamlit.components.v1 as components
 import base64
 
-# Fonction pour afficher les graphiques SHAP
+from aggregations import compute_histogram
+from artifacts import (
+    get_background_jobs,
+    get_counterfactuals,
+    get_employee_index,
+    get_figure_cache,
+    get_score_table,
+    get_scoring_service,
+    get_service_registry,
+    get_shap_table,
+    load_model,
+    start_background_warmup,
+)
+from charts import histogram_trace
+from data_store import (
+    employee_position,
+    load_data,
+    paginate,
+    search_employees,
+)
+from counterfactuals import ACTIONABLE_FEATURES, TARGET_PROBA
+from explanations import (
+    BACKGROUND_METHOD,
+    BACKGROUND_SIZE,
+    build_explainer,
+    employee_explanation,
+    is_linear_model,
+    summarize_background,
+)
+from scoring import (
+    RISK_LEVELS,
+    RISK_THRESHOLDS,
+    MicroBatcher,
+    assign_risk_level,
+    export_path,
+    model_features,
+    open_export,
+)
+from instrumentation import start_fragment, start_rerun
+from what_if import feature_grids, feature_ranges, sensitivity_curves, what_if_proba
+
+# Fonction pour afficher les graphiques SHAP (shap n'est importé qu'à l'utilisation)
 def st_shap(plot, height=None):
+    import shap
+
     shap_html = f"<head>{shap.getjs()}</head><body>{plot.html()}</body>"
     components.html(shap_html, height=height)
 
@@ -37,8 +78,61 @@ def plot_gauge(prob):
     fig.update_layout(height=300, margin={'t': 50, 'b': 0, 'l':0, 'r':0})
     return fig
 
+# Fonction pour tracer la distribution d'une feature avec la valeur de l'employé
+def plot_dispersion(histogram, feature, employee_value):
+    # Créer le graphique avec Plotly
+    fig = go.Figure()
+
+    # Ajouter l'histogramme (binné côté serveur, mis en cache par variable)
+    fig.add_trace(histogram_trace(
+        histogram,
+        name='Distribution',
+        marker_color='lightblue',
+        opacity=0.7
+    ))
+
+    # Ajouter une ligne verticale pour la valeur de l'employé
+    fig.add_vline(x=employee_value, line=dict(color='red', width=2, dash='dash'), 
+                 annotation=dict(text=f"Valeur de l'employé: {employee_value}", 
+                                 showarrow=True, arrowhead=1, ax=0, ay=-40))
+
+    # Mise en page du graphique
+    fig.update_layout(
+        title=f'Distribution de {feature}',
+        xaxis_title=feature,
+        yaxis_title='Fréquence',
+        bargap=0.2,
+        height=300,
+        margin=dict(l=20, r=20, t=40, b=20),
+        showlegend=False
+    )
+    return fig
+
+# Fonction pour tracer les courbes de sensibilité de l'employé (une par feature)
+def plot_sensitivity(curves, employee_values):
+    from plotly.subplots import make_subplots
+
+    cols_per_row = 4
+    rows = (len(model_features) + cols_per_row - 1) // cols_per_row
+    fig = make_subplots(rows=rows, cols=cols_per_row, subplot_titles=model_features, shared_yaxes=True)
+    for i, feature in enumerate(model_features):
+        row, col = i // cols_per_row + 1, i % cols_per_row + 1
+        fig.add_trace(go.Scatter(
+            x=curves[feature]["grid"], y=curves[feature]["proba"] * 100,
+            mode="lines", line=dict(color="darkblue"), name=feature,
+            hovertemplate=f"{feature}=%{{x}}<br>Probabilité : %{{y:.1f}} %<extra></extra>"
+        ), row=row, col=col)
+        # Valeur actuelle de l'employé
+        fig.add_vline(x=float(employee_values[feature]), line=dict(color="red", width=1, dash="dash"), row=row, col=col)
+    # Seuils des niveaux de risque
+    for threshold, color in zip(RISK_THRESHOLDS, ["orange", "red"]):
+        fig.add_hline(y=threshold * 100, line=dict(color=color, width=1, dash="dot"))
+    fig.update_yaxes(range=[0, 100])
+    fig.update_layout(height=250 * rows, showlegend=False, margin=dict(l=20, r=20, t=40, b=20))
+    return fig
+
 # Fonction pour générer des graphiques de dispersion avec Plotly
-def plot_dispersion_plotly(df, selected_features, employee_values):
+def plot_dispersion_plotly(histograms, selected_features, employee_values):
     num_features = len(selected_features)
     cols_per_row = 2  # Nombre de colonnes par rangée
     rows = (num_features + cols_per_row - 1) // cols_per_row  # Calcul du nombre de rangées nécessaires
@@ -50,72 +144,40 @@ def plot_dispersion_plotly(df, selected_features, employee_values):
             if feature_idx < num_features:
                 feature = selected_features[feature_idx]
                 employee_value = employee_values[feature]
-                
-                # Créer le graphique avec Plotly
-                fig = go.Figure()
-
-                # Ajouter l'histogramme
-                fig.add_trace(go.Histogram(
-                    x=df[feature],
-                    nbinsx=20,
-                    name='Distribution',
-                    marker_color='lightblue',
-                    opacity=0.7
-                ))
-
-                # Ajouter une ligne verticale pour la valeur de l'employé
-                fig.add_vline(x=employee_value, line=dict(color='red', width=2, dash='dash'), 
-                             annotation=dict(text=f"Valeur de l'employé: {employee_value}", 
-                                             showarrow=True, arrowhead=1, ax=0, ay=-40))
-
-                # Mise en page du graphique
-                fig.update_layout(
-                    title=f'Distribution de {feature}',
-                    xaxis_title=feature,
-                    yaxis_title='Fréquence',
-                    bargap=0.2,
-                    height=300,
-                    margin=dict(l=20, r=20, t=40, b=20),
-                    showlegend=False
+                # Figure réutilisée pour une même feature et une même valeur d'employé
+                fig = timer.cached_figure(
+                    f"dispersion.{feature}", figure_cache,
+                    ("dispersion", dataset_key, feature, employee_value),
+                    lambda: plot_dispersion(histograms[feature], feature, employee_value)
                 )
 
                 # Afficher le graphique dans la colonne correspondante
                 with cols[j]:
-                    st.plotly_chart(fig, use_container_width=True)
+                    timer.plotly_chart(f"dispersion.{feature}", fig, use_container_width=True)
 
 st.set_page_config(page_title="Prédiction - Turnover", layout="wide")
+watcher = start_background_warmup()
+
+# Chronométrage des sections de la page (panneau optionnel et journal timings.jsonl)
+timer = start_rerun("prediction")
+
+# Clés de cache : versions des fichiers données et modèle servies pendant tout ce rerun
+# (le surveillant ne bascule sur une nouvelle version qu'une fois ses artefacts prêts)
+versions = watcher.versions()
+dataset_key = versions["dataset"]
+model_key = versions["model"]
 
 # ----------------------------
 # Chargement des données
 # ----------------------------
-@st.cache_data
-def load_data():
-    try:
-        df = pd.read_csv("df_model.csv")
-        return df
-    except FileNotFoundError:
-        st.error("Le fichier 'df_model.csv' n'a pas été trouvé.")
-        return pd.DataFrame()
-
-df = load_data()
+with timer.span("load_data"):
+    df = load_data(dataset_key)
 
 # ----------------------------
-# Chargement du modèle
+# Chargement du modèle (souvent déjà en cache grâce au préchauffage)
 # ----------------------------
-@st.cache_resource
-def load_model():
-    try:
-        with open("logistic_model.pkl", "rb") as f:
-            model = pickle.load(f)  # ou joblib.load(f) si utilisé
-        return model
-    except FileNotFoundError:
-        st.error("Le fichier 'logistic_model.pkl' n'a pas été trouvé.")
-        return None
-    except Exception as e:
-        st.error(f"Erreur lors du chargement du modèle : {e}")
-        return None
-
-model = load_model()
+with timer.span("load_model"):
+    model = load_model(model_key)
 
 # ----------------------------
 # Vérification du type du modèle
@@ -124,22 +186,118 @@ if model is not None:
     st.write(f"**Type du modèle chargé :** {type(model)}")
     if not hasattr(model, "predict"):
         st.error("Le modèle chargé ne possède pas la méthode 'predict'. Vérifiez que 'logistic_model.pkl' contient bien un modèle de régression logistique.")
-        st.stop()
+        timer.stop()
 else:
-    st.stop()
-
-# ----------------------------
-# Définir les features utilisées par le modèle
-# ----------------------------
-model_features = [
-    "satisfaction_level",
-    "last_evaluation",
-    "number_project",
-    "average_montly_hours",
-    "time_spend_company",
-    "work_accident",
-    "salary_encoded"
-]
+    timer.stop()
+
+# Explainer partagé par toutes les sessions, sur un fond résumé (modèles non linéaires)
+@st.cache_resource(max_entries=4)
+def get_explainer(dataset_key, model_key, background_size, background_method, _df, _model):
+    background = summarize_background(_df, size=background_size, method=background_method)
+    return build_explainer(_model, background)
+
+# Explications SHAP à la demande (modèles non linéaires) regroupées en micro-lots entre
+# sessions ; un seul lot à la fois, l'explainer n'étant pas partagé entre threads.
+# Le service d'une version remplacée est fermé par le registre des services.
+def get_explanation_service(dataset_key, model_key, background_size, background_method, _df, _model):
+    def make():
+        explainer = get_explainer(dataset_key, model_key, background_size, background_method, _df, _model)
+        return MicroBatcher(
+            lambda X: explainer(pd.DataFrame(X, columns=model_features)),
+            workers=1,
+            name="turnover-shap",
+        )
+
+    key = (dataset_key, model_key, background_size, background_method)
+    return get_service_registry().get("shap", key, make)
+
+# Fonction pour calculer l'explication SHAP d'un employé par étapes (job d'arrière-plan)
+def explain_employee(dataset_key, model_key, df, model, employee_id, employee_row):
+    yield 0.0, "Chargement de shap"
+    import shap  # noqa: F401
+
+    if is_linear_model(model):
+        yield 0.3, "Valeurs SHAP de la population"
+        shap_values, base_value = get_shap_table(dataset_key, model_key, df, model)
+        yield 0.9, "Explication de l'employé"
+        return employee_explanation(shap_values, base_value, employee_id, employee_row)
+
+    yield 0.3, "Préparation de l'explainer"
+    explanation_service = get_explanation_service(
+        dataset_key, model_key, BACKGROUND_SIZE, BACKGROUND_METHOD, df, model
+    )
+    yield 0.7, "Calcul des valeurs SHAP"
+    explanation = explanation_service.submit(employee_row.to_numpy()).result()[0]
+    if explanation.values.ndim > 1:  # classifieur à deux sorties : on explique la classe 1
+        explanation = explanation[:, 1]
+    return explanation
+
+# Avancement d'un job SHAP, rafraîchi sans rejouer la page ; rerun complet une fois terminé
+@st.fragment(run_every=0.5)
+def shap_progress(job):
+    fragment_timer = start_fragment("prediction.shap_progress")
+    fragment_timer.record_widgets(stage=job.stage)
+    if job.future.done():
+        fragment_timer.finish()
+        st.rerun()
+    with fragment_timer.span("progress"):
+        st.progress(job.progress, text=f"Calcul des explications SHAP : {job.stage}…")
+    fragment_timer.finish()
+
+# Grilles de perturbation des features, bornées par les valeurs observées (une fois par version)
+@st.cache_resource(max_entries=2)
+def get_feature_grids(dataset_key, _df):
+    ranges = feature_ranges(_df)
+    return ranges, feature_grids(ranges)
+
+# Courbes de sensibilité d'un employé : toute la grille scorée en un seul appel au modèle,
+# via le service de scoring partagé ; les curseurs ne font ensuite plus appel au modèle
+@st.cache_resource(max_entries=256)
+def get_sensitivity_curves(dataset_key, model_key, employee_id, _row, _grids, _model):
+    scoring_service = get_scoring_service(model_key, _model)
+    return sensitivity_curves(lambda X: scoring_service.submit(X).result(), _row, _grids)
+
+# Histogramme d'une feature sur toute la population, binné côté serveur
+@st.cache_resource(max_entries=32)
+def get_histogram(dataset_key, feature, _df):
+    return compute_histogram(_df[feature].to_numpy(), nbins=20)
+
+# Section d'export, isolée dans un fragment : ses widgets ne rejouent qu'elle. Le fichier n'est
+# écrit que sur demande, et le bouton de téléchargement (qui lit tout le fichier en mémoire)
+# n'existe que dans l'exécution qui l'a préparé : les reruns suivants (changement d'employé,
+# curseurs du simulateur) ne relisent pas l'export. Chronométré à part : le fragment se
+# rejoue sans la page, une fois le timer de celle-ci clos.
+@st.fragment
+def export_section(dataset_key, model_key, score_table, counterfactuals):
+    fragment_timer = start_fragment("prediction.export")
+    export_format = st.radio("Format d'export :", options=["csv", "parquet"], horizontal=True)
+    with_recommendations = counterfactuals is not None and st.checkbox(
+        "Inclure les recommandations de rétention (valeur cible de chaque levier)"
+    )
+    fragment_timer.record_widgets(export_format=export_format, with_recommendations=with_recommendations)
+    if not st.button(f"Préparer l'export ({len(score_table)} employés)"):
+        fragment_timer.finish()
+        return
+    # Export écrit une seule fois par version (avec, sur demande, la valeur cible de chaque
+    # levier de rétention), dans EXPORT_DIR où seules les versions récentes sont gardées
+    with fragment_timer.span("export_scores"):
+        f = open_export(
+            export_path(dataset_key, model_key, export_format, with_recommendations),
+            lambda: pd.concat([score_table, counterfactuals.add_suffix("_target")], axis=1)
+            if with_recommendations else score_table,
+            fmt=export_format,
+        )
+    with f, fragment_timer.span("render.download"):
+        st.download_button(
+            label=f"Télécharger les scores ({len(score_table)} employés)",
+            data=f,
+            file_name=f"scores_turnover.{export_format}",
+            mime="text/csv" if export_format == "csv" else "application/octet-stream",
+        )
+    fragment_timer.finish()
+
+# Figures déjà construites (jauge par probabilité, dispersion par feature et valeur)
+figure_cache = get_figure_cache()
 
 st.title("Page de Prédiction")
 st.write("Utilisez la régression logistique pour prédire si un employé va quitter l'entreprise.")
@@ -147,20 +305,72 @@ st.write("Utilisez la régression logistique pour prédire si un employé va qui
 # Vérifier que le DataFrame n'est pas vide
 if df.empty:
     st.write("Aucune donnée chargée.")
-    st.stop()
+    timer.stop()
 
 # ----------------------------
-# Sélection de l'ID de l'employé
+# Scoring de la population (utilisé pour la recherche et la prédiction)
 # ----------------------------
-unique_ids = df["id_colab"].unique()
-selected_id = st.selectbox("Sélectionnez l'ID employé :", options=unique_ids)
+try:
+    with timer.span("score_table"):
+        score_table = get_score_table(dataset_key, model_key, df, model)
+except AttributeError as e:
+    st.error(f"Erreur lors de la prédiction : {e}")
+    timer.stop()
+
+with timer.span("employee_index"):
+    employee_index = get_employee_index(dataset_key, df)
 
-# Récupérer les informations de l'employé sélectionné
-row_emp = df[df["id_colab"] == selected_id]
+# ----------------------------
+# Recherche et sélection de l'ID de l'employé (résultats paginés côté serveur)
+# ----------------------------
+st.subheader("Recherche d'un employé")
+search_col, job_col, salary_col, risk_col = st.columns(4)
+with search_col:
+    id_prefix = st.text_input("Début de l'ID employé :", value="")
+with job_col:
+    job_filter = st.selectbox("Job :", options=["Tous"] + list(df["job"].cat.categories))
+with salary_col:
+    salary_filter = st.selectbox("Salaire :", options=["Tous"] + list(df["salary"].cat.categories))
+with risk_col:
+    risk_filter = st.selectbox("Niveau de risque :", options=["Tous"] + RISK_LEVELS)
+
+with timer.span("search"):
+    matches = search_employees(
+        employee_index,
+        df,
+        risk_levels=score_table["risk_level"],
+        prefix=id_prefix,
+        job=None if job_filter == "Tous" else job_filter,
+        salary=None if salary_filter == "Tous" else salary_filter,
+        risk=None if risk_filter == "Tous" else risk_filter,
+    )
+if len(matches) == 0:
+    st.write("Aucun employé ne correspond à la recherche.")
+    timer.stop()
+
+page_number = 1
+page_positions, n_pages = paginate(matches, page_number)
+if n_pages > 1:
+    page_number = st.number_input(
+        f"Page de résultats ({len(matches)} employés, {n_pages} pages) :",
+        min_value=1, max_value=n_pages, value=1, step=1
+    )
+    page_positions, _ = paginate(matches, page_number)
+
+page_ids = df["id_colab"].to_numpy()[page_positions]
+selected_id = st.selectbox("Sélectionnez l'ID employé :", options=page_ids)
+timer.record_widgets(
+    id_prefix=id_prefix, job=job_filter, salary=salary_filter, risk=risk_filter,
+    page=page_number, selected_id=selected_id,
+)
 
-if row_emp.empty:
+# Récupérer les informations de l'employé sélectionné (recherche O(1) dans l'index)
+with timer.span("lookup"):
+    position = employee_position(employee_index, selected_id)
+if position is None:
     st.write("ID introuvable dans les données.")
-    st.stop()
+    timer.stop()
+row_emp = df.iloc[[position]]
 
 # ----------------------------
 # Préparer les données pour la prédiction
@@ -168,28 +378,13 @@ if row_emp.empty:
 X_emp = row_emp[model_features]
 
 # ----------------------------
-# Prédiction
+# Prédiction (lecture dans la table des scores, sans appel au modèle)
 # ----------------------------
-try:
-    pred = model.predict(X_emp)
-    pred_proba = model.predict_proba(X_emp)
-    prob_quit = pred_proba[0][1]  # Probabilité de quitter
-except AttributeError as e:
-    st.error(f"Erreur lors de la prédiction : {e}")
-    st.stop()
-
-# ----------------------------
-# Fonction pour attribuer un niveau de risque
-# ----------------------------
-def assign_risk_level(prob):
-    if prob < 0.3:
-        return "Faible Risque"
-    elif 0.3 <= prob < 0.6:
-        return "Risque Modéré"
-    else:
-        return "Haut Risque"
-
-risk_level = assign_risk_level(prob_quit)
+with timer.span("score_lookup"):
+    score_emp = score_table.loc[selected_id]
+    prob_quit = score_emp["proba"]  # Probabilité de quitter
+    pred = [score_emp["prediction"]]
+    risk_level = score_emp["risk_level"]
 
 # ----------------------------
 # Mise en Page Centrée pour le Graphique et le DataFrame
@@ -203,8 +398,8 @@ with center:
     
     with gauge_col:
         # Afficher la barre de scoring
-        gauge_fig = plot_gauge(prob_quit)
-        st.plotly_chart(gauge_fig, use_container_width=True)
+        gauge_fig = timer.cached_figure("gauge", figure_cache, ("gauge", float(prob_quit)), lambda: plot_gauge(prob_quit))
+        timer.plotly_chart("gauge", gauge_fig, use_container_width=True)
     
     with info_col:
         # Afficher les détails de la prédiction
@@ -225,6 +420,78 @@ with center:
     st.subheader("Détails de l'Employé")
     st.dataframe(row_emp[model_features])
 
+# ----------------------------
+# Recommandations de rétention (contrefactuels précalculés pour toute la population)
+# ----------------------------
+with timer.span("counterfactuals"):
+    counterfactuals = get_counterfactuals(dataset_key, model_key, df, model)
+if counterfactuals is not None:
+    st.markdown("---")  # Ligne de séparation
+    st.subheader("Recommandations de rétention")
+    if prob_quit < TARGET_PROBA:
+        st.write("L'employé est déjà en Faible Risque.")
+    else:
+        targets = counterfactuals.loc[selected_id, ACTIONABLE_FEATURES]
+        st.write(f"Changement minimal d'un seul levier pour passer sous {TARGET_PROBA:.0%} de probabilité de départ :")
+        for feature in ACTIONABLE_FEATURES:
+            current = X_emp.iloc[0][feature]
+            if pd.isna(targets[feature]):
+                st.markdown(f"- **{feature}** : insuffisant seul dans la plage observée")
+            else:
+                target = int(targets[feature])
+                st.markdown(f"- **{feature}** : {current:g} → {target} ({target - current:+g})")
+
+# ----------------------------
+# Simulation what-if et courbes de sensibilité
+# ----------------------------
+st.markdown("---")  # Ligne de séparation
+st.subheader("Simulation « what-if »")
+
+employee_row = X_emp.iloc[0]
+feature_bounds, grids = get_feature_grids(dataset_key, df)
+with timer.span("sensitivity"):
+    curves = get_sensitivity_curves(dataset_key, model_key, int(selected_id), employee_row.to_numpy(), grids, model)
+
+# Curseurs initialisés sur les valeurs de l'employé (un jeu de curseurs par employé)
+what_if_values = {}
+slider_cols = st.columns(4)
+for i, feature in enumerate(model_features):
+    low, high, integer = feature_bounds[feature]
+    with slider_cols[i % 4]:
+        if integer:
+            what_if_values[feature] = st.slider(
+                feature, int(low), int(high), int(employee_row[feature]), step=1,
+                key=f"what_if_{selected_id}_{feature}"
+            )
+        else:
+            what_if_values[feature] = st.slider(
+                feature, round(low, 2), round(high, 2), round(float(employee_row[feature]), 2), step=0.01,
+                key=f"what_if_{selected_id}_{feature}"
+            )
+changed = {feature: value for feature, value in what_if_values.items() if value != round(float(employee_row[feature]), 2)}
+timer.record_widgets(what_if=changed)
+
+with timer.span("what_if"):
+    simulated = what_if_proba(
+        curves, employee_row, prob_quit, changed, model,
+        score=lambda X: get_scoring_service(model_key, model).submit(X).result(),
+    )
+result_col, curves_col = st.columns([1, 3])
+with result_col:
+    st.metric(
+        "Probabilité simulée de quitter",
+        f"{simulated * 100:.1f}%",
+        delta=f"{(simulated - prob_quit) * 100:+.1f} pts",
+        delta_color="inverse",
+    )
+    st.markdown(f"**Niveau de risque simulé :** {assign_risk_level(simulated)}")
+with curves_col:
+    sensitivity_fig = timer.cached_figure(
+        "sensitivity", figure_cache, ("sensitivity", dataset_key, model_key, int(selected_id)),
+        lambda: plot_sensitivity(curves, employee_row)
+    )
+    timer.plotly_chart("sensitivity", sensitivity_fig, use_container_width=True)
+
 # ----------------------------
 # Section de Dispersion des Features (Alignée à Gauche)
 # ----------------------------
@@ -238,6 +505,8 @@ selected_features = st.multiselect(
     default=[]  # Pas de sélection par défaut
 )
 
+timer.record_widgets(features=selected_features)
+
 # Récupérer les valeurs de l'employé pour les features sélectionnées
 employee_values = {}
 for feature in selected_features:
@@ -245,21 +514,59 @@ for feature in selected_features:
 
 # Générer et afficher les graphiques de dispersion pour les features sélectionnées
 if selected_features:
-    plot_dispersion_plotly(df, selected_features, employee_values)
+    with timer.span("histograms"):
+        histograms = {feature: get_histogram(dataset_key, feature, df) for feature in selected_features}
+    plot_dispersion_plotly(histograms, selected_features, employee_values)
 else:
     st.info("Veuillez sélectionner au moins un feature pour afficher les graphiques de dispersion.")
 
+# ----------------------------
+# Téléchargement des Scores de toute la population
+# ----------------------------
+st.markdown("---")  # Ligne de séparation
+st.subheader("Téléchargement des Scores")
+
+export_section(dataset_key, model_key, score_table, counterfactuals)
+
 # ----------------------------
 # Bouton pour afficher les Explications SHAP (Aligné à Gauche)
 # ----------------------------
 st.markdown("---")  # Ligne de séparation
-if st.button("Afficher les Explications SHAP"):
+show_shap = st.button("Afficher les Explications SHAP")
+timer.record_widgets(show_shap=show_shap)
+
+# Le calcul tourne en arrière-plan ; la session garde la clé du job qu'elle suit.
+# Un changement d'employé abandonne le job précédent (annulé si personne d'autre ne l'attend).
+shap_jobs = get_background_jobs()
+shap_key = ("shap", dataset_key, model_key, int(selected_id))
+shap_handle = st.session_state.get("shap_job")
+if shap_handle is not None and shap_handle != shap_key:
+    shap_jobs.release(shap_handle, timer.session)
+    shap_handle = st.session_state["shap_job"] = None
+if show_shap:
+    shap_handle = st.session_state["shap_job"] = shap_key
+
+if shap_handle is not None:
+    employee_row = X_emp.iloc[0]
+    with timer.span("shap_submit"):
+        # Rejoint le job de cet employé, lancé par cette session ou une autre, ou le relance
+        # s'il a été oublié ; un échec n'est recalculé que sur un nouveau clic
+        shap_job = shap_jobs.submit(shap_key, timer.session, lambda: explain_employee(
+            dataset_key, model_key, df, model, selected_id, employee_row
+        ), retry=show_shap)
     st.subheader("Explications SHAP")
-    try:
-        explainer = shap.Explainer(model, df[model_features])
-        shap_values = explainer(X_emp)
-        force_plot = shap.plots.force(shap_values[0], matplotlib=False)
-        st_shap(force_plot, height=600)  # Graphique plus long
-    except Exception as e:
-        st.error(f"Erreur lors du calcul des valeurs SHAP : {e}")
-
+    if not shap_job.future.done():
+        shap_progress(shap_job)
+    else:
+        try:
+            explanation = shap_job.future.result()
+            with timer.span("import_shap"):
+                import shap
+
+            with timer.span("render.shap"):
+                force_plot = shap.plots.force(explanation, matplotlib=False)
+                st_shap(force_plot, height=600)  # Graphique plus long
+        except Exception as e:
+            st.error(f"Erreur lors du calcul des valeurs SHAP : {e}")
+
+timer.finish()
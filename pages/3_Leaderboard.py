@@ -0,0 +1,104 @@
+# pages/3_Leaderboard.py
+import streamlit as st
+import pandas as pd
+
+from aggregations import ALL_JOBS
+from artifacts import get_leaderboard, get_score_table, load_model, start_background_warmup
+from data_store import load_data, paginate
+from instrumentation import start_rerun
+from leaderboard import ALL_TIERS, leaderboard_page, view_ranking
+from scoring import RISK_LEVELS, model_features
+
+# Nombre d'employés par page du classement
+PAGE_SIZE = 50
+
+st.set_page_config(page_title="Classement - Turnover", layout="wide")
+watcher = start_background_warmup()
+
+# Chronométrage des sections de la page (panneau optionnel et journal timings.jsonl)
+timer = start_rerun("leaderboard")
+
+# Versions des données et du modèle servies pendant tout ce rerun
+versions = watcher.versions()
+dataset_key = versions["dataset"]
+model_key = versions["model"]
+
+with timer.span("load_data"):
+    df = load_data(dataset_key)
+with timer.span("load_model"):
+    model = load_model(model_key)
+if df.empty or model is None:
+    st.write("Aucune donnée ou aucun modèle chargé.")
+    timer.stop()
+
+# Classement complet d'un job / niveau de risque, pour les pages au-delà de la profondeur précalculée
+@st.cache_resource(max_entries=4)
+def get_view_ranking(dataset_key, model_key, job, tier, _board, _proba):
+    return view_ranking(_board, _proba, job, tier)
+
+with timer.span("score_table"):
+    score_table = get_score_table(dataset_key, model_key, df, model)
+with timer.span("leaderboard"):
+    board = get_leaderboard(dataset_key, model_key, df, score_table)
+proba = score_table["proba"].to_numpy()
+
+st.title("Classement des Employés à Risque")
+st.write("Employés encore présents (left = 0), du plus au moins susceptible de quitter l'entreprise.")
+
+# ----------------------------
+# Filtres : job et niveau de risque
+# ----------------------------
+job_col, tier_col = st.columns(2)
+with job_col:
+    job = st.selectbox("Job :", options=[ALL_JOBS] + sorted(board["jobs"]))
+with tier_col:
+    tier = st.selectbox("Niveau de risque :", options=[ALL_TIERS] + RISK_LEVELS)
+
+with timer.span("page"):
+    positions, n_pages, total = leaderboard_page(board, proba, job, tier, 1, PAGE_SIZE)
+if total == 0:
+    st.write("Aucun employé ne correspond à ces filtres.")
+    timer.stop()
+
+page_number = 1
+if n_pages > 1:
+    page_number = st.number_input(
+        f"Page ({total} employés, {n_pages} pages) :",
+        min_value=1, max_value=n_pages, value=1, step=1
+    )
+timer.record_widgets(job=job, tier=tier, page=page_number)
+
+if page_number > 1:
+    with timer.span("page"):
+        # Dans la profondeur précalculée : fusion des hauts de classement ; au-delà, classement
+        # complet du filtre calculé une fois puis découpé
+        if page_number * PAGE_SIZE <= board["depth"]:
+            positions, _, _ = leaderboard_page(board, proba, job, tier, page_number, PAGE_SIZE)
+        else:
+            positions, _ = paginate(
+                get_view_ranking(dataset_key, model_key, job, tier, board, proba), page_number, PAGE_SIZE
+            )
+
+# ----------------------------
+# Tableau de la page
+# ----------------------------
+with timer.span("table"):
+    first_rank = (page_number - 1) * PAGE_SIZE + 1
+    rows = df.iloc[positions]
+    table = pd.DataFrame({
+        "Rang": range(first_rank, first_rank + len(positions)),
+        "ID employé": rows["id_colab"].to_numpy(),
+        "Job": rows["job"].astype(str).to_numpy(),
+        "Probabilité de quitter (%)": proba[positions] * 100,
+        "Niveau de risque": score_table["risk_level"].to_numpy()[positions].astype(str),
+    })
+    for feature in model_features:
+        table[feature] = rows[feature].to_numpy()
+st.dataframe(
+    table,
+    hide_index=True,
+    use_container_width=True,
+    column_config={"Probabilité de quitter (%)": st.column_config.NumberColumn(format="%.1f")},
+)
+
+timer.finish()
@@ -0,0 +1,157 @@
+# pages/4_Comparison.py
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from aggregations import compute_histogram
+from artifacts import (
+    get_figure_cache, get_model_comparison, get_model_scores, load_models, start_background_warmup
+)
+from charts import histogram_figure
+from data_store import load_data
+from instrumentation import start_rerun
+from model_store import model_path_for_key, read_metadata
+
+st.set_page_config(page_title="Comparaison des modèles - Turnover", layout="wide")
+watcher = start_background_warmup()
+
+# Chronométrage des sections de la page (panneau optionnel et journal timings.jsonl)
+timer = start_rerun("comparison")
+
+# Versions des données et des modèles servies pendant tout ce rerun
+versions = watcher.versions()
+dataset_key = versions["dataset"]
+models_key = versions["models"]
+figure_cache = get_figure_cache()
+
+with timer.span("load_data"):
+    df = load_data(dataset_key)
+with timer.span("load_models"):
+    models = load_models(models_key)
+if df.empty or not models:
+    st.write("Aucune donnée ou aucun modèle chargé.")
+    timer.stop()
+
+
+# Libellé d'un modèle : nom du fichier, sans l'empreinte
+def model_label(model_key):
+    return model_key.split("@", 1)[0]
+
+
+# Modèle servi par les autres pages : l'artefact promu, sinon le pickle livré
+served = versions["model"]
+
+
+# Artefact de train.py non promu : candidat en attente de promotion
+def is_candidate(model_key):
+    return model_key != served and model_path_for_key(model_key).endswith(".npz")
+
+
+# Origine d'un modèle : pickle livré, ou artefact de train.py (promu ou non) avec sa date d'entraînement
+def model_source(model_key):
+    path = model_path_for_key(model_key)
+    status = "servi" if model_key == served else "non servi"
+    if not path.endswith(".npz"):
+        return f"Pickle livré ({status})"
+    trained_at = read_metadata(path).get("trained_at", "?")
+    return f"Artefact train.py {'promu' if model_key == served else 'non promu'} ({trained_at})"
+
+
+with timer.span("model_scores"):
+    scores = get_model_scores(dataset_key, models_key, df, models)
+
+st.title("Comparaison des Modèles (champion / challenger)")
+st.write(
+    "Tous les modèles enregistrés (pickles livrés et artefacts de train.py) sont scorés sur toute "
+    "la population en une passe, puis comparés au champion. Un artefact n'est servi par "
+    "l'application qu'une fois promu (`python train.py --promote` ou "
+    "`python model_store.py promote <artefact>`) ; les autres sont des challengers."
+)
+
+# Champion par défaut : le modèle servi par les autres pages (artefact promu, sinon pickle livré)
+names = list(models)
+champion = st.selectbox(
+    "Champion :",
+    options=names,
+    index=names.index(served) if served in names else 0,
+    format_func=model_label,
+)
+timer.record_widgets(champion=model_label(champion))
+
+with timer.span("comparison"):
+    comparison = get_model_comparison(dataset_key, models_key, champion, df, scores)
+
+# ----------------------------
+# Synthèse par modèle
+# ----------------------------
+summary = comparison["summary"]
+st.subheader("Synthèse")
+st.dataframe(
+    pd.DataFrame({
+        "Modèle": [model_label(name) for name in summary.index],
+        "Origine": [model_source(name) for name in summary.index],
+        "AUC (left)": summary["auc"].to_numpy(),
+        "Probabilité moyenne (%)": summary["mean_proba"].to_numpy() * 100,
+        "Écart moyen au champion (pts)": summary["mean_abs_delta"].to_numpy() * 100,
+        "Écart max au champion (pts)": summary["max_abs_delta"].to_numpy() * 100,
+        "Désaccords de niveau de risque": summary["disagreements"].to_numpy(),
+        "Désaccords (%)": summary["disagreements"].to_numpy() / len(df) * 100,
+    }),
+    hide_index=True,
+    use_container_width=True,
+    column_config={
+        "AUC (left)": st.column_config.NumberColumn(format="%.4f"),
+        "Probabilité moyenne (%)": st.column_config.NumberColumn(format="%.1f"),
+        "Écart moyen au champion (pts)": st.column_config.NumberColumn(format="%.2f"),
+        "Écart max au champion (pts)": st.column_config.NumberColumn(format="%.2f"),
+        "Désaccords (%)": st.column_config.NumberColumn(format="%.2f"),
+    },
+)
+
+# Challengers : artefacts non promus d'abord, du plus récent au plus ancien, puis les autres modèles
+candidates = [name for name in reversed(names) if name != champion and is_candidate(name)]
+challengers = candidates + [name for name in names if name != champion and name not in candidates]
+if not challengers:
+    st.info("Un seul modèle enregistré : ajoutez un artefact avec train.py pour le comparer au champion.")
+    timer.stop()
+
+# ----------------------------
+# Détail d'un challenger
+# ----------------------------
+challenger = st.selectbox("Challenger :", options=challengers, format_func=model_label)
+timer.record_widgets(challenger=model_label(challenger))
+st.subheader(f"{model_label(challenger)} contre {model_label(champion)}")
+
+delta_col, tier_col = st.columns(2)
+with delta_col:
+    fig_delta = timer.cached_figure(
+        "score_delta", figure_cache, ("score_delta", dataset_key, champion, challenger),
+        lambda: histogram_figure(
+            compute_histogram((scores[challenger].to_numpy() - scores[champion].to_numpy()) * 100, 40),
+            title="Écart de probabilité challenger - champion (pts)",
+            x_label="écart (points de %)"
+        )
+    )
+    timer.plotly_chart("score_delta", fig_delta, use_container_width=True)
+with tier_col:
+    st.write("Niveaux de risque : champion (lignes) contre challenger (colonnes)")
+    st.dataframe(comparison["transitions"][challenger], use_container_width=True)
+
+# Désaccords de niveau de risque par job
+by_job = comparison["disagreements"]
+headcount = by_job["headcount"].to_numpy()
+counts = by_job[challenger].to_numpy()
+st.write("Désaccords de niveau de risque par job")
+st.dataframe(
+    pd.DataFrame({
+        "Job": by_job.index.astype(str),
+        "Effectif": headcount,
+        "Désaccords": counts,
+        "Désaccords (%)": np.divide(counts * 100, headcount, out=np.zeros(len(counts)), where=headcount > 0),
+    }).sort_values("Désaccords", ascending=False),
+    hide_index=True,
+    use_container_width=True,
+    column_config={"Désaccords (%)": st.column_config.NumberColumn(format="%.2f")},
+)
+
+timer.finish()
@@ -0,0 +1,244 @@
+# score_batch.py
+# Scoring hors interface des extractions RH nocturnes (plusieurs millions de lignes) avec le
+# même modèle et les mêmes features (model_features) que la page Prédiction.
+# L'entrée (CSV ou Parquet) est lue en flux par blocs de taille fixe, scorée sur un pool de
+# processus (chaque processus charge le modèle une seule fois) et écrite dans l'ordre
+# d'entrée ; le nombre de blocs en vol est borné, la mémoire reste donc constante.
+# Usage : python score_batch.py extraction.csv scores.parquet [--workers 4] [--chunk-rows 200000] [--shap]
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from file_formats import COLUMN_TYPES, TableWriter
+from model_store import active_model_path, load_model_file
+from scoring import assign_risk_levels, make_scorer, model_features
+
+# Population de référence des attributions SHAP (fond de l'explainer)
+DEFAULT_BACKGROUND = "df_model.csv"
+CHUNK_ROWS = 200_000
+# Blocs soumis d'avance par processus : assez pour occuper le pool pendant l'écriture
+PENDING_PER_WORKER = 2
+
+# Colonnes lues dans l'entrée
+INPUT_COLUMNS = ["id_colab"] + model_features
+
+# État de chaque processus du pool, initialisé une fois par _init_worker
+_worker = {}
+
+
+# ----------------------------
+# Lecture en flux
+# ----------------------------
+# Fonction pour découper un flux de lots de tailles quelconques en tables de chunk_rows lignes
+def _rechunk(batches, chunk_rows):
+    pending, n_pending = [], 0
+    for batch in batches:
+        pending.append(batch)
+        n_pending += batch.num_rows
+        while n_pending >= chunk_rows:
+            table = pa.Table.from_batches(pending)
+            yield table.slice(0, chunk_rows)
+            rest = table.slice(chunk_rows)
+            pending, n_pending = rest.to_batches(), rest.num_rows
+    if n_pending:
+        yield pa.Table.from_batches(pending)
+
+
+# Fonction pour lire des colonnes d'un CSV, d'un Parquet ou d'un répertoire de Parquet
+# (ex. historique partitionné), par blocs de chunk_rows lignes
+def read_chunks(path, chunk_rows=CHUNK_ROWS, columns=INPUT_COLUMNS):
+    fmt = "directory" if os.path.isdir(path) else os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt == "directory":
+        import pyarrow.dataset as ds
+
+        dataset = ds.dataset(path, format="parquet", partitioning="hive")
+        names = dataset.schema.names
+        # Un fichier après l'autre : la lecture d'avance reste bornée à un fichier
+        batches = (
+            batch
+            for fragment in dataset.get_fragments()
+            for batch in fragment.to_batches(columns=columns, batch_size=chunk_rows)
+        )
+    elif fmt == "parquet":
+        parquet = pq.ParquetFile(path)
+        names = parquet.schema_arrow.names
+        batches = parquet.iter_batches(batch_size=chunk_rows, columns=columns)
+    elif fmt == "csv":
+        names = pa_csv.open_csv(path).schema.names
+        batches = pa_csv.open_csv(path, convert_options=pa_csv.ConvertOptions(
+            include_columns=columns,
+            column_types={column: COLUMN_TYPES[column] for column in columns},
+        ))
+    else:
+        raise ValueError(f"Format d'entrée inconnu : {fmt}")
+    missing = set(columns) - set(names)
+    if missing:
+        raise ValueError(f"Colonnes manquantes dans '{path}' : {sorted(missing)}")
+    return _rechunk(batches, chunk_rows)
+
+
+# ----------------------------
+# Écriture dans l'ordre d'entrée
+# ----------------------------
+# Blocs de scores écrits l'un après l'autre (TableWriter : même format que l'export de la
+# page Prédiction, fichier temporaire renommé à la fin)
+class ScoreWriter(TableWriter):
+    def __init__(self, path, fmt=None, shap=False):
+        super().__init__(path, fmt)
+        self.shap = shap
+
+    def close(self):
+        if self._writer is None:
+            # Entrée vide : un fichier avec seulement l'en-tête, colonnes SHAP comprises si demandées
+            shap = (np.empty((0, len(model_features))), np.empty(0)) if self.shap else None
+            self.write(_score_frame(np.empty(0, dtype=np.int32), np.empty(0), shap))
+        return super().close()
+
+
+# ----------------------------
+# Processus de scoring
+# ----------------------------
+# Fonction d'initialisation de chaque processus : modèle chargé une fois, BLAS limité à un
+# thread dans le pool (les processus se partagent déjà les cœurs), explainer SHAP si demandé
+def _init_worker(model_path, background, single_thread=True):
+    if single_thread:
+        from threadpoolctl import threadpool_limits
+
+        threadpool_limits(1)
+    model = load_model_file(model_path)
+    _worker["scorer"] = make_scorer(model)
+    _worker["explain"] = None
+    if background is None:
+        return
+
+    from explanations import (
+        build_explainer, is_linear_model, linear_shap_values, positive_class_values, summarize_background
+    )
+
+    if is_linear_model(model):
+        # Forme fermée : phi_j = coef_j * (x_j - moyenne du fond), fond réduit à sa moyenne
+        mean = background[model_features].to_numpy(dtype=np.float64).mean(axis=0, keepdims=True)
+        _worker["explain"] = lambda X: linear_shap_values(model, X, mean)
+    else:
+        explainer = build_explainer(model, summarize_background(background))
+
+        # Classifieur à deux sorties : on garde la classe 1, comme la page Prédiction
+        def explain(X):
+            return positive_class_values(explainer(pd.DataFrame(X, columns=model_features)))
+
+        _worker["explain"] = explain
+
+
+# Fonction exécutée dans un processus : probabilités (et attributions SHAP) d'un bloc
+def _score_chunk(X):
+    proba = _worker["scorer"].score(X)
+    if _worker["explain"] is None:
+        return proba, None
+    return proba, _worker["explain"](X)
+
+
+# Table de sortie d'un bloc : mêmes colonnes que l'export de la page Prédiction,
+# suivies des attributions par feature et de la valeur de base si --shap
+def _score_frame(ids, proba, shap):
+    frame = pd.DataFrame({
+        "id_colab": ids,
+        "proba": proba,
+        "prediction": (proba > 0.5).astype(np.int8),
+        "risk_level": np.asarray(assign_risk_levels(proba)).astype(str),
+    })
+    if shap is not None:
+        values, base_value = shap
+        for j, feature in enumerate(model_features):
+            frame[f"shap_{feature}"] = values[:, j]
+        frame["shap_base_value"] = base_value
+    return frame
+
+
+# Fonction pour scorer un fichier en flux. workers=0 : tout dans le processus courant ;
+# model_path=None : modèle servi par l'application (artefact promu, sinon le pickle livré).
+# Retourne les statistiques du passage (lignes, blocs, durée, lignes par seconde).
+def score_file(input_path, output_path, model_path=None, chunk_rows=CHUNK_ROWS,
+               workers=None, shap=False, background_path=DEFAULT_BACKGROUND):
+    workers = os.cpu_count() if workers is None else workers
+    model_path = model_path or active_model_path()
+    background = pd.read_csv(background_path) if shap else None
+    start = time.perf_counter()
+
+    pool = None
+    if workers > 0:
+        pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(model_path, background))
+    else:
+        _init_worker(model_path, background, single_thread=False)
+
+    # Bloc confié au pool, ou calculé tout de suite sans pool (Future déjà résolu)
+    def submit(X):
+        if pool is not None:
+            return pool.submit(_score_chunk, X)
+        future = Future()
+        future.set_result(_score_chunk(X))
+        return future
+
+    writer = ScoreWriter(output_path, shap=shap)
+    n_rows = n_chunks = 0
+    pending = deque()
+    max_pending = max(workers, 1) * PENDING_PER_WORKER
+    try:
+        for table in read_chunks(input_path, chunk_rows):
+            X = np.column_stack([table.column(feature).to_numpy().astype(np.float64) for feature in model_features])
+            pending.append((table.column("id_colab").to_numpy(), submit(X)))
+            # Écriture dans l'ordre de soumission : on attend le plus ancien bloc en vol
+            while len(pending) >= max_pending:
+                ids, future = pending.popleft()
+                writer.write(_score_frame(ids, *future.result()))
+                n_rows, n_chunks = n_rows + len(ids), n_chunks + 1
+        while pending:
+            ids, future = pending.popleft()
+            writer.write(_score_frame(ids, *future.result()))
+            n_rows, n_chunks = n_rows + len(ids), n_chunks + 1
+        writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    seconds = time.perf_counter() - start
+    return {
+        "rows": n_rows,
+        "chunks": n_chunks,
+        "workers": workers,
+        "seconds": seconds,
+        "rows_per_s": n_rows / seconds if seconds else float("nan"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scoring par blocs d'une extraction RH (CSV ou Parquet)")
+    parser.add_argument("input", help="Fichier .csv, .parquet ou répertoire de Parquet contenant id_colab et les features du modèle")
+    parser.add_argument("output", help="Fichier de scores .csv ou .parquet")
+    parser.add_argument("--model", default=None, help="Pickle ou artefact .npz (défaut : modèle actif)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=None, help="Processus de scoring (0 : aucun pool)")
+    parser.add_argument("--shap", action="store_true", help="Ajoute les attributions SHAP de chaque ligne")
+    parser.add_argument("--background", default=DEFAULT_BACKGROUND, help="Population de référence pour --shap")
+    args = parser.parse_args()
+
+    stats = score_file(
+        args.input, args.output, args.model, args.chunk_rows, args.workers, args.shap, args.background
+    )
+    print(json.dumps(stats), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+# scoring.py
+import hashlib
+import math
+import os
+import queue
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# ----------------------------
+# Features utilisées par le modèle
+# ----------------------------
+model_features = [
+    "satisfaction_level",
+    "last_evaluation",
+    "number_project",
+    "average_montly_hours",
+    "time_spend_company",
+    "work_accident",
+    "salary_encoded"
+]
+
+# Seuils des niveaux de risque (bornes basses incluses)
+RISK_THRESHOLDS = [0.3, 0.6]
+RISK_LEVELS = ["Faible Risque", "Risque Modéré", "Haut Risque"]
+
+# Taille des blocs de lignes écrits lors de l'export des scores
+EXPORT_CHUNK_SIZE = 100_000
+# Répertoire des exports de la page Prédiction, et versions (données, modèle) qui y sont gardées
+EXPORT_DIR = os.environ.get("TURNOVER_EXPORT_DIR", os.path.join(tempfile.gettempdir(), "turnover_exports"))
+EXPORT_VERSIONS = int(os.environ.get("TURNOVER_EXPORT_VERSIONS", 2))
+EXPORT_PREFIX = "turnover_scores"
+
+# Micro-lots : fenêtre de regroupement des demandes (ms), taille maximale d'un lot (lignes)
+# et nombre de lots calculés en parallèle
+BATCH_WINDOW_MS = float(os.environ.get("TURNOVER_BATCH_WINDOW_MS", 3))
+BATCH_MAX_ROWS = int(os.environ.get("TURNOVER_BATCH_MAX_ROWS", 512))
+BATCH_WORKERS = int(os.environ.get("TURNOVER_BATCH_WORKERS", 2))
+
+
+# Fonction pour attribuer un niveau de risque
+def assign_risk_level(prob):
+    if prob < 0.3:
+        return "Faible Risque"
+    elif 0.3 <= prob < 0.6:
+        return "Risque Modéré"
+    else:
+        return "Haut Risque"
+
+
+# Version vectorisée de assign_risk_level pour toute une colonne de probabilités
+def assign_risk_levels(probs):
+    codes = np.searchsorted(RISK_THRESHOLDS, np.asarray(probs), side="right")
+    return pd.Categorical.from_codes(codes, categories=RISK_LEVELS, ordered=True)
+
+
+# ----------------------------
+# Noyaux de scoring
+# ----------------------------
+# Scoreur rapide d'un modèle logistique binaire : sigmoïde d'un seul produit matriciel,
+# sans validation sklearn à chaque appel. Les entrées sont dans l'ordre de model_features.
+class LinearScorer:
+    def __init__(self, coef, intercept):
+        self.coef = np.ascontiguousarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+        self._coef_list = self.coef.tolist()
+
+    def decision_function(self, X):
+        return np.asarray(X, dtype=np.float64) @ self.coef + self.intercept
+
+    # Probabilité de quitter (classe 1) pour un lot de lignes (scipy importé à l'usage :
+    # expit reste bit à bit identique à predict_proba sans coûter au démarrage des pages)
+    def score(self, X):
+        from scipy.special import expit
+        return expit(self.decision_function(X))
+
+    # Probabilité de quitter pour une seule ligne (liste ou tableau de 7 valeurs)
+    def score_one(self, row):
+        z = self.intercept
+        for c, v in zip(self._coef_list, row):
+            z += c * v
+        return 1.0 / (1.0 + math.exp(-z))
+
+
+# Plusieurs modèles logistiques scorés par un seul produit matriciel : les coefficients sont
+# empilés en colonnes (une par modèle), un modèle de plus ajoute une colonne au produit
+class StackedLinearScorer:
+    def __init__(self, scorers):
+        self.coef = np.column_stack([scorer.coef for scorer in scorers])
+        self.intercept = np.array([scorer.intercept for scorer in scorers])
+
+    # Probabilités de quitter, une colonne par modèle
+    def score(self, X):
+        from scipy.special import expit
+        return expit(np.asarray(X, dtype=np.float64) @ self.coef + self.intercept)
+
+
+# Repli générique : délègue à predict_proba du modèle sklearn
+class SklearnScorer:
+    def __init__(self, model):
+        self.model = model
+
+    def score(self, X):
+        if not isinstance(X, pd.DataFrame):
+            X = pd.DataFrame(np.asarray(X), columns=model_features)
+        return self.model.predict_proba(X)[:, 1]
+
+    def score_one(self, row):
+        return float(self.score(np.asarray(row, dtype=np.float64).reshape(1, -1))[0])
+
+
+# Transformations affines x * a + b des scalers sklearn usuels (None si non reconnu)
+def _affine_from_scaler(step):
+    name = type(step).__name__
+    n_features = len(model_features)
+    if name == "StandardScaler":
+        mean = step.mean_ if step.with_mean else np.zeros(n_features)
+        scale = step.scale_ if step.with_std else np.ones(n_features)
+        return 1.0 / scale, -mean / scale
+    if name == "MinMaxScaler" and not step.clip:
+        return step.scale_, step.min_
+    if name == "MaxAbsScaler":
+        return 1.0 / step.scale_, np.zeros(n_features)
+    if name == "RobustScaler":
+        center = step.center_ if step.with_centering else np.zeros(n_features)
+        scale = step.scale_ if step.with_scaling else np.ones(n_features)
+        return 1.0 / scale, -center / scale
+    return None
+
+
+# Fonction pour extraire un scoreur rapide du modèle chargé (repli sklearn sinon)
+def make_scorer(model):
+    steps = [step for _, step in model.steps] if type(model).__name__ == "Pipeline" else [model]
+    estimator = steps[-1]
+
+    is_binary_logistic = (
+        type(estimator).__name__ == "LogisticRegression"
+        and getattr(estimator, "coef_", None) is not None
+        and estimator.coef_.shape == (1, len(model_features))
+        and list(estimator.classes_) == [0, 1]
+    )
+    if not is_binary_logistic:
+        return SklearnScorer(model)
+
+    coef = np.asarray(estimator.coef_, dtype=np.float64)[0]
+    intercept = float(estimator.intercept_[0])
+    # Les scalers sont repliés dans les coefficients : coef . (x * a + b) = (coef * a) . x + coef . b
+    for step in reversed(steps[:-1]):
+        if step == "passthrough" or step is None:
+            continue
+        affine = _affine_from_scaler(step)
+        if affine is None:
+            return SklearnScorer(model)
+        a, b = affine
+        intercept += float(coef @ b)
+        coef = coef * a
+    return LinearScorer(coef, intercept)
+
+
+# ----------------------------
+# Service de scoring par micro-lots
+# ----------------------------
+# Chaque session Streamlit exécute la page dans son propre thread : des appels unitaires
+# simultanés se disputeraient le GIL et les threads BLAS. Le service regroupe les demandes
+# arrivées pendant une fenêtre de quelques millisecondes en un seul lot, calculé sur un
+# pool borné ; chaque demande reçoit un Future avec sa part du résultat.
+# batch_fn reçoit une matrice (lignes dans l'ordre de model_features) et renvoie un
+# résultat découpable par tranches de lignes (tableau NumPy, Explanation SHAP).
+class MicroBatcher:
+    def __init__(self, batch_fn, window_ms=BATCH_WINDOW_MS, max_rows=BATCH_MAX_ROWS,
+                 workers=BATCH_WORKERS, name="turnover-batcher"):
+        self.batch_fn = batch_fn
+        self.window = window_ms / 1000
+        self.max_rows = max_rows
+        self.stats = {"requests": 0, "rows": 0, "batches": 0}
+        self._stats_lock = threading.Lock()
+        self._queue = queue.Queue()
+        # Fermeture et dépôts sérialisés : aucune demande ne peut suivre le signal d'arrêt
+        self._closed = False
+        self._submit_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        # Lots en cours limités au pool : au-delà, les demandes s'accumulent dans le lot suivant
+        self._slots = threading.BoundedSemaphore(workers)
+        self._thread = threading.Thread(target=self._collect, name=name, daemon=True)
+        self._thread.start()
+
+    # Soumet une ou plusieurs lignes ; renvoie un Future (résultat limité à ces lignes)
+    def submit(self, rows):
+        rows = np.atleast_2d(np.asarray(rows, dtype=np.float64))
+        future = Future()
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("Service de micro-lots fermé")
+            self._queue.put((rows, future))
+        return future
+
+    # Arrête le thread de regroupement et le pool, après avoir servi les demandes déjà déposées
+    def close(self):
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+        self._pool.shutdown()
+
+    # Regroupe les demandes : le lot part à la fin de la fenêtre ouverte par la première,
+    # ou plus tôt s'il atteint max_rows
+    def _collect(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            n_rows = len(item[0])
+            deadline = time.perf_counter() + self.window
+            stop = False
+            while n_rows < self.max_rows:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.perf_counter(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+                n_rows += len(item[0])
+            self._slots.acquire()
+            self._pool.submit(self._run, batch)
+            if stop:
+                return
+
+    def _run(self, batch):
+        try:
+            # Demandes abandonnées entre-temps (Future annulé) : ignorées
+            batch = [(rows, future) for rows, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                return
+            try:
+                result = self.batch_fn(np.concatenate([rows for rows, _ in batch]))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                return
+            start = 0
+            for rows, future in batch:
+                future.set_result(result[start:start + len(rows)])
+                start += len(rows)
+            with self._stats_lock:
+                self.stats["requests"] += len(batch)
+                self.stats["rows"] += start
+                self.stats["batches"] += 1
+        finally:
+            self._slots.release()
+
+
+# Fonction pour créer le service de scoring micro-lots d'un modèle (probabilités de quitter)
+def make_scoring_service(model, **batcher_kwargs):
+    return MicroBatcher(make_scorer(model).score, name="turnover-scoring", **batcher_kwargs)
+
+
+# Fonction pour scorer toute la population en une seule passe vectorisée
+def score_population(df, model):
+    proba = make_scorer(model).score(df[model_features].to_numpy(dtype=np.float64))
+    scores = pd.DataFrame(
+        {
+            "proba": proba,
+            "prediction": (proba > 0.5).astype(np.int8),
+            "risk_level": assign_risk_levels(proba),
+        },
+        index=pd.Index(df["id_colab"].to_numpy(), name="id_colab"),
+    )
+    return scores
+
+
+# Fonction pour scorer la population avec plusieurs modèles en une passe sur la même matrice
+# de features : les modèles logistiques ensemble (StackedLinearScorer), les autres un par un.
+# Retourne une colonne de probabilités par modèle (clés de `models`), indexée par id_colab.
+# Les colonnes déjà présentes dans `previous` (même population) sont reprises sans recalcul :
+# un modèle ajouté ne coûte que sa colonne du produit matriciel.
+def score_models(df, models, previous=None):
+    columns = {}
+    if previous is not None and len(previous) == len(df):
+        columns = {name: previous[name].to_numpy() for name in models if name in previous.columns}
+    scorers = {name: make_scorer(model) for name, model in models.items() if name not in columns}
+    if scorers:
+        X = df[model_features].to_numpy(dtype=np.float64)
+        linear = [name for name, scorer in scorers.items() if isinstance(scorer, LinearScorer)]
+        if linear:
+            proba = StackedLinearScorer([scorers[name] for name in linear]).score(X)
+            columns.update(zip(linear, proba.T))
+        for name, scorer in scorers.items():
+            if name not in columns:
+                columns[name] = scorer.score(X)
+    return pd.DataFrame(
+        {name: columns[name] for name in models},
+        index=pd.Index(df["id_colab"].to_numpy(), name="id_colab"),
+    )
+
+
+# Fonction pour mettre à jour la table des scores après une ingestion : seules les lignes
+# aux positions données (modifiées ou ajoutées en fin de df) sont rescorées
+def update_scores(scores, df, positions, model):
+    n_rows, n_known = len(df), len(scores)
+    fresh = make_scorer(model).score(df[model_features].iloc[positions].to_numpy(dtype=np.float64))
+
+    proba = np.empty(n_rows, dtype=np.float64)
+    proba[:n_known] = scores["proba"].to_numpy()
+    proba[positions] = fresh
+    prediction = np.empty(n_rows, dtype=np.int8)
+    prediction[:n_known] = scores["prediction"].to_numpy()
+    prediction[positions] = fresh > 0.5
+    codes = np.empty(n_rows, dtype=np.int8)
+    codes[:n_known] = scores["risk_level"].cat.codes.to_numpy()
+    codes[positions] = assign_risk_levels(fresh).codes
+
+    return pd.DataFrame(
+        {
+            "proba": proba,
+            "prediction": prediction,
+            "risk_level": pd.Categorical.from_codes(codes, categories=RISK_LEVELS, ordered=True),
+        },
+        index=pd.Index(df["id_colab"].to_numpy(), name="id_colab"),
+    )
+
+
+# Fonction pour préparer un bloc de la table des scores à l'export
+def _export_chunk(scores, start, chunk_size):
+    chunk = scores.iloc[start:start + chunk_size].reset_index()
+    chunk["risk_level"] = chunk["risk_level"].astype(str)
+    return chunk
+
+
+# Fonction pour exporter la table des scores par blocs (CSV ou Parquet)
+# sans construire l'export complet en mémoire ; même format que score_batch.py
+def write_scores(scores, path, fmt="csv", chunk_size=EXPORT_CHUNK_SIZE):
+    from file_formats import TableWriter
+
+    with TableWriter(path, fmt) as writer:
+        for start in range(0, max(len(scores), 1), chunk_size):
+            writer.write(_export_chunk(scores, start, chunk_size))
+    return path
+
+
+# Chemin de l'export d'une version : un hachage court des clés données et modèle remplace
+# les clés elles-mêmes, le nom garde une taille fixe
+def export_path(dataset_key, model_key, fmt, with_recommendations=False, export_dir=EXPORT_DIR):
+    version = hashlib.blake2b(f"{dataset_key}\0{model_key}".encode(), digest_size=8).hexdigest()
+    suffix = "_recommandations" if with_recommendations else ""
+    return os.path.join(export_dir, f"{EXPORT_PREFIX}{suffix}_{version}.{fmt}")
+
+
+# Fonction pour supprimer les exports des versions les moins récemment servies au-delà de
+# `keep` (les fichiers en cours d'écriture, .tmp, ne sont pas touchés)
+def prune_exports(export_dir=EXPORT_DIR, keep=EXPORT_VERSIONS):
+    versions = {}
+    for entry in os.scandir(export_dir):
+        if not entry.name.startswith(EXPORT_PREFIX) or entry.name.endswith(".tmp"):
+            continue
+        version = os.path.splitext(entry.name)[0].rsplit("_", 1)[-1]
+        try:
+            mtime = entry.stat().st_mtime_ns
+        except FileNotFoundError:
+            continue
+        versions.setdefault(version, []).append((mtime, entry.path))
+    ranked = sorted(versions.values(), key=lambda files: max(files)[0], reverse=True)
+    for files in ranked[keep:]:
+        for _, path in files:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+# Fonction pour ouvrir l'export d'une version, écrit au premier appel à partir de make_scores(),
+# puis élaguer les exports des autres versions. Le fichier est ouvert avant l'élagage :
+# la session le lit même si une autre le supprime ensuite.
+def open_export(path, make_scores, fmt="csv", keep=EXPORT_VERSIONS):
+    try:
+        f = open(path, "rb")
+        # Export réutilisé : il compte comme le plus récemment servi
+        os.utime(path)
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        write_scores(make_scores(), path, fmt=fmt)
+        f = open(path, "rb")
+    prune_exports(os.path.dirname(path) or ".", keep)
+    return f
@@ -0,0 +1,996 @@
+# test.py
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from explanations import compute_shap_table, linear_shap_values
+from scoring import LinearScorer, SklearnScorer, make_scorer, model_features
+
+
+@pytest.fixture(scope="module")
+def df():
+    return pd.read_csv("df_model.csv")
+
+
+@pytest.fixture(scope="module")
+def model():
+    with open("logistic_model.pkl", "rb") as f:
+        return pickle.load(f)
+
+
+# ----------------------------
+# Parité des valeurs SHAP précalculées avec shap.Explainer
+# ----------------------------
+def test_linear_shap_matches_explainer_default_background(df, model):
+    shap = pytest.importorskip("shap")
+    X = df[model_features]
+    # shap.Explainer sous-échantillonne le fond à 100 lignes : on lui donne le même fond
+    background = shap.utils.sample(X, 100)
+    expected = shap.Explainer(model, background)(X.iloc[:500])
+
+    values, base_value = linear_shap_values(model, X.iloc[:500], background)
+
+    np.testing.assert_allclose(values, expected.values, rtol=0, atol=1e-10)
+    np.testing.assert_allclose(base_value, expected.base_values, rtol=0, atol=1e-10)
+
+
+def test_shap_table_matches_explainer_full_background(df, model):
+    shap = pytest.importorskip("shap")
+    X = df[model_features]
+    masker = shap.maskers.Independent(X, max_samples=len(X))
+    expected = shap.Explainer(model, masker)(X)
+
+    shap_values, base_value = compute_shap_table(df, model)
+
+    assert list(shap_values.index) == list(df["id_colab"])
+    np.testing.assert_allclose(shap_values.to_numpy(), expected.values, rtol=0, atol=1e-10)
+    np.testing.assert_allclose(base_value, expected.base_values, rtol=0, atol=1e-10)
+
+
+def test_shap_table_explains_positive_class_of_non_linear_model(df):
+    shap = pytest.importorskip("shap")
+    from sklearn.tree import DecisionTreeClassifier
+
+    from explanations import build_explainer, summarize_background
+
+    sample = df.iloc[:50]
+    tree = DecisionTreeClassifier(max_depth=4, random_state=0).fit(df[model_features], df["left"])
+    expected = build_explainer(tree, summarize_background(sample))(sample[model_features])
+
+    shap_values, base_value = compute_shap_table(sample, tree)
+
+    assert shap_values.shape == (len(sample), len(model_features))
+    np.testing.assert_allclose(shap_values.to_numpy(), expected.values[..., 1], rtol=0, atol=1e-10)
+    np.testing.assert_allclose(base_value, expected.base_values[0, 1], rtol=0, atol=1e-10)
+    # Additivité : base + somme des contributions = probabilité de quitter
+    np.testing.assert_allclose(
+        base_value + shap_values.sum(axis=1), tree.predict_proba(sample[model_features])[:, 1], atol=1e-6
+    )
+
+
+# ----------------------------
+# Parité du noyau NumPy avec predict_proba de sklearn
+# ----------------------------
+def test_linear_scorer_is_bit_identical_to_predict_proba(df, model):
+    X = df[model_features]
+    scorer = make_scorer(model)
+
+    assert isinstance(scorer, LinearScorer)
+    np.testing.assert_array_equal(scorer.score(X.to_numpy()), model.predict_proba(X)[:, 1])
+
+
+def test_linear_scorer_single_row(df, model):
+    X = df[model_features]
+    scorer = make_scorer(model)
+    expected = model.predict_proba(X.iloc[:200])[:, 1]
+
+    got = [scorer.score_one(row) for row in X.iloc[:200].to_numpy().tolist()]
+
+    np.testing.assert_allclose(got, expected, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("scaler", ["StandardScaler", "MinMaxScaler", "MaxAbsScaler", "RobustScaler"])
+def test_linear_scorer_folds_scaler_steps(df, scaler):
+    from sklearn import preprocessing
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+
+    X = df[model_features]
+    pipeline = make_pipeline(getattr(preprocessing, scaler)(), LogisticRegression(max_iter=1000))
+    pipeline.fit(X, df["left"])
+    scorer = make_scorer(pipeline)
+
+    assert isinstance(scorer, LinearScorer)
+    np.testing.assert_allclose(scorer.score(X.to_numpy()), pipeline.predict_proba(X)[:, 1], rtol=0, atol=1e-12)
+
+
+def test_unknown_model_falls_back_to_sklearn(df):
+    from sklearn.tree import DecisionTreeClassifier
+
+    X = df[model_features]
+    tree = DecisionTreeClassifier(max_depth=4, random_state=0).fit(X, df["left"])
+    scorer = make_scorer(tree)
+
+    assert isinstance(scorer, SklearnScorer)
+    np.testing.assert_array_equal(scorer.score(X.to_numpy()), tree.predict_proba(X)[:, 1])
+
+
+# ----------------------------
+# Ingestion incrémentale des deltas : même résultat qu'une reconstruction complète
+# ----------------------------
+@pytest.fixture(scope="module")
+def dataset():
+    from data_store import open_dataset
+
+    return open_dataset("df_model.csv")
+
+
+# Delta : copies de lignes de la population, avec les IDs, satisfactions et jobs donnés
+def _write_delta(path, dataset, rows, ids, satisfaction, jobs):
+    delta = dataset.iloc[rows].copy()
+    delta["id_colab"] = ids
+    delta["satisfaction_level"] = satisfaction
+    delta["job"] = np.asarray(jobs, dtype=object)
+    delta.to_csv(path, index=False)
+    return str(path)
+
+
+# Deux deltas : mises à jour, embauches, un ID modifié deux fois, deux nouveaux jobs
+@pytest.fixture
+def delta_paths(tmp_path, dataset):
+    ids = dataset["id_colab"].to_numpy()
+    new_a, new_b, new_c = (int(ids.max()) + k for k in (1, 2, 3))
+    first = _write_delta(
+        tmp_path / "2024-06-01.csv", dataset, [0, 1, 2, 3],
+        [ids[0], ids[1], new_a, new_b], [0.11, 0.12, 0.13, 0.14], ["sales", "hr", "sales", "zeta"],
+    )
+    second = _write_delta(
+        tmp_path / "2024-06-02.csv", dataset, [4, 5, 6, 7],
+        [new_a, ids[5], new_c, ids[5]], [0.21, 0.22, 0.23, 0.24], ["alpha", "hr", "alpha", "sales"],
+    )
+    return first, second
+
+
+def test_replayed_deltas_equal_incremental_ingestion(dataset, delta_paths):
+    from data_store import apply_delta, read_deltas
+
+    incremental = dataset
+    for path in delta_paths:
+        incremental = apply_delta(incremental, read_deltas([path]))["df"]
+    replayed = apply_delta(dataset, read_deltas(list(delta_paths)))["df"]
+
+    pd.testing.assert_frame_equal(replayed, incremental)
+    # Nouveaux IDs et nouveaux jobs dans l'ordre de leur première apparition
+    new_ids = incremental["id_colab"].to_numpy()[len(dataset):]
+    assert list(new_ids - dataset["id_colab"].max()) == [1, 2, 3]
+    assert list(incremental["job"].cat.categories[-2:]) == ["zeta", "alpha"]
+    # Dernière version d'un ID présent deux fois
+    assert incremental.loc[incremental["id_colab"] == dataset["id_colab"].iloc[5], "job"].item() == "sales"
+
+
+def test_dataset_key_has_fixed_size_as_deltas_accumulate(tmp_path, dataset):
+    import shutil
+
+    from data_store import dataset_version, extends_version
+
+    delta_dir = tmp_path / "deltas"
+    delta_dir.mkdir()
+    csv_path = tmp_path / "df_model.csv"
+    shutil.copy("df_model.csv", csv_path)
+    ids = dataset["id_colab"].to_numpy()
+    history = []
+    for day in range(1, 11):
+        _write_delta(delta_dir / f"2024-06-{day:02d}.csv", dataset, [day], [ids[day]], [0.5], ["sales"])
+        key, base, deltas = dataset_version(str(csv_path), str(delta_dir))
+        history.append({"dataset": key, "base": base, "deltas": deltas})
+    assert len({version["dataset"] for version in history}) == 10
+    assert {len(version["dataset"]) for version in history} == {32}
+    assert extends_version(history[3], history[9]) and not extends_version(history[9], history[3])
+    # Delta réécrit : la liste ne prolonge plus la précédente (reconstruction complète)
+    _write_delta(delta_dir / "2024-06-01.csv", dataset, [1], [ids[1]], [0.6], ["hr"])
+    key, base, deltas = dataset_version(str(csv_path), str(delta_dir))
+    assert not extends_version(history[3], {"dataset": key, "base": base, "deltas": deltas})
+
+
+# Clé d'une version remplacée puis évincée du cache : erreur plutôt que le contenu actuel
+def test_evicted_dataset_key_is_not_reloaded_with_new_files(tmp_path, monkeypatch, dataset):
+    import shutil
+
+    import data_store
+    from data_store import dataset_version, load_data
+    from file_formats import StaleVersionError
+
+    csv_path, delta_dir = tmp_path / "df_model.csv", tmp_path / "deltas"
+    shutil.copy("df_model.csv", csv_path)
+    delta_dir.mkdir()
+    monkeypatch.setattr(data_store, "CSV_PATH", str(csv_path))
+    monkeypatch.setattr(data_store, "DELTA_DIR", str(delta_dir))
+    load_data.clear()
+    old_key = dataset_version(str(csv_path), str(delta_dir))[0]
+    assert len(load_data(old_key)) == len(dataset)
+
+    ids = dataset["id_colab"].to_numpy()
+    _write_delta(delta_dir / "2024-06-01.csv", dataset, [0], [int(ids.max()) + 1], [0.5], ["sales"])
+    new_key = dataset_version(str(csv_path), str(delta_dir))[0]
+    load_data.clear()
+    with pytest.raises(StaleVersionError):
+        load_data(old_key)
+    assert len(load_data(new_key)) == len(dataset) + 1
+    load_data.clear()
+
+
+def test_evicted_model_key_is_not_reloaded_with_new_file(tmp_path, model):
+    from file_formats import StaleVersionError, file_fingerprint
+    from model_store import load_model_for_key, save_artifact
+
+    model_dir = str(tmp_path / "models")
+    path = save_artifact(model.coef_[0], float(model.intercept_[0]), {}, model_dir, version="20250101T000000Z")
+    key = f"{os.path.basename(path)}@{file_fingerprint(path)}"
+    np.testing.assert_array_equal(load_model_for_key(key, model_dir).coef_, model.coef_)
+
+    np.savez(path, coef=model.coef_ * 2, intercept=model.intercept_)
+    with pytest.raises(StaleVersionError):
+        load_model_for_key(key, model_dir)
+    new_key = f"{os.path.basename(path)}@{file_fingerprint(path)}"
+    np.testing.assert_array_equal(load_model_for_key(new_key, model_dir).coef_, model.coef_ * 2)
+
+
+def test_incremental_artifacts_equal_full_rebuild(dataset, model, delta_paths):
+    from aggregations import build_kpi_cube, update_kpi_cube
+    from counterfactuals import actionable_bounds, compute_counterfactuals, update_counterfactuals
+    from data_store import apply_delta, build_employee_index, read_deltas, update_employee_index
+    from leaderboard import build_leaderboard, update_leaderboard
+    from scoring import score_population, update_scores
+
+    change = apply_delta(dataset, read_deltas(list(delta_paths)))
+    new_df = change["df"]
+    changed = np.concatenate([change["updated"], change["appended"]])
+
+    index = update_employee_index(
+        build_employee_index(dataset), new_df["id_colab"].to_numpy()[len(dataset):], len(dataset)
+    )
+    expected_index = build_employee_index(new_df)
+    assert index["positions"].equals(expected_index["positions"])
+    np.testing.assert_array_equal(index["prefix_keys"], expected_index["prefix_keys"])
+    np.testing.assert_array_equal(index["prefix_positions"], expected_index["prefix_positions"])
+
+    cube = update_kpi_cube(build_kpi_cube(dataset), added=new_df.iloc[changed], removed=change["removed"])
+    expected_cube = build_kpi_cube(new_df)
+    # Lignes lues par étiquette (job, classe) : l'ordre des lignes n'est pas comparé
+    for name, table in expected_cube.items():
+        pd.testing.assert_frame_equal(cube[name].sort_index(), table.sort_index(), check_dtype=False)
+
+    scores = score_population(dataset, model)
+    new_scores = update_scores(scores, new_df, changed, model)
+    pd.testing.assert_frame_equal(new_scores, score_population(new_df, model))
+
+    board = update_leaderboard(build_leaderboard(dataset, scores), new_df, new_scores, changed)
+    expected_board = build_leaderboard(new_df, new_scores)
+    assert board["jobs"] == expected_board["jobs"]
+    np.testing.assert_array_equal(board["codes"], expected_board["codes"])
+    assert board["members"].keys() == expected_board["members"].keys()
+    for code, members in expected_board["members"].items():
+        np.testing.assert_array_equal(board["members"][code], members)
+        np.testing.assert_array_equal(board["top"][code], expected_board["top"][code])
+
+    counterfactuals = update_counterfactuals(
+        compute_counterfactuals(dataset, model), new_df, changed, change["removed"], model
+    )
+    pd.testing.assert_frame_equal(counterfactuals, compute_counterfactuals(new_df, model))
+    assert counterfactuals.attrs["bounds"] == actionable_bounds(new_df)
+
+
+# ----------------------------
+# Classement des employés à risque : pages identiques à un tri complet
+# ----------------------------
+@pytest.mark.parametrize("job", ["Tous", "sales", "hr"])
+@pytest.mark.parametrize("tier", ["Tous", "Faible Risque", "Haut Risque"])
+def test_leaderboard_pages_match_full_sort(dataset, model, job, tier):
+    from leaderboard import build_leaderboard, leaderboard_page, view_ranking
+    from scoring import score_population
+
+    scores = score_population(dataset, model)
+    proba = scores["proba"].to_numpy()
+    page_size = 50
+    # Profondeur réduite : les premières pages viennent des hauts de classement précalculés,
+    # les suivantes des membres complets des groupes
+    board = build_leaderboard(dataset, scores, depth=120)
+
+    mask = dataset["left"].to_numpy() == 0
+    if job != "Tous":
+        mask &= (dataset["job"] == job).to_numpy()
+    if tier != "Tous":
+        mask &= (scores["risk_level"] == tier).to_numpy()
+    candidates = np.flatnonzero(mask)
+    # Probabilité décroissante, puis position croissante
+    expected = candidates[np.lexsort((candidates, -proba[candidates]))]
+
+    np.testing.assert_array_equal(view_ranking(board, proba, job, tier), expected)
+    for page in [1, 2, 3, 5]:
+        positions, n_pages, total = leaderboard_page(board, proba, job, tier, page, page_size)
+        assert total == len(expected)
+        assert n_pages == max(1, -(-len(expected) // page_size))
+        page = min(page, n_pages)
+        np.testing.assert_array_equal(positions, expected[(page - 1) * page_size:page * page_size])
+
+
+# ----------------------------
+# Contrefactuels de rétention : chaque cible passe sous le seuil, un pas de moins non
+# ----------------------------
+def test_counterfactual_targets_cross_threshold_minimally(dataset, model):
+    from counterfactuals import ACTIONABLE_FEATURES, TARGET_PROBA, compute_counterfactuals
+
+    table = compute_counterfactuals(dataset, model)
+    X = dataset[model_features].astype(np.float64)
+    for feature in ACTIONABLE_FEATURES:
+        targets = table[feature].to_numpy()
+        rows = np.flatnonzero(~np.isnan(targets))
+        assert len(rows) > 0
+        step = np.sign(model.coef_[0][model_features.index(feature)])
+
+        moved = X.iloc[rows].copy()
+        moved[feature] = targets[rows]
+        assert (model.predict_proba(moved)[:, 1] < TARGET_PROBA).all()
+
+        # Un pas entier en arrière (vers la valeur actuelle) reste au-dessus du seuil
+        moved[feature] = targets[rows] + step
+        assert (model.predict_proba(moved)[:, 1] >= TARGET_PROBA).all()
+
+
+# Bornes tenues par les lignes modifiées : rétrécies (toutes les lignes à la borne rentrent),
+# étendues, ou tenues encore par une autre ligne modifiée
+@pytest.mark.parametrize("change", ["shrink", "extend", "kept"])
+@pytest.mark.parametrize("side", ["min", "max"])
+def test_incremental_bounds_equal_full_rebuild(dataset, model, change, side):
+    from counterfactuals import actionable_bounds, compute_counterfactuals, update_counterfactuals
+
+    feature = "average_montly_hours"
+    column = dataset[feature].to_numpy()
+    bound = column.min() if side == "min" else column.max()
+    inward = np.median(column)
+    at_bound = np.flatnonzero(column == bound)
+    positions = np.concatenate([at_bound, [int(np.flatnonzero(column == inward)[0])]])
+    new_values = np.full(len(positions), inward, dtype=column.dtype)
+    if change == "extend":
+        new_values[-1] = bound - 10 if side == "min" else bound + 10
+    elif change == "kept":
+        new_values[-1] = bound
+
+    new_df = dataset.copy()
+    new_df[feature] = column.copy()
+    new_df.loc[positions, feature] = new_values
+    counterfactuals = update_counterfactuals(
+        compute_counterfactuals(dataset, model), new_df, positions, dataset.iloc[positions], model
+    )
+    assert counterfactuals.attrs["bounds"] == actionable_bounds(new_df)
+    pd.testing.assert_frame_equal(counterfactuals, compute_counterfactuals(new_df, model))
+
+
+# ----------------------------
+# Scoring par blocs (score_batch.py)
+# ----------------------------
+def test_score_file_explains_non_linear_model(tmp_path, df):
+    pytest.importorskip("shap")
+    from sklearn.tree import DecisionTreeClassifier
+
+    from score_batch import score_file
+
+    tree = DecisionTreeClassifier(max_depth=4, random_state=0).fit(df[model_features], df["left"])
+    model_path = tmp_path / "tree.pkl"
+    with open(model_path, "wb") as f:
+        pickle.dump(tree, f)
+    sample = df.iloc[:500]
+    input_path = tmp_path / "extraction.csv"
+    sample.to_csv(input_path, index=False)
+
+    stats = score_file(
+        str(input_path), str(tmp_path / "scores.csv"), str(model_path), chunk_rows=200, workers=0, shap=True
+    )
+
+    scores = pd.read_csv(tmp_path / "scores.csv")
+    assert stats["rows"] == len(sample) and len(scores) == len(sample)
+    np.testing.assert_allclose(scores["proba"], tree.predict_proba(sample[model_features])[:, 1], atol=1e-12)
+    shap_columns = [f"shap_{feature}" for feature in model_features]
+    # Attributions de la classe 1 : base + somme des contributions = probabilité de quitter
+    np.testing.assert_allclose(
+        scores["shap_base_value"] + scores[shap_columns].sum(axis=1), scores["proba"], atol=1e-6
+    )
+
+
+# Entrée vide : même en-tête (et mêmes types en parquet) qu'une entrée non vide
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+@pytest.mark.parametrize("shap", [False, True])
+def test_score_file_of_empty_input_keeps_output_columns(tmp_path, df, fmt, shap):
+    from score_batch import score_file
+
+    for name, sample in (("empty", df.iloc[:0]), ("sample", df.iloc[:50])):
+        sample.to_csv(tmp_path / f"{name}.csv", index=False)
+        score_file(
+            str(tmp_path / f"{name}.csv"), str(tmp_path / f"{name}.{fmt}"), "logistic_model.pkl",
+            workers=0, shap=shap,
+        )
+    read = pd.read_csv if fmt == "csv" else pd.read_parquet
+    empty, sample = read(tmp_path / f"empty.{fmt}"), read(tmp_path / f"sample.{fmt}")
+    assert len(empty) == 0 and list(empty.columns) == list(sample.columns)
+    assert ("shap_base_value" in empty.columns) == shap
+    if fmt == "parquet":
+        assert (empty.dtypes.drop("id_colab") == sample.dtypes.drop("id_colab")).all()
+
+
+# ----------------------------
+# Modèle servi : seul un artefact promu remplace le pickle livré
+# ----------------------------
+def test_trained_artifact_is_served_only_once_promoted(tmp_path, model):
+    from model_store import active_model_path, demote, list_artifacts, promote, save_artifact
+
+    model_dir = str(tmp_path / "models")
+    first = save_artifact(model.coef_[0], float(model.intercept_[0]), {}, model_dir, version="20250101T000000Z")
+    assert active_model_path(model_dir) == "logistic_model.pkl"
+
+    promote(first, model_dir)
+    second = save_artifact(model.coef_[0], float(model.intercept_[0]), {}, model_dir, version="20250102T000000Z")
+    assert list_artifacts(model_dir) == [first, second]
+    assert active_model_path(model_dir) == first
+
+    with pytest.raises(ValueError):
+        promote(str(tmp_path / "inconnu.npz"), model_dir)
+    assert active_model_path(model_dir) == first
+
+    # Artefact promu supprimé : retour au pickle livré plutôt qu'au plus récent
+    os.remove(first)
+    assert active_model_path(model_dir) == "logistic_model.pkl"
+    promote(second, model_dir)
+    demote(model_dir)
+    assert active_model_path(model_dir) == "logistic_model.pkl"
+
+
+def test_artifact_versions_are_never_overwritten(tmp_path, model):
+    from model_store import ARTIFACT_PREFIX, list_artifacts, load_artifact, save_artifact
+
+    model_dir = str(tmp_path / "models")
+    coef, intercept = model.coef_[0], float(model.intercept_[0])
+    # Entraînements successifs dans la même seconde : deux artefacts distincts
+    first = save_artifact(coef, intercept, {}, model_dir)
+    second = save_artifact(coef * 2, intercept, {}, model_dir)
+    assert first != second and list_artifacts(model_dir) == [first, second]
+
+    version = os.path.basename(first)[len(ARTIFACT_PREFIX):-len(".npz")]
+    with pytest.raises(FileExistsError):
+        save_artifact(coef * 3, intercept, {}, model_dir, version=version)
+    np.testing.assert_array_equal(load_artifact(first).coef_[0], coef)
+
+
+# ----------------------------
+# Export des scores : noms de taille fixe, seules les versions récentes sont gardées
+# ----------------------------
+def test_score_exports_keep_only_recent_versions(tmp_path, df, model):
+    from scoring import export_path, open_export, score_population
+
+    scores = score_population(df.iloc[:100], model)
+    export_dir = str(tmp_path / "exports")
+    paths = [export_path("a" * 500 + str(version), "logistic_model.pkl@0-0-0", "csv", export_dir=export_dir)
+             for version in range(3)]
+    assert len({os.path.basename(path) for path in paths}) == 3
+    assert max(len(os.path.basename(path)) for path in paths) < 64
+
+    for mtime, path in enumerate(paths):
+        with open_export(path, lambda: scores, keep=2) as f:
+            assert f.read().startswith(b'"id_colab"')
+        os.utime(path, ns=(mtime * 10**9, mtime * 10**9))
+    assert sorted(os.listdir(export_dir)) == sorted(os.path.basename(path) for path in paths[1:])
+
+    # Export réutilisé : pas réécrit, et il compte comme le plus récemment servi
+    with open_export(paths[1], lambda: pytest.fail("export réécrit"), keep=2):
+        pass
+    extra = export_path("autre", "logistic_model.pkl@0-0-0", "csv", export_dir=export_dir)
+    open_export(extra, lambda: scores, keep=2).close()
+    assert sorted(os.listdir(export_dir)) == sorted(os.path.basename(path) for path in [paths[1], extra])
+
+
+# ----------------------------
+# Service de scoring par micro-lots et registre des services
+# ----------------------------
+def test_micro_batcher_coalesces_concurrent_requests(df, model):
+    import threading
+
+    from scoring import make_scoring_service
+
+    X = df[model_features].to_numpy(dtype=np.float64)
+    expected = model.predict_proba(df[model_features])[:, 1]
+    # Fenêtre large : les 16 demandes simultanées tombent dans le même lot
+    service = make_scoring_service(model, window_ms=500, max_rows=10_000, workers=1)
+    barrier = threading.Barrier(16)
+    results = {}
+
+    def request(i):
+        barrier.wait()
+        results[i] = service.submit(X[i * 3:i * 3 + 3]).result(timeout=10)
+
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    service.close()
+
+    assert service.stats == {"requests": 16, "rows": 48, "batches": 1}
+    # Chaque demande reçoit les probabilités de ses propres lignes
+    for i in range(16):
+        np.testing.assert_allclose(results[i], expected[i * 3:i * 3 + 3], rtol=0, atol=1e-12)
+
+
+def test_micro_batcher_close_serves_pending_requests_then_refuses_new_ones():
+    import threading
+
+    from scoring import MicroBatcher
+
+    release = threading.Event()
+
+    def slow_double(rows):
+        release.wait(10)
+        return rows[:, 0] * 2
+
+    batcher = MicroBatcher(slow_double, window_ms=1, max_rows=4, workers=1)
+    futures = [batcher.submit([[float(i)]]) for i in range(20)]
+    closer = threading.Thread(target=batcher.close)
+    closer.start()
+    release.set()
+    closer.join(10)
+
+    assert not closer.is_alive()
+    np.testing.assert_array_equal(np.concatenate([future.result(timeout=0) for future in futures]), np.arange(20) * 2.0)
+    assert batcher.stats["requests"] == 20 and batcher.stats["batches"] >= 5
+    with pytest.raises(RuntimeError):
+        batcher.submit([[1.0]])
+    batcher.close()
+
+
+def test_micro_batcher_propagates_batch_errors_to_every_caller():
+    from scoring import MicroBatcher
+
+    def fail(rows):
+        raise ValueError("lot invalide")
+
+    batcher = MicroBatcher(fail, window_ms=200, workers=1)
+    futures = [batcher.submit([[1.0]]) for _ in range(3)]
+    for future in futures:
+        with pytest.raises(ValueError, match="lot invalide"):
+            future.result(timeout=10)
+    batcher.close()
+
+
+def test_service_registry_closes_evicted_services(model):
+    from artifacts import ServiceRegistry
+    from scoring import make_scoring_service
+
+    registry = ServiceRegistry(max_entries=2)
+    made = []
+
+    def make():
+        made.append(make_scoring_service(model, workers=1))
+        return made[-1]
+
+    first = registry.get("scoring", "v1", make)
+    second = registry.get("scoring", "v2", make)
+    assert registry.get("scoring", "v1", make) is first and len(made) == 2
+    # Autre type de service : compté à part
+    registry.get("shap", "v1", lambda: make_scoring_service(model, workers=1))
+
+    registry.get("scoring", "v3", make)
+    assert not second._thread.is_alive()
+    with pytest.raises(RuntimeError):
+        second.submit([[0.0] * len(model_features)])
+    assert first._thread.is_alive() and first.submit(np.zeros((1, len(model_features)))).result(timeout=10).shape == (1,)
+    for kind in ("scoring", "shap"):
+        for service in registry._services[kind].values():
+            service.close()
+
+
+# ----------------------------
+# Calculs d'arrière-plan partagés entre sessions
+# ----------------------------
+def test_background_job_is_shared_by_sessions_and_its_result_reused():
+    import threading
+
+    from artifacts import BackgroundJobs
+
+    jobs = BackgroundJobs(workers=1)
+    started, release = [], threading.Event()
+
+    def make_steps():
+        started.append(1)
+        yield 0.5, "Première moitié"
+        release.wait(10)
+        return 42
+
+    first = jobs.submit("shap", "session-a", make_steps)
+    second = jobs.submit("shap", "session-b", make_steps)
+    assert first is second and first.sessions == {"session-a", "session-b"}
+    release.set()
+    assert first.future.result(timeout=10) == 42
+    assert (first.progress, first.stage) == (1.0, "Terminé")
+    # Résultat terminé resservi sans relancer le générateur
+    assert jobs.submit("shap", "session-c", make_steps) is first and len(started) == 1
+
+
+def test_background_job_is_cancelled_between_steps_once_every_session_leaves():
+    import threading
+    from concurrent.futures import CancelledError
+
+    from artifacts import BackgroundJobs
+
+    jobs = BackgroundJobs(workers=1)
+    in_step, release = threading.Event(), threading.Event()
+    steps_done, closed = [], threading.Event()
+
+    def make_steps():
+        try:
+            for step in range(5):
+                if step == 1:
+                    in_step.set()
+                    release.wait(10)
+                steps_done.append(step)
+                yield step / 5, f"Étape {step}"
+            return "fini"
+        finally:
+            closed.set()
+
+    job = jobs.submit("shap", "session-a", make_steps)
+    jobs.submit("shap", "session-b", make_steps)
+    assert in_step.wait(10)
+    jobs.release("shap", "session-a")
+    assert not job.cancelled.is_set()
+    jobs.release("shap", "session-b")
+    assert job.cancelled.is_set()
+    release.set()
+
+    with pytest.raises(CancelledError):
+        job.future.result(timeout=10)
+    # L'étape en cours se termine, la suivante n'est jamais lancée, le générateur est fermé
+    assert steps_done == [0, 1] and closed.is_set()
+    # Une nouvelle demande relance un job neuf
+    assert jobs.submit("shap", "session-c", make_steps) is not job
+
+
+def test_background_job_errors_propagate_and_are_retried_on_demand():
+    from artifacts import BackgroundJobs
+
+    jobs = BackgroundJobs(workers=1)
+    attempts = []
+
+    def make_steps():
+        attempts.append(1)
+        yield 0.1, "Calcul"
+        if len(attempts) == 1:
+            raise ValueError("explainer indisponible")
+        return "ok"
+
+    failed = jobs.submit("shap", "session-a", make_steps)
+    with pytest.raises(ValueError, match="explainer indisponible"):
+        failed.future.result(timeout=10)
+    # Sans retry, l'échec est resservi tel quel ; avec retry, le job est relancé
+    assert jobs.submit("shap", "session-b", make_steps) is failed and len(attempts) == 1
+    retried = jobs.submit("shap", "session-b", make_steps, retry=True)
+    assert retried is not failed and retried.future.result(timeout=10) == "ok"
+
+
+# ----------------------------
+# Comparaison champion / challenger : scoring empilé et AUC
+# ----------------------------
+@pytest.fixture(scope="module")
+def registered(df, model):
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.tree import DecisionTreeClassifier
+
+    X, y = df[model_features], df["left"]
+    with open("logistic_regression_model.pkl", "rb") as f:
+        shipped = pickle.load(f)
+    return {
+        "champion": model,
+        "livré": shipped,
+        "régularisé": LogisticRegression(C=0.01, max_iter=1000).fit(X, y),
+        "arbre": DecisionTreeClassifier(max_depth=4, random_state=0).fit(X, y),
+    }
+
+
+def test_stacked_scores_equal_each_model_predict_proba(df, registered):
+    from scoring import score_models
+
+    scores = score_models(df, registered)
+
+    assert list(scores.columns) == list(registered)
+    np.testing.assert_array_equal(scores.index, df["id_colab"])
+    for name, model in registered.items():
+        np.testing.assert_allclose(scores[name], model.predict_proba(df[model_features])[:, 1], rtol=0, atol=1e-12)
+
+
+def test_model_scores_reuse_previous_columns_and_score_only_new_models(df, registered):
+    from scoring import score_models
+
+    previous = score_models(df, {name: registered[name] for name in ("champion", "arbre")})
+    # Colonnes reprises telles quelles : une valeur repère prouve qu'elles ne sont pas recalculées
+    previous["champion"] = -1.0
+    previous["arbre"] = -2.0
+    scores = score_models(df, registered, previous=previous)
+
+    assert (scores["champion"] == -1.0).all() and (scores["arbre"] == -2.0).all()
+    for name in ("livré", "régularisé"):
+        np.testing.assert_allclose(
+            scores[name], registered[name].predict_proba(df[model_features])[:, 1], rtol=0, atol=1e-12
+        )
+    # Population différente : rien n'est repris
+    fresh = score_models(df.iloc[:100], registered, previous=previous)
+    assert (fresh["champion"] >= 0).all()
+
+
+def test_mann_whitney_auc_matches_sklearn_with_ties(df, registered):
+    from sklearn.metrics import roc_auc_score
+
+    from comparison import auc_scores
+    from scoring import score_models
+
+    scores = score_models(df, registered)
+    # Arrondi : nombreux ex aequo ; colonne constante : AUC 0,5
+    proba = np.column_stack([scores.to_numpy(), scores.to_numpy().round(1), np.full(len(df), 0.3)])
+    left = df["left"].to_numpy()
+
+    expected = [roc_auc_score(left, proba[:, j]) for j in range(proba.shape[1])]
+    np.testing.assert_allclose(auc_scores(proba, left), expected, rtol=0, atol=1e-12)
+    assert np.isnan(auc_scores(proba, np.zeros(len(df)))).all()
+
+
+def test_compare_models_matches_brute_force_risk_levels(dataset, registered):
+    from comparison import compare_models
+    from scoring import RISK_LEVELS, assign_risk_level, score_models
+
+    scores = score_models(dataset, registered)
+    comparison = compare_models(dataset, scores, "champion")
+
+    # Niveaux ligne par ligne avec la fonction scalaire de référence
+    champion_levels = np.array([assign_risk_level(p) for p in scores["champion"]])
+    for name in registered:
+        levels = np.array([assign_risk_level(p) for p in scores[name]])
+        disagree = levels != champion_levels
+        assert comparison["summary"].loc[name, "disagreements"] == disagree.sum()
+        expected = pd.crosstab(
+            pd.Categorical(champion_levels, categories=RISK_LEVELS), pd.Categorical(levels, categories=RISK_LEVELS),
+            dropna=False,
+        )
+        np.testing.assert_array_equal(comparison["transitions"][name].to_numpy(), expected.to_numpy())
+        by_job = dataset.loc[disagree, "job"].value_counts().reindex(comparison["disagreements"].index, fill_value=0)
+        np.testing.assert_array_equal(comparison["disagreements"][name], by_job)
+    assert comparison["summary"].loc["champion", "max_abs_delta"] == 0
+
+
+# ----------------------------
+# Simulation what-if : probabilité du scénario égale à celle de la ligne modifiée
+# ----------------------------
+def _what_if_scenarios(df, n_scenarios=20, seed=0):
+    rng = np.random.default_rng(seed)
+    for position in rng.choice(len(df), n_scenarios, replace=False):
+        row = df[model_features].iloc[position]
+        features = rng.choice(model_features, 3, replace=False)
+        values = {}
+        for feature in features:
+            low, high = df[feature].min(), df[feature].max()
+            integer = np.issubdtype(df[feature].dtype, np.integer)
+            values[feature] = int(rng.integers(low, high + 1)) if integer else round(float(rng.uniform(low, high)), 2)
+        yield row, values
+
+
+@pytest.mark.parametrize("kind", ["logistique", "arbre"])
+def test_what_if_proba_matches_predict_proba_of_modified_row(df, model, kind):
+    from sklearn.tree import DecisionTreeClassifier
+
+    from what_if import feature_grids, feature_ranges, sensitivity_curves, what_if_proba
+
+    if kind == "arbre":
+        model = DecisionTreeClassifier(max_depth=6, random_state=0).fit(df[model_features], df["left"])
+    grids = feature_grids(feature_ranges(df))
+    score = make_scorer(model).score
+    for row, values in _what_if_scenarios(df):
+        curves = sensitivity_curves(score, row.to_numpy(), grids)
+        base_proba = model.predict_proba(row.to_frame().T)[0, 1]
+        modified = row.to_frame().T.astype(np.float64)
+        for feature, value in values.items():
+            modified[feature] = value
+
+        expected = model.predict_proba(modified)[0, 1]
+        assert what_if_proba(curves, row, base_proba, values, model) == pytest.approx(expected, abs=1e-9)
+
+
+# ----------------------------
+# Courbes de turnover binnées et bandes de Wilson
+# ----------------------------
+def test_wilson_interval_matches_scipy_and_closed_form():
+    from scipy.stats import binomtest
+
+    from aggregations import Z_95, wilson_interval
+
+    counts = np.array([1, 5, 10, 10, 10, 37, 250, 1000])
+    successes = np.array([0, 5, 0, 3, 10, 11, 100, 999])
+    lower, upper = wilson_interval(successes, counts)
+
+    for k, n, low, high in zip(successes, counts, lower, upper):
+        expected = binomtest(int(k), int(n)).proportion_ci(0.95, method="wilson")
+        assert (low, high) == pytest.approx((expected.low, expected.high), abs=1e-12)
+        # Bornes : racines de (p_chapeau - p)^2 = z^2 p (1 - p) / n
+        for p in (low, high):
+            assert (k / n - p) ** 2 == pytest.approx(Z_95**2 * p * (1 - p) / n, abs=1e-12)
+    # Aucun effectif : pas d'intervalle
+    assert np.isnan(wilson_interval([0], [0])).all()
+
+
+def test_bin_index_keeps_decimal_values_on_their_bin_edge():
+    from aggregations import bin_index
+
+    # Centièmes stockés en float32 (comme satisfaction_level), dont toutes les bornes de classes
+    hundredths = np.arange(0, 101)
+    for dtype in (np.float32, np.float64):
+        values = (hundredths / 100).astype(dtype)
+        for width, per_bin in ((0.01, 1), (0.05, 5), (0.1, 10), (0.25, 25)):
+            np.testing.assert_array_equal(bin_index(values, width), hundredths // per_bin)
+    # Heures entières, classes de 5
+    hours = np.arange(96, 311, dtype=np.int16)
+    np.testing.assert_array_equal(bin_index(hours, 5), hours // 5)
+
+
+@pytest.mark.parametrize("column, factor", [
+    ("satisfaction_level", 1), ("satisfaction_level", 5), ("last_evaluation", 10),
+    ("average_montly_hours", 4), ("number_project", 1),
+])
+def test_cube_curves_match_pandas_groupby_on_decimal_bins(dataset, column, factor):
+    from aggregations import CURVE_BIN_WIDTHS, binned_curve, build_kpi_cube, cube_curve
+
+    width = CURVE_BIN_WIDTHS[column] * factor
+    # Classe attendue calculée en entiers (centièmes) : aucune erreur d'arrondi possible
+    scale = 100 if isinstance(CURVE_BIN_WIDTHS[column], float) else 1
+    units = np.round(dataset[column].to_numpy(dtype=np.float64) * scale).astype(np.int64)
+    expected = (
+        pd.DataFrame({"bin": units // round(width * scale), "left": dataset["left"].to_numpy()})
+        .groupby("bin")["left"].agg(["size", "mean"])
+    )
+
+    cube = build_kpi_cube(dataset)
+    for curve in (cube_curve(cube, column, "Tous", factor), binned_curve(dataset[column], dataset["left"], bin_width=width)):
+        np.testing.assert_array_equal(curve["count"], expected["size"])
+        np.testing.assert_allclose(curve["turnover"], expected["mean"], rtol=0, atol=1e-12)
+
+
+def test_quantile_curve_matches_pandas_cut_groupby(dataset):
+    from aggregations import binned_curve
+
+    x = dataset["average_montly_hours"].to_numpy(dtype=np.float64)
+    left = dataset["left"].to_numpy()
+    curve = binned_curve(x, left, n_quantiles=10)
+
+    edges = np.unique(np.quantile(x, np.linspace(0, 1, 11)))
+    # Classes fermées à gauche ; la dernière inclut le maximum
+    bins = pd.cut(x, edges, right=False, labels=False)
+    bins = np.where(x == edges[-1], len(edges) - 2, bins)
+    expected = pd.DataFrame({"bin": bins, "x": x, "left": left}).groupby("bin").agg(
+        size=("x", "size"), x_value=("x", "mean"), turnover=("left", "mean")
+    )
+    np.testing.assert_array_equal(curve["count"], expected["size"])
+    np.testing.assert_allclose(curve["x_value"], expected["x_value"], rtol=0, atol=1e-9)
+    np.testing.assert_allclose(curve["turnover"], expected["turnover"], rtol=0, atol=1e-12)
+
+
+# ----------------------------
+# Histogrammes binnés côté serveur
+# ----------------------------
+@pytest.mark.parametrize("column", ["satisfaction_level", "last_evaluation", "average_montly_hours"])
+def test_histogram_matches_np_histogram_and_pandas_cut(dataset, column):
+    from aggregations import compute_histogram
+
+    values = dataset[column].to_numpy()
+    histogram = compute_histogram(values, nbins=20)
+
+    counts, edges = np.histogram(values.astype(np.float64), bins=20)
+    np.testing.assert_array_equal(histogram["counts"], counts)
+    np.testing.assert_array_equal(histogram["edges"], edges)
+    # Classes fermées à gauche, la dernière fermée des deux côtés
+    bins = pd.cut(values.astype(np.float64), histogram["edges"], right=False, labels=False)
+    bins = np.where(values == values.max(), 19, bins)
+    assert not np.isnan(bins).any()
+    np.testing.assert_array_equal(histogram["counts"], np.bincount(bins.astype(np.int64), minlength=20))
+
+
+def test_histogram_values_on_bin_edges():
+    from aggregations import compute_histogram
+
+    # Bornes 0, 0.25, 0.5, 0.75, 1 : chaque valeur sur une borne compte dans la classe qui y commence
+    histogram = compute_histogram(np.array([0.0, 0.25, 0.25, 0.5, 0.75, 1.0, 1.0]), nbins=4)
+    np.testing.assert_array_equal(histogram["edges"], [0.0, 0.25, 0.5, 0.75, 1.0])
+    np.testing.assert_array_equal(histogram["counts"], [1, 2, 1, 3])
+
+
+@pytest.mark.parametrize("column", ["number_project", "time_spend_company", "salary_encoded"])
+def test_histogram_of_small_integer_range_has_one_bin_per_value(dataset, column):
+    from aggregations import compute_histogram
+
+    values = dataset[column].to_numpy()
+    histogram = compute_histogram(values, nbins=20)
+
+    expected = pd.Series(values).value_counts().reindex(range(values.min(), values.max() + 1), fill_value=0)
+    np.testing.assert_array_equal(histogram["counts"], expected.to_numpy())
+    # Classes centrées sur les valeurs entières
+    np.testing.assert_array_equal((histogram["edges"][:-1] + histogram["edges"][1:]) / 2, expected.index)
+    counts, _ = np.histogram(values, bins=histogram["edges"])
+    np.testing.assert_array_equal(histogram["counts"], counts)
+
+
+# ----------------------------
+# Historique Parquet interrogé en flux : mêmes agrégats qu'en mémoire
+# ----------------------------
+@pytest.fixture(scope="module")
+def history_snapshots(tmp_path_factory, dataset):
+    from history import open_history, write_snapshot
+
+    history_dir = str(tmp_path_factory.mktemp("history"))
+    later = dataset.iloc[3000:].copy()
+    later["satisfaction_level"] = (later["satisfaction_level"] * 0.9).astype(np.float32)
+    later["average_montly_hours"] = (later["average_montly_hours"] + 7).astype(np.int16)
+    snapshots = {
+        "2024-04": dataset.iloc[:6000].reset_index(drop=True),
+        "2024-05": later.reset_index(drop=True),
+        "2024-06": dataset[dataset["job"].isin(["sales", "technical"])].reset_index(drop=True),
+    }
+    # Petits row groups : plusieurs par fichier, et certains élagués par le filtre job
+    for snapshot, df in snapshots.items():
+        write_snapshot(df, snapshot, history_dir, row_group_rows=1000)
+    return open_history(history_dir), snapshots
+
+
+def _history_rows(snapshots, snapshot, job):
+    df = pd.concat(snapshots.values()) if snapshot is None else snapshots[snapshot]
+    return df if job == "Tous" else df[df["job"] == job]
+
+
+@pytest.mark.parametrize("snapshot", [None, "2024-04", "2024-05", "2024-06"])
+def test_history_kpi_cube_matches_in_memory_cube(monkeypatch, history_snapshots, snapshot):
+    import history
+    from aggregations import build_kpi_cube
+
+    monkeypatch.setattr(history, "SCAN_BATCH_ROWS", 700)
+    dataset, snapshots = history_snapshots
+    cube = history.history_kpi_cube(dataset, snapshot)
+    expected = build_kpi_cube(_history_rows(snapshots, snapshot, "Tous"))
+
+    assert cube.keys() == expected.keys()
+    for name, table in expected.items():
+        pd.testing.assert_frame_equal(cube[name].sort_index(), table.sort_index(), check_dtype=False)
+
+
+@pytest.mark.parametrize("snapshot", [None, "2024-05", "2024-06"])
+@pytest.mark.parametrize("job", ["Tous", "sales", "hr"])
+def test_history_histograms_and_densities_match_in_memory(monkeypatch, history_snapshots, snapshot, job):
+    import history
+    from aggregations import compute_histogram
+    from charts import density_grids
+
+    monkeypatch.setattr(history, "SCAN_BATCH_ROWS", 700)
+    dataset, snapshots = history_snapshots
+    rows = _history_rows(snapshots, snapshot, job)
+
+    for feature in ("satisfaction_level", "average_montly_hours", "number_project"):
+        result = history.history_histogram(dataset, feature, snapshot, job)
+        if rows.empty:
+            assert result["counts"].sum() == 0
+            continue
+        expected = compute_histogram(rows[feature].to_numpy(), nbins=20)
+        np.testing.assert_array_equal(result["edges"], expected["edges"])
+        np.testing.assert_array_equal(result["counts"], expected["counts"])
+
+    density = history.history_density(dataset, "satisfaction_level", "average_montly_hours", snapshot, job)
+    if rows.empty:
+        assert all(grid.sum() == 0 for grid in density["grids"].values())
+        return
+    expected = density_grids(rows["satisfaction_level"], rows["average_montly_hours"], rows["left"])
+    np.testing.assert_array_equal(density["x_edges"], expected["x_edges"])
+    np.testing.assert_array_equal(density["y_edges"], expected["y_edges"])
+    for value in (0, 1):
+        np.testing.assert_array_equal(density["grids"][value], expected["grids"][value])
@@ -0,0 +1,200 @@
+# train.py
+# Réentraînement du modèle logistique de turnover sur les colonnes model_features (cible :
+# left), à partir de df_model.csv, d'un Parquet ou d'un répertoire de Parquet (historique).
+# - Données qui tiennent en mémoire : LogisticRegression (lbfgs), comme le modèle livré.
+# - Au-delà : SGD logistique entraîné bloc par bloc (partial_fit), mémoire bornée par un bloc.
+# Le résultat est un artefact versionné de model_store (coefficients .npz + sidecar JSON :
+# ordre des features, empreinte des données, métriques). L'application ne le sert qu'une
+# fois promu (--promote, ou python model_store.py promote) ; sinon c'est un challenger.
+# Validation : employés dont id_colab % VALIDATION_MODULUS == 0 (tous leurs instantanés),
+# jamais vus à l'entraînement.
+# Usage : python train.py [--data df_model.csv] [--method auto|lbfgs|sgd] [--model-dir models] [--promote]
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pyarrow as pa
+
+from model_store import MODEL_DIR, promote as promote_artifact, save_artifact
+from score_batch import read_chunks
+from scoring import LinearScorer, model_features
+
+TRAIN_COLUMNS = ["id_colab"] + model_features + ["left"]
+CHUNK_ROWS = 1_000_000
+# Au-delà de ce nombre de lignes, entraînement incrémental par blocs (SGD)
+IN_MEMORY_ROWS = int(os.environ.get("TURNOVER_TRAIN_IN_MEMORY_ROWS", 5_000_000))
+VALIDATION_MODULUS = 5
+# Hyperparamètres : ceux du modèle livré (lbfgs) et du SGD incrémental
+LBFGS_PARAMS = {"C": 1.0, "max_iter": 1000}
+SGD_EPOCHS = 5
+SGD_ALPHA = 1e-4
+# Classes de probabilité de l'AUC calculée en flux (histogrammes par classe)
+AUC_BINS = 4096
+
+
+# Features, cible et masque de validation d'un bloc
+def _arrays(table):
+    X = np.column_stack([table.column(feature).to_numpy().astype(np.float64) for feature in model_features])
+    y = table.column("left").to_numpy().astype(np.int64)
+    validation = table.column("id_colab").to_numpy() % VALIDATION_MODULUS == 0
+    return X, y, validation
+
+
+# Nombre de lignes de l'entrée (métadonnées Parquet ; comptage des fins de ligne pour un CSV)
+def count_rows(path):
+    if os.path.isdir(path):
+        import pyarrow.dataset as ds
+
+        return ds.dataset(path, format="parquet", partitioning="hive").count_rows()
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(path).metadata.num_rows
+    n_lines = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 24), b""):
+            n_lines += block.count(b"\n")
+    return max(n_lines - 1, 0)
+
+
+# Empreinte des données d'entraînement (fichier, ou ensemble des fichiers d'un répertoire)
+def dataset_fingerprint(path):
+    if os.path.isdir(path):
+        from history import history_version
+
+        return history_version(path)
+    from file_formats import file_fingerprint
+
+    return file_fingerprint(path)
+
+
+# ----------------------------
+# Entraînement
+# ----------------------------
+# Fonction pour entraîner en mémoire (lbfgs) : coefficients, constante et paramètres
+def fit_in_memory(path, chunk_rows=CHUNK_ROWS):
+    from sklearn.linear_model import LogisticRegression
+
+    X, y, validation = _arrays(pa.concat_tables(read_chunks(path, chunk_rows, TRAIN_COLUMNS)))
+    model = LogisticRegression(**LBFGS_PARAMS).fit(X[~validation], y[~validation])
+    training = dict(LBFGS_PARAMS, method="lbfgs", n_iter=int(model.n_iter_[0]))
+    return model.coef_[0], float(model.intercept_[0]), training
+
+
+# Fonction pour entraîner par blocs : une passe pour la moyenne et l'écart-type des features
+# (le SGD exige des features standardisées), puis `epochs` passes de partial_fit sur des
+# blocs mélangés. La standardisation est repliée dans les coefficients à la fin, comme
+# make_scorer le fait pour un scaler : l'artefact s'applique aux features brutes.
+def fit_incremental(path, chunk_rows=CHUNK_ROWS, epochs=SGD_EPOCHS, alpha=SGD_ALPHA, seed=0):
+    from sklearn.linear_model import SGDClassifier
+
+    n_rows, sums, squares = 0, np.zeros(len(model_features)), np.zeros(len(model_features))
+    for table in read_chunks(path, chunk_rows, TRAIN_COLUMNS):
+        X, _, validation = _arrays(table)
+        X = X[~validation]
+        n_rows += len(X)
+        sums += X.sum(axis=0)
+        squares += (X ** 2).sum(axis=0)
+    mean = sums / n_rows
+    std = np.sqrt(np.maximum(squares / n_rows - mean ** 2, 0))
+    std[std == 0] = 1.0
+
+    # Moyenne des itérés (ASGD) : insensible au pas initial, proche de lbfgs dès quelques passes
+    classifier = SGDClassifier(loss="log_loss", alpha=alpha, average=True, random_state=seed)
+    rng = np.random.default_rng(seed)
+    for _ in range(epochs):
+        for table in read_chunks(path, chunk_rows, TRAIN_COLUMNS):
+            X, y, validation = _arrays(table)
+            order = rng.permutation(np.flatnonzero(~validation))
+            classifier.partial_fit((X[order] - mean) / std, y[order], classes=[0, 1])
+
+    coef = classifier.coef_[0] / std
+    intercept = float(classifier.intercept_[0] - coef @ mean)
+    training = {"method": "sgd", "alpha": alpha, "average": True, "epochs": epochs, "chunk_rows": chunk_rows, "seed": seed}
+    return coef, intercept, training
+
+
+# Fonction pour évaluer des coefficients sur les lignes de validation, en une passe :
+# log loss, exactitude, AUC (histogrammes des probabilités par classe) et taux de départ
+def evaluate(path, coef, intercept, chunk_rows=CHUNK_ROWS):
+    scorer = LinearScorer(coef, intercept)
+    counts = {0: np.zeros(AUC_BINS), 1: np.zeros(AUC_BINS)}
+    n_rows = n_train = n_correct = 0
+    loss = 0.0
+    for table in read_chunks(path, chunk_rows, TRAIN_COLUMNS):
+        X, y, validation = _arrays(table)
+        n_train += int((~validation).sum())
+        X, y = X[validation], y[validation]
+        proba = np.clip(scorer.score(X), 1e-15, 1 - 1e-15)
+        n_rows += len(y)
+        loss -= float(np.sum(y * np.log(proba) + (1 - y) * np.log(1 - proba)))
+        n_correct += int(np.sum((proba > 0.5) == y))
+        bins = np.minimum((proba * AUC_BINS).astype(np.int64), AUC_BINS - 1)
+        for value in (0, 1):
+            counts[value] += np.bincount(bins[y == value], minlength=AUC_BINS)
+
+    # AUC : probabilité qu'un partant soit classé au-dessus d'un restant (ex aequo : 1/2)
+    negatives_below = np.cumsum(counts[0]) - counts[0]
+    n_pairs = counts[0].sum() * counts[1].sum()
+    auc = float(np.sum(counts[1] * (negatives_below + counts[0] / 2)) / n_pairs) if n_pairs else float("nan")
+    return {
+        "train_rows": n_train,
+        "validation_rows": n_rows,
+        "log_loss": loss / n_rows if n_rows else float("nan"),
+        "accuracy": n_correct / n_rows if n_rows else float("nan"),
+        "auc": auc,
+        "turnover_rate": float(counts[1].sum() / n_rows) if n_rows else float("nan"),
+    }
+
+
+# Fonction pour entraîner, évaluer et enregistrer un artefact (promu si promote=True) ;
+# retourne son chemin et son sidecar
+def train(path, method="auto", model_dir=MODEL_DIR, chunk_rows=CHUNK_ROWS, epochs=SGD_EPOCHS, promote=False):
+    n_rows = count_rows(path)
+    if method == "auto":
+        method = "lbfgs" if n_rows <= IN_MEMORY_ROWS else "sgd"
+    start = time.perf_counter()
+    if method == "lbfgs":
+        coef, intercept, training = fit_in_memory(path, chunk_rows)
+    elif method == "sgd":
+        coef, intercept, training = fit_incremental(path, chunk_rows, epochs)
+    else:
+        raise ValueError(f"Méthode d'entraînement inconnue : {method}")
+    training["seconds"] = time.perf_counter() - start
+
+    metadata = {
+        "model_type": "logistic_regression",
+        "trained_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "dataset": {"path": path, "fingerprint": dataset_fingerprint(path), "rows": n_rows},
+        "training": training,
+        "metrics": evaluate(path, coef, intercept, chunk_rows),
+    }
+    npz_path = save_artifact(coef, intercept, metadata, model_dir)
+    if promote:
+        promote_artifact(npz_path, model_dir)
+    return npz_path, metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entraînement du modèle logistique de turnover")
+    parser.add_argument("--data", default="df_model.csv", help="CSV, Parquet ou répertoire de Parquet")
+    parser.add_argument("--method", choices=["auto", "lbfgs", "sgd"], default="auto")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--epochs", type=int, default=SGD_EPOCHS, help="Passes du SGD incrémental")
+    parser.add_argument("--promote", action="store_true", help="Sert l'artefact dans l'application (sinon challenger)")
+    args = parser.parse_args()
+
+    npz_path, metadata = train(args.data, args.method, args.model_dir, args.chunk_rows, args.epochs, args.promote)
+    print(json.dumps({
+        "artifact": npz_path,
+        "promoted": args.promote,
+        "training": metadata["training"],
+        "metrics": metadata["metrics"],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# what_if.py
+import os
+
+import numpy as np
+
+from explanations import is_linear_model
+from scoring import make_scorer, model_features
+
+# Nombre de points de la grille de chaque feature continue (les features entières prennent
+# toutes leurs valeurs tant qu'elles tiennent dans ce nombre de points)
+GRID_POINTS = int(os.environ.get("TURNOVER_WHATIF_GRID_POINTS", 41))
+
+# Bornes des probabilités avant passage en log-odds (évite logit(0) et logit(1))
+_EPS = 1e-12
+
+
+# Fonction pour obtenir les bornes (min, max) et le caractère entier de chaque feature
+def feature_ranges(df):
+    return {
+        feature: (
+            float(df[feature].min()),
+            float(df[feature].max()),
+            np.issubdtype(df[feature].dtype, np.integer),
+        )
+        for feature in model_features
+    }
+
+
+# Fonction pour construire la grille de perturbation de chaque feature
+def feature_grids(ranges, n_points=GRID_POINTS):
+    grids = {}
+    for feature, (low, high, integer) in ranges.items():
+        if integer and high - low + 1 <= n_points:
+            grids[feature] = np.arange(low, high + 1, dtype=np.float64)
+        elif integer:
+            grids[feature] = np.unique(np.round(np.linspace(low, high, n_points)))
+        else:
+            grids[feature] = np.linspace(low, high, n_points)
+    return grids
+
+
+# ----------------------------
+# Moteur de sensibilité
+# ----------------------------
+# Toutes les perturbations d'un employé (chaque feature parcourt sa grille, les autres
+# restent à leur valeur) forment une seule matrice, scorée en un seul appel.
+# score reçoit une matrice dans l'ordre de model_features et renvoie les probabilités.
+def sensitivity_curves(score, row, grids):
+    row = np.asarray(row, dtype=np.float64)
+    sizes = [len(grids[feature]) for feature in model_features]
+    X = np.repeat(row[None, :], sum(sizes), axis=0)
+    start = 0
+    for j, (feature, size) in enumerate(zip(model_features, sizes)):
+        X[start:start + size, j] = grids[feature]
+        start += size
+    proba = np.asarray(score(X), dtype=np.float64)
+
+    curves = {}
+    start = 0
+    for feature, size in zip(model_features, sizes):
+        curves[feature] = {"grid": grids[feature], "proba": proba[start:start + size]}
+        start += size
+    return curves
+
+
+# Fonction pour calculer la probabilité d'un scénario qui modifie plusieurs features.
+# Modèle logistique : sans appel au modèle, les effets de chaque feature, lus sur les courbes,
+# s'ajoutent en log-odds (exact : log-odds linéaires en chaque feature, interpolées exactement
+# sur la grille). Autres modèles : la ligne modifiée est scorée (score, ou le scoreur du modèle),
+# car leurs effets ne s'additionnent pas.
+def what_if_proba(curves, row, base_proba, values, model, score=None):
+    if not values:
+        return float(base_proba)
+    if not is_linear_model(model):
+        x = np.array([values.get(feature, row[feature]) for feature in model_features], dtype=np.float64)
+        score = score or make_scorer(model).score
+        return float(np.asarray(score(x[None, :]))[0])
+    from scipy.special import expit, logit
+    base_logit = logit(np.clip(base_proba, _EPS, 1 - _EPS))
+    z = base_logit
+    for feature, value in values.items():
+        if value == row[feature]:
+            continue
+        curve = curves[feature]
+        curve_logit = logit(np.clip(curve["proba"], _EPS, 1 - _EPS))
+        z += np.interp(value, curve["grid"], curve_logit) - np.interp(row[feature], curve["grid"], curve_logit)
+    return float(expit(z))